@@ -0,0 +1,170 @@
+# Benchmark: get_portfolio_summary() under concurrent load against the
+# local FX stub server, with injected latency and errors.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_fx_summary
+#   python -m benchmarks.bench_fx_summary --threads 32 --requests 500 --latency 0.3 --error-rate 0.2
+#
+# Three scenarios, each on a fresh database so the first reads are cold:
+#   cold:  no stored rate table; every thread starts at once
+#   warm:  the same app again, with the table stored
+#   down:  a fresh database while the stub answers every call with 503
+# For each, reports latency percentiles of the summary calls, how many
+# requests reached the stub, and the circuit breaker's state.
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Skip the module-level production app in run.py (it would load config.py
+# and touch the real database files)
+os.environ.setdefault("RUN_SKIP_APP_INIT", "1")
+
+from run import create_app
+from investment_tracker.app import external_api
+from investment_tracker.app.db import (
+    add_asset,
+    get_asset_id_map,
+    add_transactions_bulk,
+    add_price_to_history,
+    get_portfolio_summary,
+)
+from investment_tracker.app.fx_stub import StubRateServer
+from shared.circuit_breaker import CircuitBreaker
+from shared.sqlite_pool import close_pool
+from shared.shared_cache import close_cache
+
+
+def populate(asset_count : int, currencies : list, seed : int = 42):
+    """Adds asset_count held assets spread over currencies, each with
+    one buy and one price."""
+
+    rng = random.Random(seed)
+    for index in range(asset_count):
+        add_asset(f"SYM{index:03d}", f"Asset {index}", "Stock", currencies[index % len(currencies)])
+
+    asset_ids = list(get_asset_id_map().values())
+    add_transactions_bulk([(asset_id, "buy", "2024-01-02", rng.uniform(1, 20), 100.0, 0.0)
+                           for asset_id in asset_ids])
+    for asset_id in asset_ids:
+        add_price_to_history(asset_id, "2024-01-02", rng.uniform(50, 500))
+
+
+def make_app(stub_url : str, deadline : float):
+    """A throwaway app on fresh temp files. Returns (app, paths)."""
+
+    paths = []
+    for _ in range(3):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        paths.append(path)
+
+    class BenchConfig:
+        TESTING = True
+        INVESTMENT_DATABASE = paths[0]
+        MEMBERSHIPS_DATABASE = paths[1]
+        SHARED_CACHE_DATABASE = paths[2]
+        FX_API_BASE_URL = stub_url
+        FX_PREFETCH_TIMEOUT = deadline
+
+    return create_app(BenchConfig), paths
+
+
+def cleanup(paths : list):
+    close_pool(paths[0])
+    close_pool(paths[1])
+    close_cache(paths[2])
+    for path in paths:
+        os.unlink(path)
+
+
+def quietly(function, *args):
+    """Runs function with the db layer's progress and error prints muted."""
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args)
+
+
+def run_load(app, threads : int, requests : int):
+    """Calls get_portfolio_summary() requests times from threads
+    threads, each call in its own request context (as a page view
+    would). Returns (latencies in seconds, summaries missing a rate)."""
+
+    def one_call(_):
+        with app.test_request_context():
+            started = time.perf_counter()
+            summary = get_portfolio_summary()
+            elapsed = time.perf_counter() - started
+        return elapsed, any(data["fx_missing"] for data in summary.values())
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(one_call, range(requests)))
+
+    return [r[0] for r in results], sum(r[1] for r in results)
+
+
+def report(name : str, latencies : list, degraded : int, stub_calls : int):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    breaker = external_api._breaker.state()
+    print(f"{name:<6}{statistics.median(ordered) * 1000:>10.1f}{p95 * 1000:>10.1f}{ordered[-1] * 1000:>10.1f}"
+          f"{degraded:>10}{stub_calls:>12}   {breaker['state']} (rejected {breaker['rejected']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the portfolio summary against the FX stub server.")
+    parser.add_argument("--assets", type=int, default=30)
+    parser.add_argument("--currencies", nargs="+", default=["DKK", "USD", "EUR", "SEK", "NOK", "GBP"])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds the stub waits before answering")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub calls answered with 503")
+    parser.add_argument("--deadline", type=float, default=external_api.REQUEST_TIMEOUT,
+                        help="FX_PREFETCH_TIMEOUT for the summary, in seconds")
+    args = parser.parse_args()
+
+    print(f"{args.requests} summaries from {args.threads} threads, {args.assets} assets in "
+          f"{len(args.currencies)} currencies; stub latency {args.latency * 1000:.0f} ms, "
+          f"error rate {args.error_rate:.0%}, deadline {args.deadline:.1f}s")
+    print(f"{'':<6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'degraded':>10}{'stub calls':>12}   breaker")
+
+    with StubRateServer(latency=args.latency, error_rate=args.error_rate) as stub:
+        external_api._breaker = CircuitBreaker()
+
+        app, paths = quietly(make_app, stub.base_url, args.deadline)
+        try:
+            with app.app_context():
+                quietly(populate, args.assets, args.currencies)
+
+            latencies, degraded = quietly(run_load, app, args.threads, args.requests)
+            report("cold", latencies, degraded, stub.calls)
+            external_api.wait_for_refreshes(args.deadline)
+
+            before = stub.calls
+            latencies, degraded = quietly(run_load, app, args.threads, args.requests)
+            report("warm", latencies, degraded, stub.calls - before)
+        finally:
+            cleanup(paths)
+
+        stub.error_rate = 1.0
+        app, paths = quietly(make_app, stub.base_url, args.deadline)
+        try:
+            with app.app_context():
+                quietly(populate, args.assets, args.currencies)
+
+            before = stub.calls
+            latencies, degraded = quietly(run_load, app, args.threads, args.requests)
+            report("down", latencies, degraded, stub.calls - before)
+        finally:
+            cleanup(paths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# Benchmark: vectorized portfolio value series vs. a per-day Python loop.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_portfolio_value
+#   python -m benchmarks.bench_portfolio_value --assets 100 --years 10 --repeat 5
+#
+# Builds a throwaway database with daily prices for every asset, then times
+# portfolio_value_series() against naive_portfolio_value_series() below and
+# checks that both produce the same values. Both end-to-end time (including
+# reading every price row from SQLite) and compute-only time are reported.
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from datetime import date, timedelta
+
+# Skip the module-level production app in run.py (it would load config.py
+# and touch the real database files)
+os.environ.setdefault("RUN_SKIP_APP_INIT", "1")
+
+import numpy as np
+
+from run import create_app
+from investment_tracker.app.db import (
+    get_db_connection,
+    add_asset,
+    get_asset_id_map,
+    add_transactions_bulk,
+)
+from investment_tracker.app.price_ingest import ingest_prices
+from investment_tracker.app.timeseries import (
+    portfolio_value_series,
+    load_series_inputs,
+    compute_values,
+)
+from shared.sqlite_pool import close_pool
+
+
+def populate(asset_count : int, years : int, seed : int = 42):
+    """Fills the current app's database with DKK assets, random trades
+    and a daily random-walk price for every asset."""
+
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=365 * years)
+    day_count = 365 * years
+
+    for index in range(asset_count):
+        add_asset(f"SYM{index:03d}", f"Asset {index}", "Stock", "DKK")
+    asset_ids = list(get_asset_id_map().values())
+
+    trades = []
+    for asset_id in asset_ids:
+        for _ in range(rng.randint(5, 40)):
+            day = start + timedelta(days=rng.randrange(day_count))
+            trades.append((asset_id, rng.choice(["buy", "buy", "sell"]), day.isoformat(),
+                           rng.uniform(1, 20), rng.uniform(50, 500), 0.0))
+    add_transactions_bulk(trades)
+
+    def prices():
+        for asset_id in asset_ids:
+            price = rng.uniform(50, 500)
+            for offset in range(day_count):
+                price = max(1.0, price * (1 + rng.gauss(0, 0.01)))
+                yield {"asset_id": asset_id,
+                       "date": (start + timedelta(days=offset)).isoformat(),
+                       "price": price}
+
+    result = ingest_prices(prices())
+    return start, start + timedelta(days=day_count - 1), len(trades), result["inserted"]
+
+
+def naive_load(end : str):
+    """Reads the ledger and price history as sqlite3.Row objects."""
+
+    with get_db_connection() as conn:
+        transactions = conn.execute(
+            "SELECT asset_id, date, transaction_type, quantity FROM transactions WHERE date <= ?;",
+            (end,)).fetchall()
+        prices = conn.execute(
+            "SELECT asset_id, date, price FROM price_history WHERE date <= ?;",
+            (end,)).fetchall()
+    return transactions, prices
+
+
+def naive_compute(transactions, prices, start : str, end : str):
+    """Reference implementation: walk the calendar one day at a time,
+    applying that day's trades and prices to running per-asset state.
+    All assets are DKK, so no FX conversion is needed."""
+
+    trades_by_day = {}
+    for row in transactions:
+        signed = row["quantity"] if row["transaction_type"] == "buy" else -row["quantity"]
+        trades_by_day.setdefault(row["date"], []).append((row["asset_id"], signed))
+
+    prices_by_day = {}
+    for row in prices:
+        prices_by_day.setdefault(row["date"], []).append((row["asset_id"], row["price"]))
+
+    holdings = {}
+    last_price = {}
+    first_day = min(list(trades_by_day) + list(prices_by_day) + [start])
+
+    values = []
+    day = date.fromisoformat(first_day)
+    end_day = date.fromisoformat(end)
+    while day <= end_day:
+        key = day.isoformat()
+        for asset_id, signed in trades_by_day.get(key, []):
+            holdings[asset_id] = holdings.get(asset_id, 0.0) + signed
+        for asset_id, price in prices_by_day.get(key, []):
+            last_price[asset_id] = price
+
+        if key >= start:
+            values.append(sum(quantity * last_price.get(asset_id, 0.0)
+                              for asset_id, quantity in holdings.items()))
+        day += timedelta(days=1)
+
+    return values
+
+
+def naive_portfolio_value_series(start : str, end : str):
+    """Naive end to end: load rows, then loop over days."""
+
+    transactions, prices = naive_load(end)
+    return naive_compute(transactions, prices, start, end)
+
+
+def best_of(repeat : int, function, *args):
+    """Returns (best wall-clock seconds, last result) over repeat runs."""
+
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the portfolio value time-series engine.")
+    parser.add_argument("--assets", type=int, default=100)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    inv_fd, inv_path = tempfile.mkstemp(suffix=".db")
+    mem_fd, mem_path = tempfile.mkstemp(suffix=".db")
+    os.close(inv_fd)
+    os.close(mem_fd)
+
+    class BenchConfig:
+        TESTING = True
+        INVESTMENT_DATABASE = inv_path
+        MEMBERSHIPS_DATABASE = mem_path
+
+    try:
+        app = create_app(BenchConfig)
+        with app.app_context():
+            print(f"Populating {args.assets} assets x {args.years} years of daily prices...")
+            start, end, trade_count, price_count = populate(args.assets, args.years)
+            print(f"  {trade_count} transactions, {price_count} prices")
+
+            start, end = start.isoformat(), end.isoformat()
+            day_count = (date.fromisoformat(end) - date.fromisoformat(start)).days + 1
+
+            # End to end, including the SQL reads
+            vectorized_time, vectorized = best_of(args.repeat, portfolio_value_series, start, end)
+            naive_time, naive = best_of(args.repeat, naive_portfolio_value_series, start, end)
+            assert np.allclose(vectorized["values"], naive), "Engines disagree"
+
+            # Compute only, on data that is already loaded
+            inputs = load_series_inputs(start, end)
+            fx = np.ones(len(inputs["assets"]))
+            compute_time, _ = best_of(args.repeat, compute_values, inputs, day_count, fx)
+
+            transactions, prices = naive_load(end)
+            naive_compute_time, _ = best_of(args.repeat, naive_compute, transactions, prices, start, end)
+
+            print(f"Days: {day_count}")
+            print("                      end-to-end    compute only")
+            print(f"Vectorized (NumPy): {vectorized_time * 1000:9.1f} ms    {compute_time * 1000:9.1f} ms")
+            print(f"Naive per-day loop: {naive_time * 1000:9.1f} ms    {naive_compute_time * 1000:9.1f} ms")
+            print(f"Speedup:            {naive_time / vectorized_time:9.1f}x       "
+                  f"{naive_compute_time / compute_time:9.1f}x")
+    finally:
+        close_pool(inv_path)
+        close_pool(mem_path)
+        os.unlink(inv_path)
+        os.unlink(mem_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Benchmark: price-history payload size and encode time, JSON vs. columnar.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_price_payload
+#   python -m benchmarks.bench_price_payload --points 1000 10000 100000 --repeat 5
+#
+# Encodes a synthetic daily price series the way the price-history API
+# does: the JSON list of {date, price} objects, the columnar format from
+# price_codec, and both gzipped. No database or app is needed.
+
+import argparse
+import gzip
+import json
+import random
+import time
+
+from datetime import date, timedelta
+
+from investment_tracker.app.price_codec import (
+    GZIP_LEVEL,
+    encode_price_columns,
+    decode_price_columns,
+)
+
+
+def make_rows(count : int, seed : int = 42):
+    """A random-walk daily price series of count (date, price) rows."""
+
+    rng = random.Random(seed)
+    start = date(2000, 1, 1)
+    price = 100.0
+    rows = []
+    for offset in range(count):
+        price = max(1.0, price * (1 + rng.gauss(0, 0.01)))
+        rows.append(((start + timedelta(days=offset)).isoformat(), price))
+    return rows
+
+
+def encode_json(rows):
+    """Same shape and separators as the API's jsonify() output."""
+
+    return json.dumps([{"date": r[0], "price": r[1]} for r in rows],
+                      separators=(",", ":")).encode()
+
+
+def encode_columnar(rows):
+    return encode_price_columns({1: rows})
+
+
+def best_of(repeat : int, function, *args):
+    """Returns (best wall-clock seconds, last result) over repeat runs."""
+
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark price-history payload encodings.")
+    parser.add_argument("--points", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'points':>8}  {'format':<16}{'bytes':>12}{'encode ms':>12}{'vs json':>9}")
+    for count in args.points:
+        rows = make_rows(count)
+
+        json_time, json_body = best_of(args.repeat, encode_json, rows)
+        columnar_time, columnar_body = best_of(args.repeat, encode_columnar, rows)
+        json_gzip_time, json_gzip = best_of(args.repeat, lambda: gzip.compress(encode_json(rows), GZIP_LEVEL))
+        columnar_gzip_time, columnar_gzip = best_of(args.repeat, lambda: gzip.compress(encode_columnar(rows), GZIP_LEVEL))
+
+        # The columnar payload must carry exactly the same data
+        _, prices = decode_price_columns(columnar_body)[1]
+        assert prices.tolist() == [r[1] for r in rows], "Columnar payload lost precision"
+
+        results = [
+            ("json", json_body, json_time),
+            ("columnar", columnar_body, columnar_time),
+            ("json+gzip", json_gzip, json_gzip_time),
+            ("columnar+gzip", columnar_gzip, columnar_gzip_time),
+        ]
+        for name, body, seconds in results:
+            print(f"{count:>8}  {name:<16}{len(body):>12,}{seconds * 1000:>12.2f}"
+                  f"{len(body) / len(json_body):>8.2f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
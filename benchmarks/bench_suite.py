@@ -0,0 +1,179 @@
+# Benchmark suite: the db layer and the main routes on synthetic data.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_suite --output before.json
+#   python -m benchmarks.bench_suite --output after.json --compare before.json
+#   python -m benchmarks.bench_suite --assets 200 --transactions 100000 --prices 1000000
+#
+# Populates temporary databases with benchmarks.synthetic (same seed, same
+# rows), then times:
+#   db.*     the read functions themselves, with the request and shared
+#            caches unwrapped, so the numbers are the work a cache miss does
+#   route.*  GET requests through the test client, caches included, as a
+#            browser would see them
+# Results are written as JSON. --compare prints each case's median against
+# a previous run and exits with status 1 if any got slower than
+# --threshold times the baseline.
+
+import argparse
+import inspect
+import json
+import platform
+import statistics
+import sys
+import time
+
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import temp_app, populate_investments, populate_memberships, DEFAULT_SEED
+from investment_tracker.app import db as investment_db
+from memberships.app import db as memberships_db
+
+
+def db_cases(asset_id : int):
+    """(name, function) pairs for the db layer, caches unwrapped."""
+
+    raw = inspect.unwrap
+    return [
+        ("db.get_portfolio_summary", raw(investment_db.get_portfolio_summary)),
+        ("db.get_all_transactions", raw(investment_db.get_all_transactions)),
+        ("db.get_transactions_page", lambda: raw(investment_db.get_transactions_page)(50)),
+        ("db.get_price_history", lambda: raw(investment_db.get_price_history)(asset_id)),
+        ("db.get_total_monthly_cost", raw(memberships_db.get_total_monthly_cost)),
+        ("db.get_upcoming_renewals", memberships_db.get_upcoming_renewals),
+    ]
+
+
+def route_cases(asset_id : int):
+    """(name, path) pairs for the main pages and API endpoints."""
+
+    api = "/finance/investments/api"
+    return [
+        ("route.portal", "/"),
+        ("route.system_status", "/api/system_status"),
+        ("route.investments", "/finance/investments/"),
+        ("route.history", "/finance/investments/history"),
+        ("route.memberships", "/finance/memberships/"),
+        ("route.api_transactions", f"{api}/transactions"),
+        ("route.api_price_history", f"{api}/price-history/{asset_id}?max_points=500"),
+        ("route.api_portfolio_value", f"{api}/portfolio-value"),
+        ("route.api_pnl", f"{api}/pnl"),
+    ]
+
+
+def measure(function, repeat : int, warmup : int = 1):
+    """Times function() repeat times after warmup untimed calls.
+    Returns summary statistics in milliseconds."""
+
+    for _ in range(warmup):
+        function()
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    samples.sort()
+    return {
+        "runs": repeat,
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(repeat - 1, int(repeat * 0.95))], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def run_suite(args):
+    results = {}
+    with temp_app() as app:
+        with app.app_context():
+            print("Populating...")
+            started = time.perf_counter()
+            counts = populate_investments(args.assets, args.transactions, args.prices, seed=args.seed)
+            counts["memberships"] = populate_memberships(args.memberships, seed=args.seed)
+            print(f"  {counts} in {time.perf_counter() - started:.1f}s")
+
+            asset_id = min(investment_db.get_asset_id_map().values())
+            for name, function in db_cases(asset_id):
+                results[name] = measure(function, args.repeat)
+                print(f"  {name:<30}{results[name]['median_ms']:>10.2f} ms")
+
+        client = app.test_client()
+        for name, path in route_cases(asset_id):
+            def get():
+                response = client.get(path)
+                assert response.status_code == 200, f"{path} returned {response.status_code}"
+                response.get_data()
+            results[name] = measure(get, args.repeat)
+            print(f"  {name:<30}{results[name]['median_ms']:>10.2f} ms")
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "rows": counts,
+        },
+        "results": results,
+    }
+
+
+def compare(current : dict, baseline : dict, threshold : float):
+    """Prints median times against the baseline. Returns the names of
+    cases slower than threshold x baseline."""
+
+    if baseline["meta"].get("rows") != current["meta"]["rows"]:
+        print("Warning: the baseline was run on a different data set.")
+
+    regressions = []
+    print(f"\n{'case':<30}{'baseline ms':>13}{'now ms':>10}{'ratio':>8}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<30}{'-':>13}{result['median_ms']:>10.2f}{'new':>8}")
+            continue
+
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        flag = "  REGRESSION" if ratio > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<30}{before['median_ms']:>13.2f}{result['median_ms']:>10.2f}{ratio:>7.2f}x{flag}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the db layer and routes on synthetic data.")
+    parser.add_argument("--assets", type=int, default=50)
+    parser.add_argument("--transactions", type=int, default=20_000)
+    parser.add_argument("--prices", type=int, default=200_000)
+    parser.add_argument("--memberships", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Slowdown ratio reported as a regression (default: 1.25)")
+    args = parser.parse_args()
+
+    report = run_suite(args)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# Seeded synthetic data for benchmarks.
+#
+#   with temp_app() as app:
+#       with app.app_context():
+#           populate_investments(assets=50, transactions=20_000, prices=200_000)
+#           populate_memberships(500)
+#
+# Everything lives in a temporary directory that is removed afterwards:
+# both databases, the shared cache file and a rates file for the "file"
+# FX provider, so runs are repeatable and never touch the network or the
+# real instance folders. The same seed always gives the same rows.
+
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+
+from datetime import date, timedelta
+
+# Skip the module-level production app in run.py (it would load config.py
+# and touch the real database files)
+os.environ.setdefault("RUN_SKIP_APP_INIT", "1")
+
+from run import create_app
+from investment_tracker.app.db import add_asset, get_asset_id_map, add_transactions_bulk
+from investment_tracker.app.fx_stub import DEFAULT_RATES
+from investment_tracker.app.price_ingest import ingest_prices
+from memberships.app import db as memberships_db
+from shared.sqlite_pool import close_pool
+from shared.shared_cache import close_cache
+
+DEFAULT_SEED = 42
+CURRENCIES = ["DKK", "USD", "EUR", "SEK"]
+ASSET_TYPES = ["Stock", "ETF", "Fund", "Crypto"]
+FREQUENCIES = ["weekly", "monthly", "quarterly", "yearly"]
+
+INSERT_MEMBERSHIP = """
+INSERT INTO memberships (organization, description, membership_type,
+member_since, is_paid, payment_frequency, price_per_period, currency, renewal_date)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+
+
+@contextlib.contextmanager
+def temp_app(**config):
+    """Yields an app on fresh temporary databases, with FX rates served
+    from a local file. Keyword arguments override config values."""
+
+    folder = tempfile.mkdtemp(prefix="bench-")
+    paths = {
+        "INVESTMENT_DATABASE": os.path.join(folder, "investment.db"),
+        "MEMBERSHIPS_DATABASE": os.path.join(folder, "memberships.db"),
+        "SHARED_CACHE_DATABASE": os.path.join(folder, "cache.db"),
+    }
+    rates_file = os.path.join(folder, "rates.json")
+    with open(rates_file, "w", encoding="utf-8") as handle:
+        json.dump({"base": "DKK", "rates": DEFAULT_RATES}, handle)
+
+    settings = {
+        "TESTING": True,
+        "SECRET_KEY": "bench-secret-key",
+        "FX_PROVIDER": "file",
+        "FX_RATES_FILE": rates_file,
+        **paths,
+        **config,
+    }
+    BenchConfig = type("BenchConfig", (), settings)
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            app = create_app(BenchConfig)
+        yield app
+    finally:
+        close_pool(paths["INVESTMENT_DATABASE"])
+        close_pool(paths["MEMBERSHIPS_DATABASE"])
+        close_cache(paths["SHARED_CACHE_DATABASE"])
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def populate_investments(assets : int, transactions : int, prices : int,
+                         currencies : list = CURRENCIES, seed : int = DEFAULT_SEED):
+    """Fills the current app's investment database.
+
+    assets assets spread over currencies; transactions trades spread over
+    the assets in date order, never selling more than is held; prices
+    daily closing prices split evenly between the assets, ending today.
+    Returns the row counts written.
+    """
+
+    rng = random.Random(seed)
+    today = date.today()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index in range(assets):
+            add_asset(f"SYN{index:04d}", f"Synthetic {index}",
+                      ASSET_TYPES[index % len(ASSET_TYPES)], currencies[index % len(currencies)])
+    asset_ids = list(get_asset_id_map().values())
+
+    # Trades: one dated stream per asset, with a running position
+    days_back = 365 * 5
+    per_asset = {asset_id: [] for asset_id in asset_ids}
+    for _ in range(transactions):
+        per_asset[rng.choice(asset_ids)].append(rng.randrange(days_back))
+
+    rows = []
+    for asset_id, offsets in per_asset.items():
+        position = 0.0
+        for offset in sorted(offsets, reverse=True):
+            day = (today - timedelta(days=offset)).isoformat()
+            if position > 1 and rng.random() < 0.3:
+                quantity = round(rng.uniform(0.1, 0.5) * position, 4)
+                rows.append((asset_id, "sell", day, quantity, rng.uniform(50, 500), rng.uniform(0, 20)))
+                position -= quantity
+            else:
+                quantity = round(rng.uniform(1, 20), 4)
+                rows.append((asset_id, "buy", day, quantity, rng.uniform(50, 500), rng.uniform(0, 20)))
+                position += quantity
+    add_transactions_bulk(rows)
+
+    # Prices: a random walk per asset, one row per day
+    days_per_asset = max(prices // max(len(asset_ids), 1), 1)
+
+    def price_records():
+        for asset_id in asset_ids:
+            price = rng.uniform(50, 500)
+            for offset in range(days_per_asset, 0, -1):
+                price = max(1.0, price * (1 + rng.gauss(0, 0.01)))
+                yield {"asset_id": asset_id,
+                       "date": (today - timedelta(days=offset - 1)).isoformat(),
+                       "price": round(price, 4)}
+
+    result = ingest_prices(price_records())
+
+    return {"assets": len(asset_ids), "transactions": len(rows), "prices": result["inserted"]}
+
+
+# Written straight to the table in one batch; the decorator drops any
+# cached reads of the memberships database, as add_membership() would.
+@memberships_db.invalidates
+def populate_memberships(count : int, seed : int = DEFAULT_SEED):
+    """Fills the current app's memberships database with count rows,
+    about two thirds paid, with renewals spread over the next year.
+    Returns the number of rows written."""
+
+    rng = random.Random(seed)
+    today = date.today()
+
+    rows = []
+    for index in range(count):
+        paid = rng.random() < 2 / 3
+        since = today - timedelta(days=rng.randrange(3650))
+        rows.append((
+            f"Organization {index}",
+            "Synthetic membership",
+            rng.choice(["Gym", "Club", "Streaming", "Union"]),
+            since.isoformat(),
+            int(paid),
+            rng.choice(FREQUENCIES) if paid else None,
+            round(rng.uniform(10, 500), 2) if paid else None,
+            rng.choice(CURRENCIES) if paid else None,
+            (today + timedelta(days=rng.randrange(365))).isoformat() if paid else None,
+        ))
+
+    with memberships_db.get_db_connection() as conn:
+        conn.executemany(INSERT_MEMBERSHIP, rows)
+        conn.commit()
+
+    return len(rows)
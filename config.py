@@ -0,0 +1,2 @@
+FLASK_SECRET = "ci-test-secret"
+EXCHANGE_RATE_API_KEY = "dummy-key"
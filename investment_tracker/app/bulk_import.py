@@ -0,0 +1,155 @@
+import csv
+import math
+import time
+
+from datetime import date
+
+from .db import get_asset_id_map, add_transactions_bulk
+from .streams import text_stream
+
+# Broker exports name their columns differently. Each accepted header
+# (lowercased, stripped) maps to the field name used by add_transaction().
+COLUMN_ALIASES = {
+    "symbol": "symbol",
+    "ticker": "symbol",
+    "transaction_type": "transaction_type",
+    "type": "transaction_type",
+    "action": "transaction_type",
+    "side": "transaction_type",
+    "date": "date",
+    "trade_date": "date",
+    "quantity": "quantity",
+    "qty": "quantity",
+    "shares": "quantity",
+    "price_per_unit": "price_per_unit",
+    "price": "price_per_unit",
+    "fees": "fees",
+    "fee": "fees",
+    "commission": "fees",
+}
+
+TRANSACTION_TYPES = ("buy", "sell")
+
+# Only the first rejected rows are returned in full; the rest are counted.
+MAX_REPORTED_REJECTIONS = 500
+
+
+def _normalize_keys(record : dict):
+    """Maps a raw record's keys onto the canonical field names."""
+
+    normalized = {}
+    for key, value in record.items():
+        if key is None:
+            continue  # Extra unnamed CSV columns
+        field = COLUMN_ALIASES.get(key.strip().lower())
+        if field:
+            normalized[field] = value.strip() if isinstance(value, str) else value
+    return normalized
+
+
+def parse_transaction(record : dict, asset_ids : dict):
+    """Validates a single record and returns the parameter tuple for
+    add_transactions_bulk().
+
+    Raises ValueError with a readable reason if the record is invalid.
+    """
+
+    fields = _normalize_keys(record)
+
+    symbol = str(fields.get("symbol") or "").upper()
+    if not symbol:
+        raise ValueError("Missing symbol")
+    asset_id = asset_ids.get(symbol)
+    if asset_id is None:
+        raise ValueError(f"Unknown symbol '{symbol}'")
+
+    transaction_type = str(fields.get("transaction_type") or "").lower()
+    if transaction_type not in TRANSACTION_TYPES:
+        raise ValueError(f"Invalid transaction type '{transaction_type}'")
+
+    raw_date = str(fields.get("date") or "")
+    try:
+        trade_date = date.fromisoformat(raw_date[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date '{raw_date}' (expected YYYY-MM-DD)")
+
+    try:
+        quantity = float(fields.get("quantity"))
+        price = float(fields.get("price_per_unit"))
+        raw_fees = fields.get("fees")
+        fees = float(raw_fees) if raw_fees not in (None, "") else 0.0
+    except (TypeError, ValueError):
+        raise ValueError("Invalid numbers in quantity, price or fees")
+
+    # float() accepts "nan" and "inf", which no comparison below rejects
+    if not all(math.isfinite(value) for value in (quantity, price, fees)):
+        raise ValueError("Quantity, price and fees must be finite numbers")
+    if quantity <= 0:
+        raise ValueError("Quantity must be positive")
+    if price < 0 or fees < 0:
+        raise ValueError("Price and fees cannot be negative")
+
+    return (asset_id, transaction_type, trade_date, quantity, price, fees)
+
+
+def iter_csv_records(stream):
+    """Yields one dict per CSV row from a binary or text stream.
+
+    Reads the stream incrementally, so large files are never loaded
+    into memory at once. A UTF-8 byte order mark (Excel exports) is skipped.
+    """
+
+    yield from csv.DictReader(text_stream(stream))
+
+
+def import_transactions(records):
+    """Validates and inserts transaction records in one database transaction.
+
+    records is any iterable of dicts (CSV rows, a JSON array, ...).
+    Symbols are resolved through a single lookup map. Invalid records are
+    skipped and reported; valid ones are written with executemany.
+
+    Returns a dict:
+        imported:        number of inserted rows (0 if the write failed)
+        rejected:        [{"row": n, "reason": "...", "record": {...}}, ...]
+        rejected_count:  total number of rejected rows
+        seconds:         wall-clock time for validation and insert
+        rows_per_second: imported rows per second
+        error:           set only if the database write failed
+    """
+
+    asset_ids = get_asset_id_map()
+    rejected = []
+    counts = {"rejected": 0}
+
+    def valid_rows():
+        # Row numbers are 1-based, matching what a spreadsheet shows
+        for row_number, record in enumerate(records, start=1):
+            if not isinstance(record, dict):
+                reason = "Record is not an object"
+            else:
+                try:
+                    yield parse_transaction(record, asset_ids)
+                    continue
+                except ValueError as e:
+                    reason = str(e)
+
+            counts["rejected"] += 1
+            if len(rejected) < MAX_REPORTED_REJECTIONS:
+                rejected.append({"row": row_number, "reason": reason, "record": record})
+
+    start = time.perf_counter()
+    imported = add_transactions_bulk(valid_rows())
+    seconds = time.perf_counter() - start
+
+    result = {
+        "imported": imported or 0,
+        "rejected": rejected,
+        "rejected_count": counts["rejected"],
+        "seconds": round(seconds, 4),
+        "rows_per_second": round((imported or 0) / seconds, 1) if seconds > 0 else 0.0,
+    }
+    if imported is None:
+        result["error"] = "Database write failed; no rows were imported."
+
+    return result
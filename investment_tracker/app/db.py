@@ -1,10 +1,18 @@
+import json
 import sqlite3
 import os
+import time
+
+import numpy as np
 
 from contextlib import contextmanager
 from flask import current_app, has_app_context
 
-from .utils import convert_currency
+from shared import sqlite_pool
+from shared.migrations import run_migrations
+from shared.single_flight import SingleFlight
+from shared import read_cache, shared_cache
+from .utils import convert_series, prefetch_rates
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
@@ -13,6 +21,16 @@ INSTANCE_FOLDER = os.path.join(PROJECT_ROOT, "instance")
 # Database file
 DB_FILE = os.path.join(INSTANCE_FOLDER, "investment.db")
 
+# Read functions are memoized per request (see shared/read_cache.py);
+# every function that writes bumps the database's generation.
+memoized = read_cache.memoized("INVESTMENT_DATABASE", DB_FILE)
+invalidates = read_cache.invalidates("INVESTMENT_DATABASE", DB_FILE)
+
+# Results shared by all gunicorn workers (see shared/shared_cache.py).
+# Writes drop them at once; the TTL bounds how old the FX conversions
+# inside them can get.
+SHARED_CACHE_TTL = 300
+
 # SQL Schemas
 CREATE_ASSETS_TABLE = """
 CREATE TABLE IF NOT EXISTS assets (
@@ -48,10 +66,345 @@ CREATE TABLE IF NOT EXISTS price_history (
 );
 """
 
+# Running totals per asset, kept in sync with the ledger by the triggers
+# below, so reads cost O(assets) instead of O(transactions).
+# cost_total and proceeds_total follow get_all_transactions()' total_price:
+# buys include fees, sells do not.
+CREATE_HOLDINGS_TABLE = """
+CREATE TABLE IF NOT EXISTS holdings (
+    asset_id              INTEGER PRIMARY KEY,
+    quantity              REAL    NOT NULL DEFAULT 0,
+    bought_quantity       REAL    NOT NULL DEFAULT 0,
+    sold_quantity         REAL    NOT NULL DEFAULT 0,
+    cost_total            REAL    NOT NULL DEFAULT 0,
+    proceeds_total        REAL    NOT NULL DEFAULT 0,
+    fees_total            REAL    NOT NULL DEFAULT 0,
+    transaction_count     INTEGER NOT NULL DEFAULT 0,
+    last_transaction_date TEXT,
+    FOREIGN KEY (asset_id) REFERENCES assets (id)
+);
+"""
+
+# The same aggregate the triggers maintain, computed from the full ledger.
+# Used to backfill the table and by rebuild_holdings() / verify_holdings().
+SELECT_HOLDINGS_FROM_LEDGER = """
+SELECT
+    asset_id,
+    SUM(CASE WHEN transaction_type = 'buy' THEN quantity ELSE -quantity END) AS quantity,
+    SUM(CASE WHEN transaction_type = 'buy' THEN quantity ELSE 0 END)         AS bought_quantity,
+    SUM(CASE WHEN transaction_type = 'buy' THEN 0 ELSE quantity END)         AS sold_quantity,
+    SUM(CASE WHEN transaction_type = 'buy' THEN quantity * price_per_unit + COALESCE(fees, 0) ELSE 0 END) AS cost_total,
+    SUM(CASE WHEN transaction_type = 'buy' THEN 0 ELSE quantity * price_per_unit END)                      AS proceeds_total,
+    SUM(COALESCE(fees, 0))  AS fees_total,
+    COUNT(*)                AS transaction_count,
+    MAX(date)               AS last_transaction_date
+FROM transactions
+GROUP BY asset_id
+"""
+
+# Adds one transaction's contribution to its asset's holdings row
+_HOLDINGS_ADD = """
+    INSERT INTO holdings (asset_id, quantity, bought_quantity, sold_quantity,
+                          cost_total, proceeds_total, fees_total,
+                          transaction_count, last_transaction_date)
+    VALUES (
+        NEW.asset_id,
+        CASE WHEN NEW.transaction_type = 'buy' THEN NEW.quantity ELSE -NEW.quantity END,
+        CASE WHEN NEW.transaction_type = 'buy' THEN NEW.quantity ELSE 0 END,
+        CASE WHEN NEW.transaction_type = 'buy' THEN 0 ELSE NEW.quantity END,
+        CASE WHEN NEW.transaction_type = 'buy' THEN NEW.quantity * NEW.price_per_unit + COALESCE(NEW.fees, 0) ELSE 0 END,
+        CASE WHEN NEW.transaction_type = 'buy' THEN 0 ELSE NEW.quantity * NEW.price_per_unit END,
+        COALESCE(NEW.fees, 0),
+        1,
+        NEW.date
+    )
+    ON CONFLICT(asset_id) DO UPDATE SET
+        quantity              = quantity + excluded.quantity,
+        bought_quantity       = bought_quantity + excluded.bought_quantity,
+        sold_quantity         = sold_quantity + excluded.sold_quantity,
+        cost_total            = cost_total + excluded.cost_total,
+        proceeds_total        = proceeds_total + excluded.proceeds_total,
+        fees_total            = fees_total + excluded.fees_total,
+        transaction_count     = transaction_count + 1,
+        last_transaction_date = MAX(COALESCE(last_transaction_date, ''), excluded.last_transaction_date);
+"""
+
+# Removes one transaction's contribution. The last date is looked up again
+# through idx_transactions_asset_date, and the row goes away with the
+# asset's last transaction.
+_HOLDINGS_SUBTRACT = """
+    UPDATE holdings SET
+        quantity          = quantity - CASE WHEN OLD.transaction_type = 'buy' THEN OLD.quantity ELSE -OLD.quantity END,
+        bought_quantity   = bought_quantity - CASE WHEN OLD.transaction_type = 'buy' THEN OLD.quantity ELSE 0 END,
+        sold_quantity     = sold_quantity - CASE WHEN OLD.transaction_type = 'buy' THEN 0 ELSE OLD.quantity END,
+        cost_total        = cost_total - CASE WHEN OLD.transaction_type = 'buy' THEN OLD.quantity * OLD.price_per_unit + COALESCE(OLD.fees, 0) ELSE 0 END,
+        proceeds_total    = proceeds_total - CASE WHEN OLD.transaction_type = 'buy' THEN 0 ELSE OLD.quantity * OLD.price_per_unit END,
+        fees_total        = fees_total - COALESCE(OLD.fees, 0),
+        transaction_count = transaction_count - 1,
+        last_transaction_date = (SELECT MAX(date) FROM transactions WHERE asset_id = OLD.asset_id)
+    WHERE asset_id = OLD.asset_id;
+    DELETE FROM holdings WHERE asset_id = OLD.asset_id AND transaction_count <= 0;
+"""
+
+CREATE_HOLDINGS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_insert_holdings
+    AFTER INSERT ON transactions
+    BEGIN
+    {_HOLDINGS_ADD}
+    END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_delete_holdings
+    AFTER DELETE ON transactions
+    BEGIN
+    {_HOLDINGS_SUBTRACT}
+    END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_update_holdings
+    AFTER UPDATE ON transactions
+    BEGIN
+    {_HOLDINGS_SUBTRACT}
+    {_HOLDINGS_ADD}
+    END;
+    """,
+]
+
+# Per-asset summary of price_history, refreshed by every price write
+# (see refresh_price_stats) so readers get the latest price, range and
+# row count with a single primary-key lookup.
+# high_52w / low_52w cover the year up to and including latest_date.
+CREATE_PRICE_STATS_TABLE = """
+CREATE TABLE IF NOT EXISTS price_stats (
+    asset_id     INTEGER PRIMARY KEY,
+    latest_date  TEXT    NOT NULL,
+    latest_price REAL    NOT NULL,
+    first_date   TEXT    NOT NULL,
+    min_price    REAL    NOT NULL,
+    max_price    REAL    NOT NULL,
+    high_52w     REAL    NOT NULL,
+    low_52w      REAL    NOT NULL,
+    row_count    INTEGER NOT NULL,
+    FOREIGN KEY (asset_id) REFERENCES assets (id)
+);
+"""
+
+# Recomputes one asset's stats. Every subquery is a range scan on the
+# UNIQUE(asset_id, date) index, so the cost depends only on that asset's
+# history. An asset with no prices produces no row.
+REFRESH_PRICE_STATS = """
+INSERT OR REPLACE INTO price_stats (asset_id, latest_date, latest_price, first_date,
+                                    min_price, max_price, high_52w, low_52w, row_count)
+SELECT
+    s.asset_id,
+    s.latest_date,
+    (SELECT price FROM price_history WHERE asset_id = s.asset_id AND date = s.latest_date),
+    s.first_date,
+    s.min_price,
+    s.max_price,
+    (SELECT MAX(price) FROM price_history
+     WHERE asset_id = s.asset_id AND date > date(s.latest_date, '-1 year')),
+    (SELECT MIN(price) FROM price_history
+     WHERE asset_id = s.asset_id AND date > date(s.latest_date, '-1 year')),
+    s.row_count
+FROM (
+    SELECT asset_id, MAX(date) AS latest_date, MIN(date) AS first_date,
+           MIN(price) AS min_price, MAX(price) AS max_price, COUNT(*) AS row_count
+    FROM price_history
+    WHERE asset_id = :asset_id
+    GROUP BY asset_id
+) s;
+"""
+
+DELETE_EMPTY_PRICE_STATS = """
+DELETE FROM price_stats
+WHERE asset_id = :asset_id
+AND NOT EXISTS (SELECT 1 FROM price_history WHERE asset_id = :asset_id);
+"""
+
+# Cost basis and P&L state, one set per lot matching method (see pnl.py).
+# pnl_positions holds each asset's state after its last transaction;
+# pnl_checkpoints holds the same state every few hundred transactions, so
+# a change to old history replays from the nearest earlier checkpoint.
+# lots is JSON: [[quantity, unit_cost], ...] in the asset's currency.
+CREATE_PNL_POSITIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS pnl_positions (
+    asset_id            INTEGER NOT NULL,
+    method              TEXT    NOT NULL,
+    quantity            REAL    NOT NULL,
+    cost_basis          REAL    NOT NULL,
+    realized_gain       REAL    NOT NULL,
+    transaction_count   INTEGER NOT NULL,
+    last_date           TEXT    NOT NULL,
+    last_transaction_id INTEGER NOT NULL,
+    lots                TEXT    NOT NULL,
+    PRIMARY KEY (asset_id, method),
+    FOREIGN KEY (asset_id) REFERENCES assets (id)
+);
+"""
+
+CREATE_PNL_CHECKPOINTS_TABLE = """
+CREATE TABLE IF NOT EXISTS pnl_checkpoints (
+    asset_id            INTEGER NOT NULL,
+    method              TEXT    NOT NULL,
+    last_date           TEXT    NOT NULL,
+    last_transaction_id INTEGER NOT NULL,
+    quantity            REAL    NOT NULL,
+    cost_basis          REAL    NOT NULL,
+    realized_gain       REAL    NOT NULL,
+    transaction_count   INTEGER NOT NULL,
+    lots                TEXT    NOT NULL,
+    PRIMARY KEY (asset_id, method, last_date, last_transaction_id),
+    FOREIGN KEY (asset_id) REFERENCES assets (id)
+);
+"""
+
+# One row per sell and method. proceeds are net of the sell's fees.
+CREATE_REALIZED_GAINS_TABLE = """
+CREATE TABLE IF NOT EXISTS realized_gains (
+    transaction_id INTEGER NOT NULL,
+    method         TEXT    NOT NULL,
+    asset_id       INTEGER NOT NULL,
+    date           TEXT    NOT NULL,
+    quantity       REAL    NOT NULL,
+    proceeds       REAL    NOT NULL,
+    cost_basis     REAL    NOT NULL,
+    gain           REAL    NOT NULL,
+    PRIMARY KEY (method, transaction_id),
+    FOREIGN KEY (asset_id) REFERENCES assets (id)
+);
+"""
+
+# Earliest transaction date per asset whose P&L is out of date. Written by
+# the triggers below in the same transaction as the ledger change, and
+# consumed by pnl.refresh_pnl().
+CREATE_PNL_DIRTY_TABLE = """
+CREATE TABLE IF NOT EXISTS pnl_dirty (
+    asset_id  INTEGER PRIMARY KEY,
+    from_date TEXT    NOT NULL
+);
+"""
+
+_PNL_MARK_DIRTY = """
+    INSERT INTO pnl_dirty (asset_id, from_date)
+    VALUES ({row}.asset_id, {row}.date)
+    ON CONFLICT(asset_id) DO UPDATE SET from_date = MIN(from_date, excluded.from_date);
+"""
+
+CREATE_PNL_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_insert_pnl
+    AFTER INSERT ON transactions
+    BEGIN
+    {_PNL_MARK_DIRTY.format(row="NEW")}
+    END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_delete_pnl
+    AFTER DELETE ON transactions
+    BEGIN
+    {_PNL_MARK_DIRTY.format(row="OLD")}
+    END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_update_pnl
+    AFTER UPDATE ON transactions
+    BEGIN
+    {_PNL_MARK_DIRTY.format(row="OLD")}
+    {_PNL_MARK_DIRTY.format(row="NEW")}
+    END;
+    """,
+]
+
+# Exchange rate tables fetched from the FX provider, one row per base
+# currency, so a restart or a new worker reads them from disk instead of
+# waiting on the network. rates is JSON: {"USD": 0.14, ...}.
+# refreshing_since marks a background refresh in progress (see
+# claim_fx_refresh), so only one worker refreshes a stale table.
+CREATE_FX_RATES_TABLE = """
+CREATE TABLE IF NOT EXISTS fx_rates (
+    base             TEXT PRIMARY KEY,
+    rates            TEXT NOT NULL,
+    fetched_at       REAL NOT NULL,
+    refreshing_since REAL
+);
+"""
+
+# Daily historical rates: 1 base = rate quote on date. Loaded in bulk
+# (see fx_ingest.py) and used to convert dated amounts at the rate of
+# their own day (see utils.convert_series). The primary key doubles as
+# the (base, quote) range index the as-of lookups read.
+CREATE_FX_HISTORY_TABLE = """
+CREATE TABLE IF NOT EXISTS fx_history (
+    date  TEXT NOT NULL,
+    base  TEXT NOT NULL,
+    quote TEXT NOT NULL,
+    rate  REAL NOT NULL,
+    PRIMARY KEY (base, quote, date)
+) WITHOUT ROWID;
+"""
+
+# Quantities below this are treated as fully sold (float dust from
+# adding and subtracting fractional shares).
+HOLDINGS_EPSILON = 1e-9
+
+def _create_price_stats(conn):
+    """Creates price_stats and fills it from the existing price history."""
+
+    conn.execute(CREATE_PRICE_STATS_TABLE)
+    asset_ids = [row["asset_id"] for row in
+                 conn.execute("SELECT DISTINCT asset_id FROM price_history;")]
+    refresh_price_stats(conn, asset_ids)
+
+
+# Schema migrations, applied in order by initialize_database().
+# PRAGMA user_version records the last applied number, so each runs once.
+# Append new migrations to the end; never edit one that has shipped.
+MIGRATIONS = [
+    (1, "Create assets, transactions and price_history tables", [
+        CREATE_ASSETS_TABLE,
+        CREATE_TRANSACTIONS_TABLE,
+        CREATE_PRICE_HISTORY_TABLE,
+    ]),
+    (2, "Index transactions by asset and by date", [
+        # get_all_transactions_for_asset / calculate_holdings filter on asset_id
+        "CREATE INDEX IF NOT EXISTS idx_transactions_asset_date ON transactions (asset_id, date);",
+        # get_all_transactions sorts the whole ledger by date
+        "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date);",
+    ]),
+    (3, "Add trigger-maintained holdings table", [
+        CREATE_HOLDINGS_TABLE,
+        *CREATE_HOLDINGS_TRIGGERS,
+        # Backfill from the existing ledger
+        f"INSERT INTO holdings {SELECT_HOLDINGS_FROM_LEDGER};",
+    ]),
+    (4, "Add price_stats table", _create_price_stats),
+    (5, "Add cost basis and P&L tables", [
+        CREATE_PNL_POSITIONS_TABLE,
+        CREATE_PNL_CHECKPOINTS_TABLE,
+        CREATE_REALIZED_GAINS_TABLE,
+        "CREATE INDEX IF NOT EXISTS idx_realized_gains_asset_date ON realized_gains (asset_id, method, date);",
+        CREATE_PNL_DIRTY_TABLE,
+        *CREATE_PNL_TRIGGERS,
+        # Existing ledgers are computed in full on the first read
+        "INSERT INTO pnl_dirty (asset_id, from_date) SELECT asset_id, MIN(date) FROM transactions GROUP BY asset_id;",
+    ]),
+    (6, "Index transactions by type and date", [
+        # Transaction history pages filtered on type. id is the rowid, so
+        # this and the other date indexes already end in (date, id), the
+        # keyset used by get_transactions_page().
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions (transaction_type, date);",
+    ]),
+    (7, "Add persistent fx_rates store", [CREATE_FX_RATES_TABLE]),
+    (8, "Add fx_history table", [CREATE_FX_HISTORY_TABLE]),
+]
+
 @contextmanager
 def get_db_connection():
-    """Creates a connection to the database.
-    Uses context manager to ensure proper closing of connection.
+    """Borrows this thread's pooled connection to the database.
+    The connection stays open between calls, so only the first query
+    in each thread pays the cost of opening the file.
     Usage:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -59,11 +412,10 @@ def get_db_connection():
 
     # Use the configured DB when running inside a Flask app context (tests/web app).
     # Fall back to the module default for scripts that run without app context.
-    conn = None
+    db_path = None
     try:
         db_path = current_app.config.get("INVESTMENT_DATABASE", DB_FILE) if has_app_context() else DB_FILE
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row  # Rows now accessible by column name: row["symbol"]
+        conn = sqlite_pool.acquire(db_path)
 
         # Yield the connection object
         yield conn
@@ -72,13 +424,26 @@ def get_db_connection():
             print(f"An error occurred: {e}")
     
     finally:
-        # Make sure connection is closed
-        if conn:
-            conn.close()
+        # Hand the connection back to the pool (rolls back uncommitted work)
+        if db_path:
+            sqlite_pool.release(db_path)
 
+def refresh_price_stats(conn, asset_ids):
+    """Recomputes price_stats for the given assets on an open connection.
+
+    Call this inside the same transaction as the price_history write, so
+    the stats can never disagree with the committed history.
+    """
+
+    for asset_id in set(asset_ids):
+        parameters = {"asset_id": asset_id}
+        conn.execute(REFRESH_PRICE_STATS, parameters)
+        conn.execute(DELETE_EMPTY_PRICE_STATS, parameters)
+
+@invalidates
 def initialize_database():
-    """Creates the database file and tables.
-    Checks if tables already exist.
+    """Creates the database file and brings its schema up to date.
+    Runs any pending MIGRATIONS; does no DDL if the schema is current.
 
     Skips instance folder creation when using an in-memory database,
     since ':memory:' is not a real file path.
@@ -92,22 +457,17 @@ def initialize_database():
             os.makedirs(INSTANCE_FOLDER)
             print(f"Created instance folder at {INSTANCE_FOLDER}.")
 
-    # Always create tables regardless of database type
+    # Always migrate regardless of database type
     try:
         with get_db_connection() as conn:
             print(f"Checking database at: {db_path}")
-            cursor = conn.cursor()
-
-            cursor.execute(CREATE_ASSETS_TABLE)
-            cursor.execute(CREATE_TRANSACTIONS_TABLE)
-            cursor.execute(CREATE_PRICE_HISTORY_TABLE)
-
-            conn.commit()
-            print("Database tables verified/created successfully.")
+            version = run_migrations(conn, MIGRATIONS)
+            print(f"Database schema at version {version}.")
 
     except sqlite3.Error as e:
         print(f"Database initialization failed: {e}")
 
+@invalidates
 def add_asset(symbol : str, name : str, asset_type : str, currency : str):
     """Adds an asset to the assets table."""
 
@@ -132,6 +492,7 @@ def add_asset(symbol : str, name : str, asset_type : str, currency : str):
     except sqlite3.Error as e:
         print(f"An error occurred in add_asset: {e}")
 
+@invalidates
 def add_transaction(asset_id : int, transaction_type : str, date : str,
                     quantity : float, price_per_unit : float, fees : float):
     """Adds a transaction to the transactions table."""
@@ -160,6 +521,39 @@ def add_transaction(asset_id : int, transaction_type : str, date : str,
     except sqlite3.Error as e:
         print(f"An error occurred in add_transaction: {e}")
 
+@invalidates
+def add_transactions_bulk(rows):
+    """Inserts many transactions in a single transaction.
+
+    rows is an iterable of (asset_id, transaction_type, date, quantity,
+    price_per_unit, fees) tuples. It may be a generator: executemany
+    consumes it lazily, so rows are validated and written as they stream
+    in, and everything is committed with one fsync at the end.
+
+    Returns the number of inserted rows, or None if the insert failed
+    (in which case nothing is written).
+    """
+
+    INSERT_TRANSACTION = """
+    INSERT INTO transactions (asset_id, transaction_type, 
+    date, quantity, price_per_unit, fees)
+    VALUES (?, ?, ?, ?, ?, ?);
+    """
+
+    inserted = None
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(INSERT_TRANSACTION, rows)
+            conn.commit()
+            inserted = cursor.rowcount
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in add_transactions_bulk: {e}")
+
+    return inserted
+
+@invalidates
 def add_price_to_history(asset_id : int, date : str, price : float):
     """Adds and EOD price to an asset's history."""
 
@@ -173,6 +567,7 @@ def add_price_to_history(asset_id : int, date : str, price : float):
             cursor = conn.cursor()
             parameters = (asset_id, date, price)
             cursor.execute(INSERT_PRICE_HISTORY, parameters)
+            refresh_price_stats(conn, [asset_id])
             print(f"""Added price:
                 Asset ID: {asset_id}
                 Date: {date}
@@ -183,6 +578,7 @@ def add_price_to_history(asset_id : int, date : str, price : float):
     except sqlite3.Error as e:
         print(f"An error occurred in add_price_to_history: {e}")
 
+@memoized
 def get_all_assets():
     """Read all the assets in the assets table."""
 
@@ -201,6 +597,7 @@ def get_all_assets():
         print(f"An error occurred in get_all_assets: {e}")
         return []
 
+@memoized
 def get_all_transactions_for_asset(asset_id : int):
     """Read all the transactions in the transactions table
     for a specific asset ID."""
@@ -221,14 +618,13 @@ def get_all_transactions_for_asset(asset_id : int):
         print(f"An error occurred in get_all_transactions_for_asset: {e}")
         return []
 
+@memoized
 def get_latest_price(asset_id : int):
     """Get the latest price for a specific asset ID."""
 
     SELECT_LATEST_PRICE_FOR_ASSET = """
-    SELECT price FROM price_history
-    WHERE price_history.asset_id = (?)
-    ORDER BY date DESC
-    LIMIT 1
+    SELECT latest_price AS price FROM price_stats
+    WHERE asset_id = (?);
     """
 
     try:
@@ -244,26 +640,157 @@ def get_latest_price(asset_id : int):
     except sqlite3.Error as e:
         print(f"An error occurred in get_latest_price: {e}")
 
+@memoized
+def get_price_stats(asset_id : int):
+    """Get the price statistics row for a specific asset ID: latest and
+    first date, latest price, all-time and 52-week range, row count.
+    Returns None if the asset has no price history."""
+
+    SELECT_PRICE_STATS = """
+    SELECT * FROM price_stats
+    WHERE asset_id = ?;
+    """
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            parameters = (asset_id,)
+            cursor.execute(SELECT_PRICE_STATS, parameters)
+
+            return cursor.fetchone()
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in get_price_stats: {e}")
+
+@memoized
 def calculate_holdings(asset_id : int):
-    """Get current holdings for a specific asset ID."""
+    """Get current holdings for a specific asset ID.
+    Reads the trigger-maintained holdings table, so the cost does not
+    grow with the number of transactions."""
+
+    SELECT_HOLDINGS_FOR_ASSET = """
+    SELECT quantity FROM holdings
+    WHERE asset_id = ?;
+    """
 
-    # Get all transactions for the asset
-    transactions = get_all_transactions_for_asset(asset_id)
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            parameters = (asset_id,)
+            cursor.execute(SELECT_HOLDINGS_FOR_ASSET, parameters)
 
-    # Count holdings in the transactions
-    total_holdings = 0
-    for transaction in transactions:
-        transaction_type = transaction["transaction_type"]
-        quantity = transaction["quantity"]
-        if transaction_type == "buy":
-            total_holdings += quantity
-        else:
-            total_holdings -= quantity
-    
-    return total_holdings
+            result = cursor.fetchone()
+
+            return result["quantity"] if result else 0
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in calculate_holdings: {e}")
+        return 0
+
+@memoized
+def get_holdings(asset_id : int):
+    """Get the full holdings row (quantity, cost totals, last transaction
+    date, ...) for a specific asset ID, or None if it has no transactions."""
+
+    SELECT_HOLDINGS_ROW = """
+    SELECT * FROM holdings
+    WHERE asset_id = ?;
+    """
 
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            parameters = (asset_id,)
+            cursor.execute(SELECT_HOLDINGS_ROW, parameters)
+
+            return cursor.fetchone()
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in get_holdings: {e}")
+
+@invalidates
+def rebuild_holdings():
+    """Recomputes the whole holdings table from the transactions ledger.
+    Only needed if the table was edited by hand or verify_holdings()
+    reports drift; the triggers keep it current otherwise."""
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM holdings;")
+            cursor.execute(f"INSERT INTO holdings {SELECT_HOLDINGS_FROM_LEDGER};")
+            conn.commit()
+            print(f"Rebuilt holdings for {cursor.rowcount} assets.")
+            return cursor.rowcount
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in rebuild_holdings: {e}")
+        raise e
+
+def verify_holdings(tolerance : float = 1e-6):
+    """Compares the holdings table against a full pass over the ledger.
+
+    Returns a list of mismatches, each a dict with asset_id, field,
+    expected (from the ledger) and actual (from holdings). An empty list
+    means the table is consistent.
+    """
+
+    FIELDS = ["quantity", "bought_quantity", "sold_quantity", "cost_total",
+              "proceeds_total", "fees_total", "transaction_count",
+              "last_transaction_date"]
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SELECT_HOLDINGS_FROM_LEDGER)
+            expected = {row["asset_id"]: row for row in cursor.fetchall()}
+            cursor.execute("SELECT * FROM holdings;")
+            actual = {row["asset_id"]: row for row in cursor.fetchall()}
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in verify_holdings: {e}")
+        raise e
+
+    mismatches = []
+    for asset_id in sorted(set(expected) | set(actual)):
+        expected_row = expected.get(asset_id)
+        actual_row = actual.get(asset_id)
+
+        for field in FIELDS:
+            expected_value = expected_row[field] if expected_row else None
+            actual_value = actual_row[field] if actual_row else None
+
+            if isinstance(expected_value, float) and isinstance(actual_value, (int, float)):
+                matches = abs(expected_value - actual_value) <= tolerance * max(1.0, abs(expected_value))
+            else:
+                matches = expected_value == actual_value
+
+            if not matches:
+                mismatches.append({
+                    "asset_id": asset_id,
+                    "field": field,
+                    "expected": expected_value,
+                    "actual": actual_value,
+                })
+
+    return mismatches
+
+def _has_every_rate(summary : dict):
+    return not any(data["fx_missing"] for data in summary.values())
+
+# A summary rendered without some rates is not shared with other workers;
+# the next request tries those rates again.
+@memoized
+@shared_cache.cached("INVESTMENT_DATABASE", DB_FILE, ttl=SHARED_CACHE_TTL, cache_if=_has_every_rate)
 def get_portfolio_summary():
-    """Gets a summary of all current holdings."""
+    """Gets a summary of all current holdings.
+    Reads one holdings row and one price_stats row per asset instead of
+    scanning the ledger and price history.
+
+    The DKK rates for every currency in the summary are resolved up front
+    from one rate-table read under one deadline (see utils.prefetch_rates).
+    Assets whose rate did not arrive in time get asset_dkk_price None and
+    fx_missing True."""
 
     PORTFOLIO_SUMMARY_QUERY = """
     SELECT
@@ -272,40 +799,39 @@ def get_portfolio_summary():
         a.name,
         a.asset_type,
         a.currency,
-        SUM(CASE WHEN t.transaction_type = 'buy' THEN COALESCE(t.quantity, 0) ELSE -COALESCE(t.quantity, 0) END) AS holdings,
-        ph.price      AS latest_price
-    FROM assets a
-    JOIN transactions t ON t.asset_id = a.id
-    LEFT JOIN (
-        SELECT ph1.asset_id, ph1.price
-        FROM price_history ph1
-        INNER JOIN (
-            SELECT asset_id, MAX(date) AS max_date
-            FROM price_history
-            GROUP BY asset_id
-        ) ph2 ON ph1.asset_id = ph2.asset_id AND ph1.date = ph2.max_date
-    ) ph ON ph.asset_id = a.id
-    GROUP BY a.id, a.symbol, a.name, a.asset_type, a.currency
-    HAVING holdings > 0;
+        h.quantity      AS holdings,
+        ps.latest_price AS latest_price,
+        ps.latest_date  AS latest_price_date,
+        ps.high_52w,
+        ps.low_52w
+    FROM holdings h
+    JOIN assets a ON a.id = h.asset_id
+    LEFT JOIN price_stats ps ON ps.asset_id = h.asset_id
+    WHERE h.quantity > ?;
     """
 
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(PORTFOLIO_SUMMARY_QUERY)
+            cursor.execute(PORTFOLIO_SUMMARY_QUERY, (HOLDINGS_EPSILON,))
             rows = cursor.fetchall()
     except sqlite3.Error as e:
         print(f"An error occurred in get_portfolio_summary: {e}")
         return {}
 
+    rates = prefetch_rates({row["currency"] for row in rows if row["latest_price"] is not None}, "DKK")
+
     holdings_dict = {}
     for row in rows:
         asset_currency = row["currency"]
         latest_price = row["latest_price"]
 
         asset_dkk_price = None
+        fx_missing = False
         if latest_price is not None:
-            asset_dkk_price = convert_currency(latest_price, asset_currency, "DKK")
+            rate = rates[asset_currency.upper()]
+            fx_missing = rate is None
+            asset_dkk_price = None if fx_missing else latest_price * rate
 
         holdings_dict[row["symbol"]] = {
             "asset_id"       : row["asset_id"],
@@ -314,12 +840,17 @@ def get_portfolio_summary():
             "latest_price"   : latest_price,
             "asset_currency" : asset_currency,
             "asset_dkk_price": asset_dkk_price,
+            "fx_missing"     : fx_missing,
             "asset_name"     : row["name"],
+            "latest_price_date": row["latest_price_date"],
+            "high_52w"       : row["high_52w"],
+            "low_52w"        : row["low_52w"],
         }
 
     return holdings_dict
 
 
+@memoized
 def get_portfolio_value():
     """Gets the total accumulated value of all current holdings."""
 
@@ -337,6 +868,7 @@ def get_portfolio_value():
 
     return total_value_dkk
 
+@memoized
 def get_asset_id_by_symbol(symbol : str):
     """Finds an asset's database ID based on its symbol."""
     
@@ -358,19 +890,47 @@ def get_asset_id_by_symbol(symbol : str):
     except sqlite3.Error as e:
         print(f"An error occurred in get_asset_id_by_symbol: {e}")
 
-def get_price_history(asset_id):
-    """Gets all registered prices for a single asset ID"""
+@memoized
+def get_asset_id_map():
+    """Returns a {symbol: asset_id} dict for every asset.
+
+    Bulk operations use this to resolve symbols with one query instead of
+    calling get_asset_id_by_symbol() for each row.
+    """
+
+    SELECT_ASSET_IDS = """
+    SELECT id, symbol FROM assets;
+    """
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SELECT_ASSET_IDS)
+
+            return {row["symbol"]: row["id"] for row in cursor.fetchall()}
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in get_asset_id_map: {e}")
+        return {}
+
+@memoized
+def get_price_history(asset_id, start : str = None, end : str = None):
+    """Gets the registered prices for a single asset ID, oldest first.
+    start and end (inclusive, YYYY-MM-DD) narrow it to a range scan on
+    the (asset_id, date) index."""
 
     SELECT_PRICE_HISTORY = """
     SELECT date, price FROM price_history
-    WHERE asset_id = ?
+    WHERE asset_id = :asset_id
+    AND date >= COALESCE(:start, '')
+    AND date <= COALESCE(:end, '9999-12-31')
     ORDER BY date ASC;
     """
 
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            parameters = (asset_id,)
+            parameters = {"asset_id": asset_id, "start": start, "end": end}
             cursor.execute(SELECT_PRICE_HISTORY, parameters)
 
             return cursor.fetchall()
@@ -378,13 +938,66 @@ def get_price_history(asset_id):
     except sqlite3.Error as e:
         print(f"An error occurred in get_price_history: {e}")
 
+# Concurrent identical batch reads in this process share one query
+_price_history_flight = SingleFlight()
+
+def get_price_histories(asset_ids, start : str = None, end : str = None):
+    """Gets the price histories of several assets with a single query.
+
+    Returns {asset_id: [(date, price), ...]} with each list oldest first;
+    assets without prices in the range map to an empty list.
+    Concurrent calls for the same ids and range (e.g. several users
+    opening the overview at once) are coalesced: one thread reads, the
+    others wait for its result. Treat the returned lists as read-only.
+    """
+
+    asset_ids = tuple(sorted(set(asset_ids)))
+    if not asset_ids:
+        return {}
+
+    placeholders = ", ".join("?" for _ in asset_ids)
+    SELECT_PRICE_HISTORIES = f"""
+    SELECT asset_id, date, price FROM price_history
+    WHERE asset_id IN ({placeholders})
+    AND date >= COALESCE(?, '')
+    AND date <= COALESCE(?, '9999-12-31')
+    ORDER BY asset_id, date ASC;
+    """
+
+    def load():
+        histories = {asset_id: [] for asset_id in asset_ids}
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = None
+                cursor.execute(SELECT_PRICE_HISTORIES, (*asset_ids, start, end))
+                for asset_id, day, price in cursor:
+                    histories[asset_id].append((day, price))
+
+        except sqlite3.Error as e:
+            print(f"An error occurred in get_price_histories: {e}")
+
+        return histories
+
+    db_path = current_app.config.get("INVESTMENT_DATABASE", DB_FILE) if has_app_context() else DB_FILE
+    return _price_history_flight.do((db_path, asset_ids, start, end), load)
+
+@invalidates
 def delete_asset_by_id(asset_id : int):
     """
     Deletes an asset and all assosiated transactions and price history.
     """
 
     DELETE_TRANSACTIONS = "DELETE FROM transactions WHERE asset_id = ?;"
+    DELETE_HOLDINGS = "DELETE FROM holdings WHERE asset_id = ?;"
     DELETE_PRICES = "DELETE FROM price_history WHERE asset_id = ?;"
+    DELETE_PRICE_STATS = "DELETE FROM price_stats WHERE asset_id = ?;"
+    DELETE_PNL = [
+        "DELETE FROM pnl_positions WHERE asset_id = ?;",
+        "DELETE FROM pnl_checkpoints WHERE asset_id = ?;",
+        "DELETE FROM realized_gains WHERE asset_id = ?;",
+        "DELETE FROM pnl_dirty WHERE asset_id = ?;",
+    ]
     DELETE_ASSET = "DELETE FROM assets WHERE id = ?;"
 
     try: 
@@ -393,7 +1006,11 @@ def delete_asset_by_id(asset_id : int):
 
             parameters = (asset_id,)
             cursor.execute(DELETE_TRANSACTIONS, parameters)
+            cursor.execute(DELETE_HOLDINGS, parameters)
             cursor.execute(DELETE_PRICES, parameters)
+            cursor.execute(DELETE_PRICE_STATS, parameters)
+            for statement in DELETE_PNL:
+                cursor.execute(statement, parameters)
             cursor.execute(DELETE_ASSET, parameters)
 
             conn.commit()
@@ -403,40 +1020,281 @@ def delete_asset_by_id(asset_id : int):
         print(f"An error occurred in delete_asset_by_id: {e}")
         raise e
 
-def get_all_transactions():
-    """Gets all transactions in the database, sorted by date descending."""
+# Transaction history, newest first, joined with the asset columns the
+# history page shows. {where} is filled in by _transaction_filters().
+SELECT_TRANSACTION_HISTORY = """
+SELECT transactions.id, assets.symbol, transactions.transaction_type,
+transactions.date, transactions.quantity, transactions.price_per_unit,
+transactions.fees, assets.asset_type, assets.currency
+FROM transactions
+JOIN assets ON transactions.asset_id = assets.id
+{where}
+ORDER BY transactions.date DESC, transactions.id DESC
+"""
+
+# Rows per fetchmany() when streaming the full history
+HISTORY_FETCH_SIZE = 500
+
+def _transaction_dict(row):
+    """Turns a SELECT_TRANSACTION_HISTORY row into the dict the history
+    page and API use. total_price includes fees for buys only."""
+
+    return {
+        "id": row["id"],
+        "symbol": row["symbol"],
+        "transaction_type": row["transaction_type"],
+        "date": row["date"],
+        "quantity": row["quantity"],
+        "price_per_unit": row["price_per_unit"],
+        "fees": row["fees"],
+        "asset_type": row["asset_type"],
+        "currency": row["currency"],
+        "total_price": row["quantity"] * row["price_per_unit"] + row["fees"] if row["transaction_type"] == "buy" else row["quantity"] * row["price_per_unit"]
+    }
+
+def _transaction_filters(symbol : str = None, transaction_type : str = None,
+                         start : str = None, end : str = None, after : tuple = None):
+    """Builds the WHERE clause and parameters for the history queries.
+
+    after is the (date, id) of the last row already shown; only older
+    rows are returned (keyset pagination).
+    """
+
+    clauses = []
+    parameters = {}
+
+    if symbol:
+        clauses.append("assets.symbol = :symbol")
+        parameters["symbol"] = symbol.upper()
+    if transaction_type:
+        clauses.append("transactions.transaction_type = :transaction_type")
+        parameters["transaction_type"] = transaction_type.lower()
+    if start:
+        clauses.append("transactions.date >= :start")
+        parameters["start"] = start
+    if end:
+        clauses.append("transactions.date <= :end")
+        parameters["end"] = end
+    if after:
+        clauses.append("(transactions.date, transactions.id) < (:after_date, :after_id)")
+        parameters["after_date"], parameters["after_id"] = after
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, parameters
+
+def _add_dkk_totals(transactions : list):
+    """Sets total_price_dkk on each transaction dict, converted at the
+    rate of the transaction's own date (see utils.convert_series).
+    Dates before any stored history fall back to today's rate; None if
+    no rate is available at all."""
+
+    by_currency = {}
+    for transaction in transactions:
+        by_currency.setdefault(transaction["currency"].upper(), []).append(transaction)
+
+    converted = {}
+    for currency, group in by_currency.items():
+        amounts = np.array([t["total_price"] for t in group], dtype=float)
+        converted[currency] = (amounts, convert_series(amounts, [t["date"] for t in group], currency, "DKK"))
+
+    # Today's rates for the gaps, from one rate-table read under the FX deadline
+    spots = prefetch_rates([currency for currency, (_, totals) in converted.items()
+                            if np.isnan(totals).any()], "DKK")
+
+    for currency, group in by_currency.items():
+        amounts, totals = converted[currency]
+        spot = spots.get(currency)
+        if spot is not None:
+            missing = np.isnan(totals)
+            totals[missing] = amounts[missing] * spot
+
+        for transaction, total in zip(group, totals.tolist()):
+            transaction["total_price_dkk"] = None if np.isnan(total) else total
+
+    return transactions
+
+@memoized
+def get_transactions_page(limit : int = 50, after : tuple = None, symbol : str = None,
+                          transaction_type : str = None, start : str = None, end : str = None,
+                          with_dkk : bool = False):
+    """Gets one page of the transaction history, newest first.
+
+    Pages are keyed on (date, id) instead of OFFSET, so every page costs
+    the same no matter how deep it is. Pass the returned next_cursor as
+    after to get the following page.
+
+    with_dkk adds total_price_dkk to each row. Rows without stored FX
+    history fall back to the current rate, which may have to be fetched,
+    so only ask for it where the value is shown (the JSON API).
+
+    Returns a dict:
+        transactions: list of dicts (same shape as get_all_transactions(),
+                      with total_price_dkk only if with_dkk)
+        next_cursor:  (date, id) of the last row, or None on the last page
+    """
+
+    where, parameters = _transaction_filters(symbol, transaction_type, start, end, after)
+    parameters["limit"] = limit + 1  # One extra row tells us if there is a next page
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SELECT_TRANSACTION_HISTORY.format(where=where) + " LIMIT :limit;", parameters)
+            rows = cursor.fetchall()
 
-    SELECT_ALL_TRANSACTIONS = """
-    SELECT transactions.id, assets.symbol, transactions.transaction_type,
-    transactions.date, transactions.quantity, transactions.price_per_unit,
-    transactions.fees, assets.asset_type, assets.currency
-    FROM transactions
-    JOIN assets ON transactions.asset_id = assets.id
-    ORDER BY transactions.date DESC;
+    except sqlite3.Error as e:
+        print(f"An error occurred in get_transactions_page: {e}")
+        rows = []
+
+    transactions = [_transaction_dict(row) for row in rows[:limit]]
+    if with_dkk:
+        _add_dkk_totals(transactions)
+    next_cursor = None
+    if len(rows) > limit and transactions:
+        next_cursor = (transactions[-1]["date"], transactions[-1]["id"])
+
+    return {"transactions": transactions, "next_cursor": next_cursor}
+
+def iter_transactions(symbol : str = None, transaction_type : str = None,
+                      start : str = None, end : str = None):
+    """Yields every matching transaction dict, newest first.
+
+    Rows are fetched HISTORY_FETCH_SIZE at a time, so a full export never
+    holds the whole ledger in memory. Used with a streamed template.
+    No FX conversion is done, so an export never waits on the rate
+    provider.
     """
 
+    where, parameters = _transaction_filters(symbol, transaction_type, start, end)
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SELECT_TRANSACTION_HISTORY.format(where=where) + ";", parameters)
+        while True:
+            rows = cursor.fetchmany(HISTORY_FETCH_SIZE)
+            if not rows:
+                break
+            yield from (_transaction_dict(row) for row in rows)
+
+@memoized
+def get_all_transactions():
+    """Gets all transactions in the database, sorted by date descending.
+    total_price_dkk is converted at each transaction's own date."""
+
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(SELECT_ALL_TRANSACTIONS)
+            cursor.execute(SELECT_TRANSACTION_HISTORY.format(where="") + ";")
             rows = cursor.fetchall()
 
-            return [
-                {
-                    "id": row["id"],
-                    "symbol": row["symbol"],
-                    "transaction_type": row["transaction_type"],
-                    "date": row["date"],
-                    "quantity": row["quantity"],
-                    "price_per_unit": row["price_per_unit"],
-                    "fees": row["fees"],
-                    "asset_type": row["asset_type"],
-                    "currency": row["currency"],
-                    "total_price": row["quantity"] * row["price_per_unit"] + row["fees"] if row["transaction_type"] == "buy" else row["quantity"] * row["price_per_unit"]
-                }
-                for row in rows
-            ]
+            return _add_dkk_totals([_transaction_dict(row) for row in rows])
 
     except sqlite3.Error as e:
         print(f"An error occurred in get_all_transactions: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def get_fx_rates(base : str):
+    """Gets the stored rate table for a base currency.
+    Returns {"rates": {...}, "fetched_at": unix time} or None."""
+
+    SELECT_FX_RATES = """
+    SELECT rates, fetched_at FROM fx_rates
+    WHERE base = ?;
+    """
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SELECT_FX_RATES, (base,))
+            row = cursor.fetchone()
+
+            return {"rates": json.loads(row["rates"]), "fetched_at": row["fetched_at"]} if row else None
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in get_fx_rates: {e}")
+
+@invalidates
+def save_fx_rates(base : str, rates : dict, fetched_at : float = None):
+    """Stores a freshly fetched rate table and ends any refresh claim."""
+
+    UPSERT_FX_RATES = """
+    INSERT INTO fx_rates (base, rates, fetched_at, refreshing_since)
+    VALUES (?, ?, ?, NULL)
+    ON CONFLICT(base) DO UPDATE SET
+        rates = excluded.rates,
+        fetched_at = excluded.fetched_at,
+        refreshing_since = NULL;
+    """
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            parameters = (base, json.dumps(rates), fetched_at or time.time())
+            cursor.execute(UPSERT_FX_RATES, parameters)
+            conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in save_fx_rates: {e}")
+
+def claim_fx_refresh(base : str, max_age : float, claim_timeout : float):
+    """Claims the right to refresh a stale rate table.
+
+    Succeeds for exactly one caller across all workers when the table is
+    older than max_age seconds and nobody has claimed it in the last
+    claim_timeout seconds. A failed refresh keeps its claim, so the
+    provider is retried at most once per claim_timeout.
+    Returns True if this caller should refresh.
+    """
+
+    CLAIM_FX_REFRESH = """
+    UPDATE fx_rates SET refreshing_since = :now
+    WHERE base = :base
+    AND fetched_at < :now - :max_age
+    AND (refreshing_since IS NULL OR refreshing_since < :now - :claim_timeout);
+    """
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            parameters = {"base": base, "now": time.time(),
+                          "max_age": max_age, "claim_timeout": claim_timeout}
+            cursor.execute(CLAIM_FX_REFRESH, parameters)
+            conn.commit()
+
+            return cursor.rowcount == 1
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in claim_fx_refresh: {e}")
+    return False
+
+@memoized
+def get_fx_history(base : str, quote : str):
+    """Gets the stored daily rates for one currency pair, oldest first.
+
+    Returns (dates, rates): a datetime64[D] array and a float array of
+    the same length, both empty if the pair has no history. The arrays
+    are shared by memoized callers, so treat them as read-only.
+    """
+
+    SELECT_FX_HISTORY = """
+    SELECT date, rate FROM fx_history
+    WHERE base = ? AND quote = ?
+    ORDER BY date;
+    """
+
+    rows = []
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(SELECT_FX_HISTORY, (base.upper(), quote.upper()))
+            rows = cursor.fetchall()
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in get_fx_history: {e}")
+
+    if not rows:
+        return np.empty(0, dtype="datetime64[D]"), np.empty(0)
+
+    dates, rates = zip(*rows)
+    return np.array(dates, dtype="datetime64[D]"), np.array(rates, dtype=float)
@@ -1,53 +1,427 @@
+import json
+import threading
+import time
+
 import requests
 import config
 
-from cachetools import TTLCache, cached
-from threading import RLock
+from flask import current_app, has_app_context
+from requests.adapters import HTTPAdapter
+
+from shared import metrics
+from shared.circuit_breaker import CircuitBreaker
+from shared.single_flight import SingleFlight
+
+# Module import (not "from .db import ..."): db imports this module
+# through utils, so the names are looked up when a function runs.
+from . import db
 
 # Get API key
 EXCHANGE_RATE_API_KEY = config.EXCHANGE_RATE_API_KEY
 BASE_URL = "https://v6.exchangerate-api.com/v6"
 
-# Cache up to 32 currencies, each entry expires after 1 hour.
-# lru_cache never expires, so rates would go stale if the server
-# runs for days without a restart.
-# The RLock makes the cache safe for concurrent WSGI threads.
-_exchange_rate_cache = TTLCache(maxsize=32, ttl=3600)
-_exchange_rate_lock = RLock()
+# Fetched rate tables are stored in the fx_rates table, so every worker
+# and every restart reads them from disk. Tables older than the TTL are
+# still served while one background refresh replaces them.
+EXCHANGE_RATE_TTL = 3600
+# How long a refresh claim blocks other refreshes; also the retry delay
+# after a failed refresh.
+REFRESH_CLAIM_TIMEOUT = 60
+
+# Only one table is fetched: rates from FX_BASE to every currency. Any
+# other pair is derived from it (see get_cross_rate), so a portfolio in
+# five currencies costs one API call and one stored row, not five.
+FX_BASE = "DKK"
+
+# One pooled session for every call, so connections (and their TLS
+# sessions) are kept alive and reused instead of set up per fetch.
+REQUEST_TIMEOUT = 5
+HTTP_POOL_SIZE = 4
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE))
+
+# Fails fast while the provider is down, backing off exponentially
+# between trial calls (see shared/circuit_breaker.py)
+_breaker = CircuitBreaker(failure_threshold=3, base_delay=5.0, max_delay=300.0)
+
+# A failed first fetch is remembered this long, so requests in between
+# get None at once instead of each asking the provider again. Separate
+# from (and much shorter than) the TTL of a good table.
+NEGATIVE_TTL = 30
+
+_failed_fetches = {}
+_failed_fetches_lock = threading.Lock()
+
+# Exported on /metrics (see shared/metrics.py)
+TABLE_READS = metrics.counter(
+    "fx_rate_table_reads_total", "Rate table reads: hit (fresh), stale (served, refresh claimed) or miss.",
+    ("result",))
+UPSTREAM_REQUESTS = metrics.counter(
+    "fx_upstream_requests_total",
+    "Calls to the rate provider, by outcome (rejected: circuit open; bad_response: unreadable body).",
+    ("outcome",))
+UPSTREAM_SECONDS = metrics.histogram(
+    "fx_upstream_request_duration_seconds", "Rate provider response time, by outcome.",
+    ("outcome",))
+
+# Background refreshes started by this process, by base currency
+_refreshes = {}
+_refreshes_lock = threading.Lock()
+
+# Concurrent first fetches of a table share one API call
+_fetch_flight = SingleFlight()
+
+def _request_rates(url: str, description: str):
+    """GETs a rates endpoint through the shared session and breaker.
+    Returns the conversion_rates dict or None.
 
-@cached(_exchange_rate_cache, lock=_exchange_rate_lock)
-def _get_exchange_rate_cached(base_currency: str):
-    """Internal cached implementation. Expects base_currency already uppercased."""
+    Only transport errors, timeouts, 5xx/429 answers and unreadable
+    bodies count against the breaker; an API-level error (say, an
+    unsupported currency) means the provider is up. The outcome is
+    recorded in a finally block, so an unexpected exception can never
+    leave a half-open breaker waiting for its trial call forever.
+    """
 
-    url = f"{BASE_URL}/{EXCHANGE_RATE_API_KEY}/latest/{base_currency}"
+    if not _breaker.allow():
+        UPSTREAM_REQUESTS.inc(outcome="rejected")
+        print(f"Skipping {description}: rate provider circuit is open.")
+        return None
 
+    healthy = False     # Set once the provider has answered sensibly
+    outcome = "transport_error"     # Narrowed as the call gets further
+    started = time.perf_counter()
     try:
-        response = requests.get(url, timeout=5)
+        response = _session.get(url, timeout=REQUEST_TIMEOUT)
+
+        if response.status_code >= 400:
+            outcome = f"http_{response.status_code}"
+            healthy = response.status_code < 500 and response.status_code != 429
         response.raise_for_status() # Check if request was successful
 
+        outcome = "bad_response"
         data = response.json()
 
         # The data looks like: {"result": "success", "conversion_rates": {"USD": 1, "DKK": 6.95, ...}}
         if data.get("result") == "success":
-            return data.get("conversion_rates")
+            rates = data["conversion_rates"]
+            if not isinstance(rates, dict):
+                raise TypeError("conversion_rates is not an object")
+            outcome = "ok"
+            healthy = True
+            return rates
         else:
-            print(f"Error: API call for exchange rates was not successful: {data.get('error-type', 'Unknown error')}")
+            outcome = "ok"
+            healthy = True
+            print(f"Error: API call for {description} was not successful: {data.get('error-type', 'Unknown error')}")
             return None
 
+    except requests.exceptions.HTTPError as e:
+        print(f"Error fetching {description}: {e}")
+        return None
+    # Before RequestException: requests' JSONDecodeError is both
+    except (AttributeError, KeyError, TypeError, ValueError):
+        print(f"Error parsing {description} API response.")
+        return None
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching exchange rates for {base_currency}: {e}")
+        print(f"Error fetching {description}: {e}")
+        return None
+    finally:
+        # Exactly once per call, whichever way it ended
+        UPSTREAM_REQUESTS.inc(outcome=outcome)
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+        if healthy:
+            _breaker.record_success()
+        else:
+            _breaker.record_failure()
+
+
+def rebase_rates(table: dict, base_currency: str):
+    """Turns {currency: units per 1 X} into units per 1 base_currency.
+    None if base_currency is not in the table."""
+
+    base_rate = table.get(base_currency.upper())
+    if not base_rate:
+        return None
+    return {currency: rate / base_rate for currency, rate in table.items()}
+
+
+class ExchangeRateApiProvider:
+    """exchangerate-api.com (v6), or anything speaking its protocol at
+    base_url, such as the local stub in fx_stub.py. Calls go through the
+    shared keep-alive session and circuit breaker."""
+
+    name = "exchangerate-api"
+
+    def __init__(self, base_url: str = BASE_URL, api_key: str = EXCHANGE_RATE_API_KEY):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+
+    def latest(self, base_currency: str):
+        url = f"{self.base_url}/{self.api_key}/latest/{base_currency.upper()}"
+        return _request_rates(url, f"exchange rates for {base_currency}")
+
+    def historical(self, base_currency: str, day: str):
+        year, month, day_of_month = (int(part) for part in day.split("-"))
+        url = f"{self.base_url}/{self.api_key}/history/{base_currency.upper()}/{year}/{month}/{day_of_month}"
+        return _request_rates(url, f"historical rates for {base_currency} on {day}")
+
+
+class FileRateProvider:
+    """Serves rates from a JSON file, for running offline and in tests.
+
+    Layout (history is optional):
+        {"base": "DKK",
+         "rates": {"DKK": 1, "USD": 0.145, ...},
+         "history": {"2024-01-02": {"DKK": 1, "USD": 0.147, ...}, ...}}
+
+    Other bases are derived from the file's by cross rates. The file is
+    read once, when the provider is created.
+    """
+
+    name = "file"
+
+    def __init__(self, path: str):
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+
+        self.path = path
+        self.base = data.get("base", FX_BASE).upper()
+        self.rates = {self.base: 1.0, **data["rates"]}
+        self.history = {day: {self.base: 1.0, **rates} for day, rates in data.get("history", {}).items()}
+
+    def latest(self, base_currency: str):
+        return rebase_rates(self.rates, base_currency)
+
+    def historical(self, base_currency: str, day: str):
+        table = self.history.get(day)
+        return rebase_rates(table, base_currency) if table else None
+
+
+# Providers by configuration, created on first use
+_providers = {}
+_providers_lock = threading.Lock()
+
+def get_provider():
+    """
+    Returns the rate provider the current app is configured for:
+        FX_PROVIDER = "exchangerate-api" (default), at FX_API_BASE_URL
+                      (default: the real service)
+        FX_PROVIDER = "file", reading FX_RATES_FILE
+    Scripts without an app context get the real service.
+    """
+
+    settings = current_app.config if has_app_context() else {}
+    kind = settings.get("FX_PROVIDER", ExchangeRateApiProvider.name)
+
+    if kind == ExchangeRateApiProvider.name:
+        key = (kind, settings.get("FX_API_BASE_URL", BASE_URL))
+        factory = lambda: ExchangeRateApiProvider(key[1])
+    elif kind == FileRateProvider.name:
+        key = (kind, settings["FX_RATES_FILE"])
+        factory = lambda: FileRateProvider(key[1])
+    else:
+        raise ValueError(f"Unknown FX_PROVIDER '{kind}'")
+
+    with _providers_lock:
+        if key not in _providers:
+            _providers[key] = factory()
+        return _providers[key]
+
+
+def _fetch_exchange_rate(base_currency: str):
+    """Gets the latest table from the configured provider.
+    Expects base_currency already uppercased."""
+
+    return get_provider().latest(base_currency)
+
+
+def fetch_historical_rates(base_currency: str, day: str):
+    """Gets one past day's table (YYYY-MM-DD) from the configured
+    provider. Returns {currency: units per 1 base_currency} or None."""
+
+    return get_provider().historical(base_currency, day)
+
+
+def _refresh(base_currency: str):
+    """Fetches and stores one rate table. Returns the rates or None."""
+
+    rates = _fetch_exchange_rate(base_currency)
+    if rates is not None:
+        db.save_fx_rates(base_currency, rates)
+    return rates
+
+
+def _refresh_in_background(base_currency: str):
+    """Starts a daemon thread that refreshes base_currency's table.
+
+    The thread gets its own app context for the current app, so it writes
+    to the same database as the request that started it.
+    """
+
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def run():
+        try:
+            if app is None:
+                _refresh(base_currency)
+            else:
+                with app.app_context():
+                    _refresh(base_currency)
+        finally:
+            with _refreshes_lock:
+                _refreshes.pop(base_currency, None)
+
+    thread = threading.Thread(target=run, name=f"fx-refresh-{base_currency}", daemon=True)
+    with _refreshes_lock:
+        if base_currency in _refreshes:
+            return _refreshes[base_currency]
+        _refreshes[base_currency] = thread
+    thread.start()
+    return thread
+
+
+def wait_for_refreshes(timeout: float = None):
+    """Blocks until this process's background refreshes have finished.
+    Used by tests and scripts that exit right after a read."""
+
+    with _refreshes_lock:
+        threads = list(_refreshes.values())
+    for thread in threads:
+        thread.join(timeout)
+
+
+def _fetch_coalesced(base_currency: str):
+    """Fetches and stores a table that has never been stored. Concurrent
+    callers in this process wait for one request instead of each
+    sending their own, and a failure is not retried for NEGATIVE_TTL
+    seconds."""
+
+    db_path = current_app.config.get("INVESTMENT_DATABASE", db.DB_FILE) if has_app_context() else db.DB_FILE
+    key = (db_path, base_currency)
+
+    with _failed_fetches_lock:
+        if _failed_fetches.get(key, 0) > time.monotonic():
+            return None
+
+    rates = _fetch_flight.do(key, lambda: _refresh(base_currency))
+
+    with _failed_fetches_lock:
+        if rates is None:
+            _failed_fetches[key] = time.monotonic() + NEGATIVE_TTL
+        else:
+            _failed_fetches.pop(key, None)
+    return rates
+
+
+def _fetch_with_deadline(base_currency: str, timeout: float):
+    """_fetch_coalesced() on a daemon thread, waiting at most timeout
+    seconds for it. A fetch still running at the deadline carries on, so
+    the table it stores is there for the next request."""
+
+    app = current_app._get_current_object() if has_app_context() else None
+    result = {}
+
+    def run():
+        if app is None:
+            result["rates"] = _fetch_coalesced(base_currency)
+        else:
+            with app.app_context():
+                result["rates"] = _fetch_coalesced(base_currency)
+
+    thread = threading.Thread(target=run, name=f"fx-fetch-{base_currency}", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return result.get("rates")
+
+
+def get_rate_table(timeout: float = None):
+    """
+    Returns the FX_BASE rate table, {currency: units per 1 FX_BASE},
+    or None if it has never been fetched and the API is unreachable.
+
+    A stored table is returned immediately, even when older than
+    EXCHANGE_RATE_TTL; a stale table triggers one background refresh
+    (claimed in the database, so only one worker fetches). Only the very
+    first read waits on the network, for at most timeout seconds if
+    given. Failed fetches are not stored.
+    """
+
+    stored = db.get_fx_rates(FX_BASE)
+    if stored is None:
+        TABLE_READS.inc(result="miss")
+        if timeout is None:
+            return _fetch_coalesced(FX_BASE)
+        return _fetch_with_deadline(FX_BASE, timeout)
+
+    # Only stale tables touch the claim, so fresh reads never write
+    stale = time.time() - stored["fetched_at"] > EXCHANGE_RATE_TTL
+    TABLE_READS.inc(result="stale" if stale else "hit")
+    if stale and db.claim_fx_refresh(FX_BASE, EXCHANGE_RATE_TTL, REFRESH_CLAIM_TIMEOUT):
+        _refresh_in_background(FX_BASE)
+
+    return stored["rates"]
+
+
+def cross_rate(table: dict, from_currency: str, to_currency: str):
+    """Units of to_currency per 1 from_currency from an FX_BASE table.
+    None if either currency is not in it."""
+
+    from_rate = table.get(from_currency.upper())
+    to_rate = table.get(to_currency.upper())
+    if not from_rate or to_rate is None:
         return None
-    except (KeyError, TypeError, ValueError):
-        print("Error parsing exchange rate API response.")
+
+    return to_rate / from_rate
+
+
+def get_cross_rate(from_currency: str, to_currency: str):
+    """Units of to_currency per 1 from_currency, derived from the single
+    FX_BASE table. None if either currency is unknown."""
+
+    table = get_rate_table()
+    if table is None:
         return None
 
+    return cross_rate(table, from_currency, to_currency)
+
 
 def get_exchange_rate(base_currency: str):
     """
-    Fetches all exchange rates for a given base currency
-    from ExchangeRate-API. Results are cached for 1 hour.
+    Returns all exchange rates for a given base currency,
+    {currency: units per 1 base_currency}, derived from the FX_BASE
+    table. None if the base is unknown or no table is available.
 
-    Normalizes base_currency to uppercase before the cache
-    key is computed, so 'usd' and 'USD' share the same entry.
+    Normalizes base_currency to uppercase, so 'usd' and 'USD' give
+    the same result.
     """
-    return _get_exchange_rate_cached(base_currency.upper())
\ No newline at end of file
+
+    table = get_rate_table()
+    if table is None:
+        return None
+
+    return rebase_rates(table, base_currency)
+
+
+def get_provider_status():
+    """Returns the rate provider's health as seen by this worker:
+    breaker state and counters, failed fetches still being backed off,
+    and the age of the stored FX_BASE table."""
+
+    now = time.monotonic()
+    with _failed_fetches_lock:
+        backing_off = [{"base": base, "retry_in": round(expires - now, 3)}
+                       for (_, base), expires in _failed_fetches.items() if expires > now]
+
+    stored = db.get_fx_rates(FX_BASE)
+    return {
+        "provider": get_provider().name,
+        "breaker": _breaker.state(),
+        "negative_cache": backing_off,
+        "table": {
+            "base": FX_BASE,
+            "stored": stored is not None,
+            "age_seconds": round(time.time() - stored["fetched_at"], 1) if stored else None,
+            "stale": stored is not None and time.time() - stored["fetched_at"] > EXCHANGE_RATE_TTL,
+        },
+    }
@@ -0,0 +1,124 @@
+import sqlite3
+import time
+
+from datetime import date, timedelta
+
+from .db import get_db_connection, invalidates
+from .external_api import fetch_historical_rates, FX_BASE
+from .price_ingest import DEFAULT_CHUNK_SIZE, MAX_REPORTED_REJECTIONS
+from .streams import chunks
+
+# Bulk loading of daily historical exchange rates into fx_history.
+#
+# Records are dicts with date, base, quote and rate (1 base = rate quote),
+# read from CSV/JSONL with price_ingest's readers or fetched day by day
+# from the rate provider. Existing (base, quote, date) rows are replaced.
+
+UPSERT_FX_HISTORY = """
+INSERT INTO fx_history (date, base, quote, rate)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(base, quote, date) DO UPDATE SET rate = excluded.rate;
+"""
+
+
+def parse_fx_rate(record):
+    """Validates one record and returns a (date, base, quote, rate) tuple.
+    Raises ValueError with a readable reason if the record is invalid."""
+
+    if not isinstance(record, dict):
+        raise ValueError("Record is not an object")
+
+    raw_date = str(record.get("date") or "").strip()
+    try:
+        rate_date = date.fromisoformat(raw_date[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date '{raw_date}' (expected YYYY-MM-DD)")
+
+    base = str(record.get("base") or "").strip().upper()
+    quote = str(record.get("quote") or "").strip().upper()
+    if len(base) != 3 or len(quote) != 3:
+        raise ValueError("base and quote must be 3-letter currency codes")
+    if base == quote:
+        raise ValueError("base and quote must differ")
+
+    try:
+        rate = float(record.get("rate"))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid rate")
+    if not rate > 0:
+        raise ValueError("Rate must be positive")
+
+    return (rate_date, base, quote, rate)
+
+
+def iter_provider_records(start : str, end : str, base_currency : str = FX_BASE, currencies=None):
+    """Yields fx_history records for every day in [start, end] from the
+    rate provider's history endpoint, one API call per day.
+
+    currencies limits the quotes stored (default: all the provider
+    returns). Days the provider cannot serve are skipped.
+    """
+
+    wanted = {c.upper() for c in currencies} if currencies else None
+    day = date.fromisoformat(start)
+    last = date.fromisoformat(end)
+
+    while day <= last:
+        rates = fetch_historical_rates(base_currency, day.isoformat()) or {}
+        for quote, rate in rates.items():
+            if quote == base_currency.upper() or (wanted and quote not in wanted):
+                continue
+            yield {"date": day.isoformat(), "base": base_currency, "quote": quote, "rate": rate}
+        day += timedelta(days=1)
+
+
+@invalidates
+def ingest_fx_history(records, chunk_size : int = DEFAULT_CHUNK_SIZE):
+    """Upserts a stream of daily rates into fx_history, one commit per
+    chunk, so memory use is bounded by the chunk size.
+
+    Returns a dict:
+        stored:          rows inserted or replaced
+        rejected:        [{"row": n, "reason": "..."}, ...]
+        rejected_count:  total number of rejected rows
+        seconds:         wall-clock time
+        error:           set only if a database write failed; chunks
+                         committed before the failure are kept
+    """
+
+    totals = {"stored": 0, "rejected_count": 0}
+    rejected = []
+
+    def valid_rows():
+        for row_number, record in enumerate(records, start=1):
+            try:
+                yield parse_fx_rate(record)
+            except ValueError as e:
+                totals["rejected_count"] += 1
+                if len(rejected) < MAX_REPORTED_REJECTIONS:
+                    rejected.append({"row": row_number, "reason": str(e)})
+
+    start = time.perf_counter()
+    error = None
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        # Caught here because get_db_connection() swallows errors raised inside it
+        try:
+            for chunk in chunks(valid_rows(), chunk_size):
+                cursor.executemany(UPSERT_FX_HISTORY, chunk)
+                conn.commit()
+                totals["stored"] += len(chunk)
+
+        except sqlite3.Error as e:
+            print(f"An error occurred in ingest_fx_history: {e}")
+            error = str(e)
+
+    result = dict(totals)
+    result["rejected"] = rejected
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    if error:
+        result["error"] = error
+
+    return result
@@ -0,0 +1,128 @@
+import json
+import random
+import re
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .external_api import rebase_rates
+
+# Local stand-in for exchangerate-api.com, for benchmarks and offline
+# tests. It answers the same two endpoints the live provider calls:
+#   /v6/<key>/latest/<BASE>
+#   /v6/<key>/history/<BASE>/<year>/<month>/<day>
+# from a fixed rate table, with optional latency and injected errors.
+#
+# Point the app at it with:
+#   app.config["FX_API_BASE_URL"] = stub.base_url
+#
+# Usage:
+#   with StubRateServer(latency=0.2, error_rate=0.1) as stub:
+#       ...
+#       print(stub.calls)
+
+DEFAULT_RATES = {"DKK": 1.0, "USD": 0.145, "EUR": 0.134, "SEK": 1.55, "NOK": 1.57, "GBP": 0.115}
+
+_LATEST = re.compile(r"^/v6/[^/]+/latest/([A-Za-z]{3})$")
+_HISTORY = re.compile(r"^/v6/[^/]+/history/([A-Za-z]{3})/\d{4}/\d{1,2}/\d{1,2}$")
+
+
+class StubRateServer:
+    """Serves rates on 127.0.0.1 from a background thread.
+
+    rates:      {currency: units per 1 DKK}; other bases are derived.
+    latency:    seconds added before every answer.
+    error_rate: fraction of requests answered with HTTP 503.
+    All three can be changed while the server runs.
+    """
+
+    def __init__(self, rates : dict = None, latency : float = 0.0, error_rate : float = 0.0, seed : int = 42):
+        self.rates = dict(rates or DEFAULT_RATES)
+        self.latency = latency
+        self.error_rate = error_rate
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "errors": 0}
+        self._server = None
+        self._thread = None
+
+    @property
+    def calls(self):
+        """Requests received so far, including failed ones."""
+
+        with self._lock:
+            return self._stats["calls"]
+
+    @property
+    def errors(self):
+        """Requests answered with an injected error."""
+
+        with self._lock:
+            return self._stats["errors"]
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v6"
+
+    def _answer(self, path : str):
+        """Returns (status, body dict) for one request."""
+
+        with self._lock:
+            self._stats["calls"] += 1
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self._stats["errors"] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return 503, {"result": "error", "error-type": "injected"}
+
+        match = _LATEST.match(path) or _HISTORY.match(path)
+        if not match:
+            return 404, {"result": "error", "error-type": "not-found"}
+
+        rates = rebase_rates(self.rates, match.group(1))
+        if rates is None:
+            return 200, {"result": "error", "error-type": "unsupported-code"}
+        return 200, {"result": "success", "base_code": match.group(1).upper(), "conversion_rates": rates}
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # Keep-alive, like the real service
+
+            def do_GET(self):
+                status, body = stub._answer(self.path)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fx-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join(5)
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,388 @@
+import json
+import sqlite3
+
+from .db import get_db_connection, HOLDINGS_EPSILON
+from .utils import prefetch_rates
+
+# Lot matching methods. Both are kept up to date for every asset, so
+# switching between them on the dashboard costs nothing.
+METHODS = ("fifo", "average")
+
+# A checkpoint of the lot state is stored every this many transactions
+# per asset. A change dated inside the history replays at most this many
+# transactions before reaching the changed date.
+CHECKPOINT_INTERVAL = 250
+
+SELECT_DIRTY = """
+SELECT asset_id, from_date FROM pnl_dirty;
+"""
+
+# Latest state strictly before from_date: the stored position if it is old
+# enough, otherwise the newest checkpoint before that date
+SELECT_START_STATE = """
+SELECT * FROM (
+    SELECT last_date, last_transaction_id, quantity, cost_basis,
+           realized_gain, transaction_count, lots
+    FROM pnl_positions
+    WHERE asset_id = :asset_id AND method = :method AND last_date < :from_date
+    UNION ALL
+    SELECT last_date, last_transaction_id, quantity, cost_basis,
+           realized_gain, transaction_count, lots
+    FROM pnl_checkpoints
+    WHERE asset_id = :asset_id AND method = :method AND last_date < :from_date
+)
+ORDER BY last_date DESC, last_transaction_id DESC
+LIMIT 1;
+"""
+
+# Transactions after the start state, in replay order
+SELECT_REPLAY_TRANSACTIONS = """
+SELECT id, transaction_type, date, quantity, price_per_unit, COALESCE(fees, 0) AS fees
+FROM transactions
+WHERE asset_id = :asset_id AND (date, id) > (:last_date, :last_transaction_id)
+ORDER BY date, id;
+"""
+
+DELETE_STALE_CHECKPOINTS = """
+DELETE FROM pnl_checkpoints
+WHERE asset_id = :asset_id AND method = :method
+AND (last_date, last_transaction_id) > (:last_date, :last_transaction_id);
+"""
+
+DELETE_STALE_REALIZED = """
+DELETE FROM realized_gains
+WHERE asset_id = :asset_id AND method = :method
+AND (date, transaction_id) > (:last_date, :last_transaction_id);
+"""
+
+INSERT_REALIZED = """
+INSERT OR REPLACE INTO realized_gains (transaction_id, method, asset_id, date,
+                                       quantity, proceeds, cost_basis, gain)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+"""
+
+INSERT_CHECKPOINT = """
+INSERT OR REPLACE INTO pnl_checkpoints (asset_id, method, last_date, last_transaction_id,
+                                        quantity, cost_basis, realized_gain,
+                                        transaction_count, lots)
+VALUES (:asset_id, :method, :last_date, :last_transaction_id,
+        :quantity, :cost_basis, :realized_gain, :transaction_count, :lots);
+"""
+
+UPSERT_POSITION = """
+INSERT OR REPLACE INTO pnl_positions (asset_id, method, last_date, last_transaction_id,
+                                      quantity, cost_basis, realized_gain,
+                                      transaction_count, lots)
+VALUES (:asset_id, :method, :last_date, :last_transaction_id,
+        :quantity, :cost_basis, :realized_gain, :transaction_count, :lots);
+"""
+
+DELETE_POSITION = """
+DELETE FROM pnl_positions WHERE asset_id = :asset_id AND method = :method;
+"""
+
+SELECT_POSITIONS = """
+SELECT p.asset_id, p.quantity, p.cost_basis, p.realized_gain,
+       a.symbol, a.name, a.currency,
+       ps.latest_price, ps.latest_date AS latest_price_date
+FROM pnl_positions p
+JOIN assets a ON a.id = p.asset_id
+LEFT JOIN price_stats ps ON ps.asset_id = p.asset_id
+WHERE p.method = ?
+ORDER BY a.symbol;
+"""
+
+
+def _buy(lots : list, method : str, quantity : float, unit_cost : float):
+    """Adds a purchase to the open lots (in place)."""
+
+    if method == "fifo":
+        lots.append([quantity, unit_cost])
+    elif lots:
+        held, average = lots[0]
+        total = held + quantity
+        lots[0] = [total, (held * average + quantity * unit_cost) / total]
+    else:
+        lots.append([quantity, unit_cost])
+
+
+def _sell(lots : list, method : str, quantity : float):
+    """Removes quantity from the open lots (in place) and returns
+    (matched quantity, cost basis of the matched quantity).
+
+    Selling more than is held matches only what is held; the ledger has
+    no notion of short positions.
+    """
+
+    matched = 0.0
+    cost = 0.0
+    remaining = quantity
+
+    if method == "average":
+        if lots:
+            held, average = lots[0]
+            matched = min(held, remaining)
+            cost = matched * average
+            if held - matched > HOLDINGS_EPSILON:
+                lots[0] = [held - matched, average]
+            else:
+                lots.clear()
+        return matched, cost
+
+    while remaining > HOLDINGS_EPSILON and lots:
+        lot_quantity, unit_cost = lots[0]
+        taken = min(lot_quantity, remaining)
+        matched += taken
+        cost += taken * unit_cost
+        remaining -= taken
+        if lot_quantity - taken > HOLDINGS_EPSILON:
+            lots[0][0] = lot_quantity - taken
+        else:
+            lots.pop(0)
+
+    return matched, cost
+
+
+def _recompute_asset(conn, asset_id : int, from_date : str, method : str):
+    """Replays one asset's transactions from from_date onward.
+
+    Starts from the latest stored state before from_date (the position
+    itself when only later transactions changed, else a checkpoint), so
+    adding a trade at the end of the ledger replays just that trade.
+    Returns the number of transactions replayed.
+    """
+
+    key = {"asset_id": asset_id, "method": method, "from_date": from_date}
+    start = conn.execute(SELECT_START_STATE, key).fetchone()
+
+    if start:
+        state = {
+            "last_date": start["last_date"],
+            "last_transaction_id": start["last_transaction_id"],
+            "realized_gain": start["realized_gain"],
+            "transaction_count": start["transaction_count"],
+        }
+        lots = json.loads(start["lots"])
+    else:
+        state = {"last_date": "", "last_transaction_id": 0,
+                 "realized_gain": 0.0, "transaction_count": 0}
+        lots = []
+
+    position = {"asset_id": asset_id, "method": method,
+                "last_date": state["last_date"],
+                "last_transaction_id": state["last_transaction_id"]}
+    conn.execute(DELETE_STALE_CHECKPOINTS, position)
+    conn.execute(DELETE_STALE_REALIZED, position)
+
+    def snapshot():
+        return {
+            **state,
+            "asset_id": asset_id,
+            "method": method,
+            "quantity": sum(lot[0] for lot in lots),
+            "cost_basis": sum(lot[0] * lot[1] for lot in lots),
+            "lots": json.dumps(lots),
+        }
+
+    realized_rows = []
+    replayed = 0
+    for row in conn.execute(SELECT_REPLAY_TRANSACTIONS, position):
+        quantity = row["quantity"]
+        if row["transaction_type"] == "buy":
+            # A buy of nothing (older rows, before the form rejected them)
+            # adds no lot; there is no unit to carry its cost
+            if quantity > 0:
+                _buy(lots, method, quantity, (quantity * row["price_per_unit"] + row["fees"]) / quantity)
+        else:
+            matched, cost = _sell(lots, method, quantity)
+            proceeds = quantity * row["price_per_unit"] - row["fees"]
+            realized_rows.append((row["id"], method, asset_id, row["date"],
+                                  quantity, proceeds, cost, proceeds - cost))
+            state["realized_gain"] += proceeds - cost
+
+        state["last_date"] = row["date"]
+        state["last_transaction_id"] = row["id"]
+        state["transaction_count"] += 1
+        replayed += 1
+
+        if state["transaction_count"] % CHECKPOINT_INTERVAL == 0:
+            conn.execute(INSERT_CHECKPOINT, snapshot())
+
+    conn.executemany(INSERT_REALIZED, realized_rows)
+
+    if state["transaction_count"]:
+        conn.execute(UPSERT_POSITION, snapshot())
+    else:
+        conn.execute(DELETE_POSITION, key)
+
+    return replayed
+
+
+def refresh_pnl():
+    """Brings P&L up to date for every asset whose ledger changed.
+
+    The transaction triggers record the earliest changed date per asset
+    in pnl_dirty; each such asset is replayed from that date for every
+    method in one database transaction. Cheap when nothing changed.
+    Returns the number of transactions replayed (per method).
+    """
+
+    replayed = 0
+    try:
+        with get_db_connection() as conn:
+            # Unlocked peek first, so the common nothing-changed case
+            # never waits for the write lock
+            if not conn.execute(SELECT_DIRTY).fetchall():
+                return 0
+
+            # Read the marks again under the write lock: a trade committed
+            # by another thread after the peek would otherwise be marked
+            # dirty and then cleared by the DELETE below without a replay
+            conn.execute("BEGIN IMMEDIATE;")
+            dirty = conn.execute(SELECT_DIRTY).fetchall()
+
+            for row in dirty:
+                for method in METHODS:
+                    count = _recompute_asset(conn, row["asset_id"], row["from_date"], method)
+                replayed += count
+            conn.execute("DELETE FROM pnl_dirty;")
+            conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in refresh_pnl: {e}")
+        raise e
+
+    return replayed
+
+
+def rebuild_pnl():
+    """Recomputes P&L for every asset from its first transaction.
+    Only needed if the P&L tables were edited by hand."""
+
+    try:
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM pnl_positions;")
+            conn.execute("DELETE FROM pnl_checkpoints;")
+            conn.execute("DELETE FROM realized_gains;")
+            conn.execute("""
+                INSERT OR REPLACE INTO pnl_dirty (asset_id, from_date)
+                SELECT asset_id, MIN(date) FROM transactions GROUP BY asset_id;
+            """)
+            conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in rebuild_pnl: {e}")
+        raise e
+
+    return refresh_pnl()
+
+
+def get_pnl_summary(method : str = "fifo", target_currency : str = "DKK"):
+    """Cost basis and realized/unrealized gains per asset.
+
+    Amounts are in the asset's currency except the *_dkk fields, which
+    use the current exchange rate. Assets whose currency cannot be
+    converted get None in those fields and are left out of the totals.
+
+    Returns a dict:
+        method, currency,
+        assets: {symbol: {asset_id, quantity, average_cost, cost_basis,
+                          latest_price, realized_gain, unrealized_gain,
+                          market_value_dkk, cost_basis_dkk,
+                          realized_gain_dkk, unrealized_gain_dkk}},
+        totals: {market_value, cost_basis, realized_gain, unrealized_gain}
+    """
+
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'. Use one of: {', '.join(METHODS)}.")
+
+    refresh_pnl()
+
+    try:
+        with get_db_connection() as conn:
+            rows = conn.execute(SELECT_POSITIONS, (method,)).fetchall()
+    except sqlite3.Error as e:
+        print(f"An error occurred in get_pnl_summary: {e}")
+        rows = []
+
+    # One rate-table read under the FX deadline for every currency held
+    factors = prefetch_rates({row["currency"] for row in rows}, target_currency)
+    totals = {"market_value": 0.0, "cost_basis": 0.0, "realized_gain": 0.0, "unrealized_gain": 0.0}
+    assets = {}
+
+    for row in rows:
+        currency = row["currency"]
+        factor = factors[currency.upper()]
+
+        quantity = row["quantity"] if row["quantity"] > HOLDINGS_EPSILON else 0.0
+        cost_basis = row["cost_basis"] if quantity else 0.0
+        latest_price = row["latest_price"]
+
+        unrealized = None
+        market_value = None
+        if latest_price is not None:
+            market_value = quantity * latest_price
+            unrealized = market_value - cost_basis
+
+        def in_target(amount):
+            return amount * factor if amount is not None and factor is not None else None
+
+        entry = {
+            "asset_id": row["asset_id"],
+            "name": row["name"],
+            "currency": currency,
+            "quantity": quantity,
+            "average_cost": cost_basis / quantity if quantity else None,
+            "cost_basis": cost_basis,
+            "latest_price": latest_price,
+            "latest_price_date": row["latest_price_date"],
+            "realized_gain": row["realized_gain"],
+            "unrealized_gain": unrealized,
+            "market_value_dkk": in_target(market_value),
+            "cost_basis_dkk": in_target(cost_basis),
+            "realized_gain_dkk": in_target(row["realized_gain"]),
+            "unrealized_gain_dkk": in_target(unrealized),
+        }
+        assets[row["symbol"]] = entry
+
+        if factor is not None:
+            totals["cost_basis"] += entry["cost_basis_dkk"]
+            totals["realized_gain"] += entry["realized_gain_dkk"]
+            if market_value is not None:
+                totals["market_value"] += entry["market_value_dkk"]
+                totals["unrealized_gain"] += entry["unrealized_gain_dkk"]
+
+    return {
+        "method": method,
+        "currency": target_currency,
+        "assets": assets,
+        "totals": totals,
+    }
+
+
+def get_realized_gains(method : str = "fifo", asset_id : int = None):
+    """Lists realized gains per sell (newest first), optionally for one asset.
+    Amounts are in the asset's currency."""
+
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'. Use one of: {', '.join(METHODS)}.")
+
+    refresh_pnl()
+
+    SELECT_REALIZED = """
+    SELECT r.transaction_id, r.date, a.symbol, a.currency,
+           r.quantity, r.proceeds, r.cost_basis, r.gain
+    FROM realized_gains r
+    JOIN assets a ON a.id = r.asset_id
+    WHERE r.method = ? AND (? IS NULL OR r.asset_id = ?)
+    ORDER BY r.date DESC, r.transaction_id DESC;
+    """
+
+    try:
+        with get_db_connection() as conn:
+            rows = conn.execute(SELECT_REALIZED, (method, asset_id, asset_id)).fetchall()
+            return [dict(row) for row in rows]
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in get_realized_gains: {e}")
+        return []
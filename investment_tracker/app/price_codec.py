@@ -0,0 +1,87 @@
+import gzip
+import struct
+
+import numpy as np
+
+# Columnar price-history payload, served instead of JSON when the client
+# sends Accept: application/x-price-columns (or ?format=columnar).
+#
+# Layout, all little-endian:
+#   header:      b"PHC1", uint32 series count
+#   per series:  int32 asset_id, uint32 point count n,
+#                n x float64 price,
+#                n x int32 day (days since 1970-01-01),
+#                zero padding to a multiple of 8 bytes
+# Every float64 block starts on an 8-byte boundary, so browsers can wrap
+# it in a Float64Array without copying.
+COLUMNAR_MIMETYPE = "application/x-price-columns"
+MAGIC = b"PHC1"
+
+# Bodies smaller than this are not worth gzipping
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+
+_HEADER = struct.Struct("<4sI")
+_SERIES_HEADER = struct.Struct("<iI")
+
+
+def encode_price_columns(histories : dict):
+    """Packs {asset_id: [(date, price), ...]} into the columnar format.
+
+    Dates are ISO strings; NumPy parses them all at once into day
+    numbers, so there is no per-row Python work besides building the
+    input arrays.
+    """
+
+    parts = [_HEADER.pack(MAGIC, len(histories))]
+
+    for asset_id, rows in histories.items():
+        count = len(rows)
+        parts.append(_SERIES_HEADER.pack(int(asset_id), count))
+        if not count:
+            continue
+
+        dates, prices = zip(*rows)
+        parts.append(np.asarray(prices, dtype="<f8").tobytes())
+        parts.append(np.asarray(dates, dtype="datetime64[D]").astype("<i4").tobytes())
+        if count % 2:
+            parts.append(b"\0" * 4)
+
+    return b"".join(parts)
+
+
+def decode_price_columns(payload : bytes):
+    """Unpacks the columnar format into {asset_id: (days, prices)} with
+    days as a datetime64[D] array and prices as a float64 array."""
+
+    magic, series_count = _HEADER.unpack_from(payload, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a columnar price-history payload")
+
+    offset = _HEADER.size
+    histories = {}
+    for _ in range(series_count):
+        asset_id, count = _SERIES_HEADER.unpack_from(payload, offset)
+        offset += _SERIES_HEADER.size
+
+        prices = np.frombuffer(payload, dtype="<f8", count=count, offset=offset)
+        offset += 8 * count
+        days = np.frombuffer(payload, dtype="<i4", count=count, offset=offset)
+        offset += 4 * count + (4 if count % 2 else 0)
+
+        histories[asset_id] = (days.astype("datetime64[D]"), prices)
+
+    return histories
+
+
+def maybe_gzip(payload : bytes, accept_encodings):
+    """Returns (body, content_encoding). Compresses when the client
+    accepts gzip and the payload is large enough to benefit.
+
+    accept_encodings is the parsed Accept-Encoding header
+    (request.accept_encodings), so "gzip;q=0" counts as a refusal.
+    """
+
+    if len(payload) >= GZIP_MIN_BYTES and accept_encodings["gzip"] > 0:
+        return gzip.compress(payload, compresslevel=GZIP_LEVEL), "gzip"
+    return payload, None
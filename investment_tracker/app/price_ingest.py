@@ -0,0 +1,219 @@
+import csv
+import json
+import math
+import sqlite3
+import time
+
+from datetime import date
+
+from .db import get_db_connection, get_asset_id_map, refresh_price_stats, invalidates
+from .streams import text_stream, chunks
+
+# Rows per upsert batch. Each batch is one executemany and one commit,
+# so memory use is bounded by the chunk size, not by the input size.
+DEFAULT_CHUNK_SIZE = 5000
+
+# Keys per existence lookup. Two parameters per key keeps each query well
+# under SQLite's older 999-variable limit.
+_LOOKUP_BATCH = 400
+
+# Only the first rejected rows are returned in full; the rest are counted.
+MAX_REPORTED_REJECTIONS = 500
+
+UPSERT_PRICE = """
+INSERT INTO price_history (asset_id, date, price)
+VALUES (?, ?, ?)
+ON CONFLICT(asset_id, date) DO UPDATE SET price = excluded.price
+WHERE price_history.price IS NOT excluded.price;
+"""
+
+
+def iter_csv_records(stream):
+    """Yields one dict per CSV row (columns: symbol or asset_id, date, price)."""
+
+    yield from csv.DictReader(text_stream(stream))
+
+
+def iter_jsonl_records(stream):
+    """Yields one dict per JSON line. Blank lines are skipped.
+
+    Lines that are not valid JSON are yielded as their raw text, so the
+    ingest reports them as rejected instead of aborting the whole file.
+    """
+
+    for line in text_stream(stream):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line
+
+
+def iter_records(stream, fmt : str):
+    """Picks the reader for fmt ("csv" or "jsonl")."""
+
+    if fmt == "csv":
+        return iter_csv_records(stream)
+    if fmt in ("jsonl", "ndjson"):
+        return iter_jsonl_records(stream)
+    raise ValueError(f"Unsupported format '{fmt}' (use csv or jsonl)")
+
+
+def parse_price(record, asset_ids : dict, known_ids : set):
+    """Validates one record and returns an (asset_id, date, price) tuple.
+
+    The asset can be given as "symbol" or "asset_id".
+    Raises ValueError with a readable reason if the record is invalid.
+    """
+
+    if not isinstance(record, dict):
+        raise ValueError("Record is not an object")
+
+    symbol = str(record.get("symbol") or "").strip().upper()
+    if symbol:
+        asset_id = asset_ids.get(symbol)
+        if asset_id is None:
+            raise ValueError(f"Unknown symbol '{symbol}'")
+    else:
+        try:
+            asset_id = int(record.get("asset_id"))
+        except (TypeError, ValueError):
+            raise ValueError("Missing symbol or asset_id")
+        if asset_id not in known_ids:
+            raise ValueError(f"Unknown asset_id {asset_id}")
+
+    raw_date = str(record.get("date") or "").strip()
+    try:
+        price_date = date.fromisoformat(raw_date[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date '{raw_date}' (expected YYYY-MM-DD)")
+
+    try:
+        price = float(record.get("price"))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid price")
+    if not math.isfinite(price):
+        raise ValueError("Price must be a finite number")
+    if price < 0:
+        raise ValueError("Price cannot be negative")
+
+    return (asset_id, price_date, price)
+
+
+def _count_existing(cursor, keys : list):
+    """Counts how many (asset_id, date) keys already exist in price_history."""
+
+    existing = 0
+    for start in range(0, len(keys), _LOOKUP_BATCH):
+        batch = keys[start:start + _LOOKUP_BATCH]
+        placeholders = ", ".join(["(?, ?)"] * len(batch))
+        parameters = [value for key in batch for value in key]
+        cursor.execute(
+            f"SELECT COUNT(*) FROM price_history WHERE (asset_id, date) IN (VALUES {placeholders});",
+            parameters,
+        )
+        existing += cursor.fetchone()[0]
+    return existing
+
+
+@invalidates
+def ingest_prices(records, chunk_size : int = DEFAULT_CHUNK_SIZE):
+    """Upserts a stream of EOD prices into price_history.
+
+    records is any iterable of dicts, typically a generator from
+    iter_records(). Rows are validated as they arrive and written in
+    chunks with INSERT ... ON CONFLICT(asset_id, date) DO UPDATE, one
+    commit per chunk. Only one chunk is held in memory at a time.
+    price_stats is refreshed once per touched asset at the end.
+
+    Returns a dict:
+        inserted:        new (asset_id, date) rows
+        updated:         existing rows whose price changed
+        unchanged:       existing rows that already had the same price
+        rejected:        [{"row": n, "reason": "..."}, ...]
+        rejected_count:  total number of rejected rows
+        seconds:         wall-clock time
+        rows_per_second: accepted rows per second
+        error:           set only if a database write failed; chunks
+                         committed before the failure are kept
+    """
+
+    asset_ids = get_asset_id_map()
+    known_ids = set(asset_ids.values())
+
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "rejected_count": 0}
+    rejected = []
+
+    def valid_rows():
+        # Row numbers are 1-based, counting data rows only
+        for row_number, record in enumerate(records, start=1):
+            try:
+                yield parse_price(record, asset_ids, known_ids)
+            except ValueError as e:
+                totals["rejected_count"] += 1
+                if len(rejected) < MAX_REPORTED_REJECTIONS:
+                    rejected.append({"row": row_number, "reason": str(e)})
+
+    start = time.perf_counter()
+    error = None
+    touched = set()
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        # Caught here rather than around the with block, because
+        # get_db_connection() reports and swallows errors raised inside it
+        try:
+            for chunk in chunks(valid_rows(), chunk_size):
+                # The last price for a key within a chunk wins, as it would
+                # if the rows were applied one by one
+                unique = {(asset_id, day): price for asset_id, day, price in chunk}
+                keys = list(unique)
+
+                existing = _count_existing(cursor, keys)
+                cursor.executemany(
+                    UPSERT_PRICE,
+                    ((asset_id, day, price) for (asset_id, day), price in unique.items()),
+                )
+                # rowcount counts inserts plus updates that changed the price
+                changed = cursor.rowcount
+                conn.commit()
+                touched.update(asset_id for asset_id, _ in keys)
+
+                inserted = len(keys) - existing
+                updated = changed - inserted
+                totals["inserted"] += inserted
+                totals["updated"] += updated
+                totals["unchanged"] += existing - updated
+
+        except sqlite3.Error as e:
+            print(f"An error occurred in ingest_prices: {e}")
+            error = str(e)
+
+        finally:
+            # price_stats scans an asset's whole history, so it is refreshed
+            # once per touched asset after the last chunk rather than after
+            # every chunk (which made a long backfill quadratic). It also
+            # runs when the input breaks off, for the chunks already
+            # committed; the stats trail the history only during an ingest.
+            conn.rollback()     # Any half-written chunk
+            try:
+                refresh_price_stats(conn, touched)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"An error occurred in ingest_prices: {e}")
+                error = error or str(e)
+
+    seconds = time.perf_counter() - start
+    accepted = totals["inserted"] + totals["updated"] + totals["unchanged"]
+
+    result = dict(totals)
+    result["rejected"] = rejected
+    result["seconds"] = round(seconds, 4)
+    result["rows_per_second"] = round(accepted / seconds, 1) if seconds > 0 else 0.0
+    if error:
+        result["error"] = error
+
+    return result
@@ -1,15 +1,243 @@
-from flask import Blueprint, jsonify
+import csv
 
-from .db import get_price_history
+from datetime import date, timedelta
+
+from flask import Blueprint, Response, jsonify, request
+
+from .db import get_price_history, get_price_histories, get_transactions_page
+from .bulk_import import import_transactions
+from .price_ingest import ingest_prices, iter_records, DEFAULT_CHUNK_SIZE
+from .timeseries import portfolio_value_series, downsample_price_history
+from .price_codec import COLUMNAR_MIMETYPE, encode_price_columns, maybe_gzip
+from .pnl import get_pnl_summary, get_realized_gains
+from .utils import parse_history_args, HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE
+from .external_api import get_provider_status
 
 # Define the blueprint
 api = Blueprint('investment_api', __name__)
 
+# Most assets one batch price-history request may ask for
+MAX_BATCH_ASSETS = 100
+
+# Longest range one portfolio-value request may span. The series holds
+# days x assets float matrices, so an open-ended range could exhaust a Pi.
+MAX_SERIES_DAYS = 3660
+
+def _price_history_args():
+    """Reads start, end and max_points from the query string.
+    Returns (start, end, max_points, error_response)."""
+
+    try:
+        start = request.args.get("start")
+        end = request.args.get("end")
+        start = date.fromisoformat(start).isoformat() if start else None
+        end = date.fromisoformat(end).isoformat() if end else None
+        max_points = request.args.get("max_points", type=int)
+    except ValueError:
+        return None, None, None, (jsonify({"error": "start and end must be dates in YYYY-MM-DD format."}), 400)
+
+    if max_points is not None and max_points < 3:
+        return None, None, None, (jsonify({"error": "max_points must be at least 3."}), 400)
+
+    return start, end, max_points, None
+
+def _wants_columnar():
+    """True if the client asked for the columnar payload, via
+    ?format=columnar or an Accept header that prefers it over JSON."""
+
+    if request.args.get("format"):
+        return request.args["format"].lower() == "columnar"
+    return request.accept_mimetypes.best_match(["application/json", COLUMNAR_MIMETYPE]) == COLUMNAR_MIMETYPE
+
+def _columnar_response(histories : dict):
+    """Encodes {asset_id: rows} as the columnar format, gzipped when the
+    client accepts it."""
+
+    body, encoding = maybe_gzip(encode_price_columns(histories), request.accept_encodings)
+    response = Response(body, mimetype=COLUMNAR_MIMETYPE)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept")
+    response.vary.add("Accept-Encoding")
+    return response
+
 @api.route("/price-history/<int:asset_id>")
 def get_history(asset_id):
+    """Price history as [{date, price}, ...], oldest first.
+
+    Query parameters: start and end (YYYY-MM-DD, inclusive) and
+    max_points, which downsamples with LTTB so the chart keeps its shape
+    with far fewer points. Accept: application/x-price-columns (or
+    ?format=columnar) returns the binary layout from price_codec instead.
+    """
+
+    start, end, max_points, error = _price_history_args()
+    if error:
+        return error
+
     try:
-        data = get_price_history(asset_id)
+        data = downsample_price_history(get_price_history(asset_id, start, end) or [], max_points)
+        if _wants_columnar():
+            return _columnar_response({asset_id: data})
         formatted = [{"date": r[0], "price": r[1]} for r in data]
         return jsonify(formatted)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/price-history")
+def get_histories():
+    """Price histories of several assets in one response:
+    {"<asset_id>": [{date, price}, ...], ...}.
+
+    Query parameters: ids (comma-separated asset IDs, required) plus the
+    same start, end and max_points as the single-asset route; max_points
+    applies to each asset.
+    """
+
+    try:
+        asset_ids = [int(part) for part in request.args.get("ids", "").split(",") if part.strip()]
+    except ValueError:
+        return jsonify({"error": "ids must be a comma-separated list of asset IDs."}), 400
+
+    if not asset_ids:
+        return jsonify({"error": "ids is required."}), 400
+    if len(set(asset_ids)) > MAX_BATCH_ASSETS:
+        return jsonify({"error": f"At most {MAX_BATCH_ASSETS} assets per request."}), 400
+
+    start, end, max_points, error = _price_history_args()
+    if error:
+        return error
+
+    try:
+        histories = {asset_id: downsample_price_history(rows, max_points)
+                     for asset_id, rows in get_price_histories(asset_ids, start, end).items()}
+        if _wants_columnar():
+            return _columnar_response(histories)
+        return jsonify({
+            str(asset_id): [{"date": r[0], "price": r[1]} for r in rows]
+            for asset_id, rows in histories.items()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/transactions")
+def get_transactions():
+    """One page of the transaction history, newest first.
+
+    Query parameters: symbol, type (buy/sell), start, end (YYYY-MM-DD),
+    limit, and after_date + after_id from the previous page's next_cursor.
+    """
+
+    try:
+        filters = parse_history_args(request.args)
+        limit = min(max(request.args.get("limit", HISTORY_PAGE_SIZE, type=int), 1), HISTORY_MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    page = get_transactions_page(limit=limit, with_dkk=True, **filters)
+    next_cursor = None
+    if page["next_cursor"]:
+        next_cursor = {"after_date": page["next_cursor"][0], "after_id": page["next_cursor"][1]}
+
+    return jsonify({"transactions": page["transactions"], "next_cursor": next_cursor})
+
+@api.route("/transactions/bulk", methods=["POST"])
+def bulk_import_transactions():
+    """Imports a JSON array of transactions in a single database transaction.
+
+    Each element uses the same fields as the manual form:
+    symbol, transaction_type, date, quantity, price_per_unit, fees.
+    """
+
+    records = request.get_json(silent=True)
+    if not isinstance(records, list):
+        return jsonify({"error": "Expected a JSON array of transactions."}), 400
+
+    result = import_transactions(records)
+    status = 500 if "error" in result else 200
+    return jsonify(result), status
+
+@api.route("/prices/ingest", methods=["POST"])
+def ingest_price_history():
+    """Streams a CSV or JSONL body (or uploaded file) into price_history.
+
+    Rows are upserted on (asset_id, date), so re-sending a file is safe.
+    The format comes from ?format=csv|jsonl, or from the content type.
+    """
+
+    upload = request.files.get("file")
+    if upload:
+        stream = upload.stream
+        content_type = upload.mimetype
+    else:
+        stream = request.stream
+        content_type = request.mimetype
+
+    fmt = request.args.get("format")
+    if not fmt:
+        fmt = "jsonl" if content_type in ("application/x-ndjson", "application/jsonl") else "csv"
+
+    try:
+        chunk_size = int(request.args.get("chunk_size", DEFAULT_CHUNK_SIZE))
+        records = iter_records(stream, fmt.lower())
+        result = ingest_prices(records, chunk_size=max(chunk_size, 1))
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"error": str(e)}), 400
+
+    status = 500 if "error" in result else 200
+    return jsonify(result), status
+
+@api.route("/portfolio-value")
+def get_portfolio_value_series():
+    """Daily total portfolio value in DKK.
+
+    Query parameters (YYYY-MM-DD): start (default: one year before end)
+    and end (default: today), at most MAX_SERIES_DAYS days apart.
+    """
+
+    try:
+        end = date.fromisoformat(request.args.get("end") or date.today().isoformat())
+        raw_start = request.args.get("start")
+        start = date.fromisoformat(raw_start) if raw_start else end - timedelta(days=365)
+    except ValueError:
+        return jsonify({"error": "start and end must be dates in YYYY-MM-DD format."}), 400
+
+    if start > end:
+        return jsonify({"error": "start must not be after end."}), 400
+    if (end - start).days + 1 > MAX_SERIES_DAYS:
+        return jsonify({"error": f"At most {MAX_SERIES_DAYS} days per request."}), 400
+
+    return jsonify(portfolio_value_series(start.isoformat(), end.isoformat()))
+
+@api.route("/pnl")
+def get_pnl():
+    """Cost basis and realized/unrealized gains per holding.
+
+    Query parameters: method (fifo or average, default fifo).
+    """
+
+    try:
+        return jsonify(get_pnl_summary(request.args.get("method", "fifo").lower()))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@api.route("/pnl/realized")
+def get_pnl_realized():
+    """Realized gain per sell, newest first.
+
+    Query parameters: method (fifo or average, default fifo) and
+    optionally asset_id.
+    """
+
+    asset_id = request.args.get("asset_id", type=int)
+    try:
+        return jsonify(get_realized_gains(request.args.get("method", "fifo").lower(), asset_id))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@api.route("/fx-status")
+def get_fx_status():
+    """Rate provider health for this worker: circuit breaker state,
+    backed-off fetches and the age of the stored rate table."""
+
+    return jsonify(get_provider_status())
@@ -1,12 +1,15 @@
 # All HTML-related routes for investment_tracker
 
+import csv
+
 from flask import (
     Blueprint,
     render_template,
     request,
     redirect,
     url_for,
-    flash
+    flash,
+    stream_template
 )
 
 from .db import (
@@ -18,8 +21,12 @@ from .db import (
     add_transaction,
     add_price_to_history,
     delete_asset_by_id,
-    get_all_transactions
+    get_transactions_page,
+    iter_transactions
 )
+from .bulk_import import import_transactions, iter_csv_records
+from .pnl import get_pnl_summary
+from .utils import parse_history_args, HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE
 
 # Define the blueprint
 web = Blueprint('investment_web', __name__,
@@ -36,8 +43,17 @@ def index():
         flash(f"Error: {e}", "error")
         holdings = {}
         total_value_dkk = 0.0
+
+    # Gains are extra detail; a P&L failure must not hide the holdings
+    try:
+        pnl = get_pnl_summary()["assets"]
+    except Exception as e:
+        print(f"An error occurred in get_pnl_summary: {e}")
+        flash("Gains are unavailable right now.", "warning")
+        pnl = {}
     
-    return render_template("investment/index.html", holdings=holdings, total_value_dkk=total_value_dkk)
+    return render_template("investment/index.html", holdings=holdings,
+                           total_value_dkk=total_value_dkk, pnl=pnl)
 
 @web.route("/manage")
 def manage():
@@ -98,6 +114,10 @@ def handle_add_transaction():
         price = float(raw_price)
         fees = float(raw_fees) if raw_fees else 0.0
 
+        if quantity <= 0:
+            flash("Quantity must be greater than zero.", "warning")
+            return redirect(url_for("investment_web.manage"))
+
         asset_id = get_asset_id_by_symbol(symbol)
         if not asset_id:
             flash(f"Asset '{symbol}' not found. Please create it first.", "error")
@@ -115,6 +135,37 @@ def handle_add_transaction():
     
     return redirect(url_for("investment_web.manage"))
 
+@web.route("/import-transactions", methods=["POST"])
+def handle_import_transactions():
+    """Handles bulk importing transactions from a broker CSV file."""
+
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Choose a CSV file to import.", "warning")
+        return redirect(url_for("investment_web.manage"))
+
+    try:
+        result = import_transactions(iter_csv_records(upload.stream))
+    except (UnicodeDecodeError, csv.Error) as e:
+        flash(f"Could not read CSV file: {e}", "error")
+        return redirect(url_for("investment_web.manage"))
+
+    if "error" in result:
+        flash(result["error"], "error")
+        return redirect(url_for("investment_web.manage"))
+
+    flash(f"Imported {result['imported']} transactions "
+          f"({result['rows_per_second']:.0f} rows/sec).", "success")
+
+    if result["rejected_count"]:
+        # Show the first few so the user can fix the file
+        details = "; ".join(f"row {r['row']}: {r['reason']}" for r in result["rejected"][:5])
+        more = result["rejected_count"] - min(5, len(result["rejected"]))
+        suffix = f" (and {more} more)" if more > 0 else ""
+        flash(f"Rejected {result['rejected_count']} rows: {details}{suffix}", "warning")
+
+    return redirect(url_for("investment_web.manage"))
+
 @web.route("/add-price", methods=["POST"])
 def handle_add_price():
     """Form Handler: Manual price history entry."""
@@ -160,6 +211,38 @@ def handle_delete_asset(asset_id):
 
 @web.route("/history")
 def history():
-    """Displays the transaction history."""
-    transactions = get_all_transactions()
-    return render_template("investment/history.html", transactions=transactions)
\ No newline at end of file
+    """Displays one page of the transaction history.
+    Filters and the page cursor come from the query string."""
+    try:
+        filters = parse_history_args(request.args)
+        limit = min(max(request.args.get("limit", HISTORY_PAGE_SIZE, type=int), 1), HISTORY_MAX_PAGE_SIZE)
+    except ValueError as e:
+        flash(f"Invalid filter: {e}", "warning")
+        return redirect(url_for("investment_web.history"))
+
+    after = filters.pop("after")
+    page = get_transactions_page(limit=limit, after=after, **filters)
+
+    next_url = None
+    if page["next_cursor"]:
+        next_date, next_id = page["next_cursor"]
+        args = {**request.args.to_dict(), "after_date": next_date, "after_id": next_id}
+        next_url = url_for("investment_web.history", **args)
+
+    return render_template("investment/history.html", transactions=page["transactions"],
+                           filters=filters, next_url=next_url, paged=after is not None)
+
+@web.route("/history/export")
+def history_export():
+    """Renders every matching transaction on one page.
+    The template is streamed, so rows go out while the query is still
+    being read instead of after the whole ledger is loaded."""
+    try:
+        filters = parse_history_args(request.args)
+    except ValueError as e:
+        flash(f"Invalid filter: {e}", "warning")
+        return redirect(url_for("investment_web.history"))
+
+    filters.pop("after")
+    return stream_template("investment/history.html", transactions=iter_transactions(**filters),
+                           filters=filters, export=True)
\ No newline at end of file
@@ -1,5 +1,8 @@
 let myChart = null;
 
+// The server downsamples longer histories (LTTB) to keep phones responsive
+const MAX_CHART_POINTS = 500;
+
 document.addEventListener('DOMContentLoaded', () => {
     const assetLinks = document.querySelectorAll(".asset-link");
     
@@ -16,6 +19,16 @@ document.addEventListener('DOMContentLoaded', () => {
             fetchAndDrawChart(assetId, assetSymbol, assetName);
         });
     });
+
+    // Live total from the portal's event stream (pushed only on change)
+    const totalElem = document.getElementById("total-value");
+    if (totalElem && window.EventSource) {
+        const portfolioStream = new EventSource("/api/stream?events=portfolio");
+        portfolioStream.addEventListener("portfolio", (e) => {
+            totalElem.innerText = JSON.parse(e.data).total_value_dkk.toFixed(2);
+        });
+        window.addEventListener("beforeunload", () => portfolioStream.close());
+    }
 });
 
 async function fetchAndDrawChart(assetId, assetSymbol, assetName) {
@@ -24,7 +37,7 @@ async function fetchAndDrawChart(assetId, assetSymbol, assetName) {
     if (titleElem) titleElem.innerText = `Loading ${assetSymbol}...`;
 
     try {
-        const response = await fetch(`/investments/api/price-history/${assetId}`);
+        const response = await fetch(`/finance/investments/api/price-history/${assetId}?max_points=${MAX_CHART_POINTS}`);
 
         if (!response.ok) {
             console.error(`API Error: ${response.status}`);
@@ -0,0 +1,33 @@
+import codecs
+import io
+
+from itertools import islice
+
+# Helpers shared by the streaming importers (bulk_import, price_ingest,
+# fx_ingest).
+
+
+def text_stream(stream):
+    """Returns stream for incremental text reading: text streams as they
+    are, binary ones decoded as UTF-8 (a byte order mark from Excel
+    exports is skipped).
+
+    Werkzeug spools uploads into a SpooledTemporaryFile, which on Python
+    3.10 lacks readable() and so cannot be given to io.TextIOWrapper.
+    codecs' reader only needs read().
+    """
+
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return codecs.getreader("utf-8-sig")(stream)
+
+
+def chunks(iterable, size : int):
+    """Splits an iterable into lists of at most size items, lazily."""
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,290 @@
+import sqlite3
+
+import numpy as np
+
+from .db import get_db_connection
+from .utils import convert_series, prefetch_rates
+
+
+def _forward_fill(matrix):
+    """Fills NaNs in each column with the last non-NaN value above them.
+
+    Fully vectorized: for every cell, find the row index of the most recent
+    observation with a running maximum, then gather. Leading NaNs stay NaN.
+    """
+
+    rows = np.arange(matrix.shape[0])[:, None]
+    last_seen = np.where(np.isnan(matrix), 0, rows)
+    np.maximum.accumulate(last_seen, axis=0, out=last_seen)
+    return matrix[last_seen, np.arange(matrix.shape[1])]
+
+
+def _fetch_array(conn, query : str, parameters, columns : int):
+    """Runs query and returns its rows as a float array of shape (n, columns).
+
+    Uses a plain tuple cursor (no sqlite3.Row objects), so large result
+    sets go straight into NumPy.
+    """
+
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(query, parameters)
+    rows = cursor.fetchall()
+    if not rows:
+        return np.empty((0, columns))
+    return np.array(rows, dtype=float)
+
+
+def lttb_indices(x, y, threshold : int):
+    """Largest-triangle-three-buckets downsampling.
+
+    Picks threshold points from the series (x ascending) that keep its
+    visual shape: the first and last point, plus one point per bucket in
+    between, chosen to span the largest triangle with the point picked in
+    the previous bucket and the average of the next bucket. Buckets are
+    handled in order because each choice depends on the previous one; the
+    work inside a bucket is vectorized.
+
+    Returns the indices of the kept points. Series with at most threshold
+    points are returned whole.
+    """
+
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Bucket edges over the points between the first and the last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+
+    kept = np.empty(threshold, dtype=int)
+    kept[0] = 0
+    kept[-1] = n - 1
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+
+        # Average of the next bucket (just the last point for the final one)
+        next_start, next_stop = stop, edges[bucket + 2] if bucket + 2 < edges.size else n
+        average_x = x[next_start:next_stop].mean()
+        average_y = y[next_start:next_stop].mean()
+
+        # Twice the triangle area; the constant factor does not change argmax
+        areas = np.abs((x[previous] - average_x) * (y[start:stop] - y[previous])
+                       - (x[previous] - x[start:stop]) * (average_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+
+    return kept
+
+
+def downsample_price_history(rows, max_points : int):
+    """Reduces (date, price) rows to at most max_points with LTTB.
+
+    Dates are ISO strings; they are turned into day numbers so uneven
+    gaps (weekends, holidays) are weighted correctly. Returns a list of
+    the kept rows in their original order.
+    """
+
+    if max_points is None or len(rows) <= max_points:
+        return list(rows)
+
+    days = np.array([row[0] for row in rows], dtype="datetime64[D]").astype(float)
+    prices = np.array([row[1] for row in rows], dtype=float)
+
+    return [rows[i] for i in lttb_indices(days, prices, max_points)]
+
+
+# Day offsets are computed by SQLite (julianday), so no date strings are
+# parsed in Python. Offset 0 is the first day of the requested range.
+SELECT_HELD_ASSETS = """
+SELECT DISTINCT a.id, a.currency
+FROM assets a
+JOIN transactions t ON t.asset_id = a.id
+WHERE t.date <= :end
+ORDER BY a.id;
+"""
+
+SELECT_TRADES = """
+SELECT asset_id,
+       CAST(julianday(date) - julianday(:start) AS INTEGER),
+       CASE WHEN transaction_type = 'buy' THEN quantity ELSE -quantity END
+FROM transactions
+WHERE date <= :end;
+"""
+
+SELECT_PRICES_IN_RANGE = """
+SELECT asset_id,
+       CAST(julianday(date) - julianday(:start) AS INTEGER),
+       price
+FROM price_history
+WHERE date BETWEEN :start AND :end;
+"""
+
+# Each asset's last price before the range, one index seek per asset
+# on UNIQUE(asset_id, date)
+SELECT_PRICES_BEFORE_RANGE = """
+SELECT a.id, (
+    SELECT price FROM price_history
+    WHERE asset_id = a.id AND date < :start
+    ORDER BY date DESC
+    LIMIT 1
+) AS price
+FROM assets a
+WHERE price IS NOT NULL;
+"""
+
+
+def load_series_inputs(start : str, end : str):
+    """Reads everything the engine needs for [start, end] in four queries.
+
+    Returns a dict with the held assets (id, currency rows) and float
+    arrays whose day columns are offsets from start:
+        trades:        (asset_id, day, signed quantity)
+        prices:        (asset_id, day, price) inside the range
+        opening_prices:(asset_id, price) last price before the range
+    or None if the database could not be read.
+    """
+
+    parameters = {"start": start, "end": end}
+    inputs = None
+    try:
+        with get_db_connection() as conn:
+            inputs = {
+                "assets": conn.execute(SELECT_HELD_ASSETS, parameters).fetchall(),
+                "trades": _fetch_array(conn, SELECT_TRADES, parameters, 3),
+                "prices": _fetch_array(conn, SELECT_PRICES_IN_RANGE, parameters, 3),
+                "opening_prices": _fetch_array(conn, SELECT_PRICES_BEFORE_RANGE, parameters, 2),
+            }
+    except sqlite3.Error as e:
+        print(f"An error occurred in load_series_inputs: {e}")
+
+    return inputs
+
+
+def compute_values(inputs : dict, day_count : int, fx):
+    """Turns load_series_inputs() output into one value per day.
+
+    Pure NumPy, no database access. Builds two matrices with one row per
+    day and one column per asset:
+        holdings: opening position plus the cumulative sum of daily trades
+        prices:   EOD prices, forward-filled over days without a price
+    and combines them with the FX factors (columns in the same order as
+    inputs["assets"]). fx is either one factor per asset, applied as a
+    single matrix product:
+        values = (holdings * prices) @ fx
+    or a days x assets matrix of daily factors, summed row by row.
+    """
+
+    asset_ids = np.array([row["id"] for row in inputs["assets"]])
+
+    # asset_id -> column lookup table; -1 for assets that are not held
+    column_of = np.full(int(asset_ids.max()) + 1, -1)
+    column_of[asset_ids] = np.arange(asset_ids.size)
+
+    def columns_for(ids):
+        ids = ids.astype(int)
+        known = ids < column_of.size
+        columns = np.full(ids.size, -1)
+        columns[known] = column_of[ids[known]]
+        return columns
+
+    # --- Holdings matrix (days x assets) ---
+    holdings = np.zeros((day_count, asset_ids.size))
+    trades = inputs["trades"]
+    if trades.size:
+        trade_columns = columns_for(trades[:, 0])
+        trade_days = trades[:, 1].astype(int)
+        quantities = trades[:, 2]
+
+        # Trades before the range form the opening position
+        before = trade_days < 0
+        opening = np.bincount(trade_columns[before], weights=quantities[before],
+                              minlength=asset_ids.size)
+
+        inside = ~before
+        np.add.at(holdings, (trade_days[inside], trade_columns[inside]), quantities[inside])
+        np.cumsum(holdings, axis=0, out=holdings)
+        holdings += opening
+
+    # --- Price matrix (days x assets), forward-filled ---
+    # Row 0 holds the last price before the range; rows 1.. are the calendar
+    prices = np.full((day_count + 1, asset_ids.size), np.nan)
+
+    opening_prices = inputs["opening_prices"]
+    if opening_prices.size:
+        price_columns = columns_for(opening_prices[:, 0])
+        held = price_columns >= 0
+        prices[0, price_columns[held]] = opening_prices[held, 1]
+
+    in_range = inputs["prices"]
+    if in_range.size:
+        price_columns = columns_for(in_range[:, 0])
+        held = price_columns >= 0
+        price_rows = in_range[held, 1].astype(int) + 1
+        prices[price_rows, price_columns[held]] = in_range[held, 2]
+
+    prices = np.nan_to_num(_forward_fill(prices)[1:], nan=0.0)
+
+    if fx.ndim == 2:
+        return np.einsum("ij,ij->i", holdings * prices, fx)
+    return (holdings * prices) @ fx
+
+
+def portfolio_value_series(start : str, end : str, target_currency : str = "DKK"):
+    """Computes the total portfolio value for every day in [start, end].
+
+    Days before an asset's first known price contribute 0 for that asset.
+    Each day is converted at its own historical rate (fx_history).
+    Assets whose currency could not be converted are left out and listed
+    in missing_currencies.
+
+    Returns a dict:
+        currency, dates (ISO strings), values (floats), missing_currencies
+    """
+
+    calendar = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + np.timedelta64(1, "D"))
+    result = {
+        "currency": target_currency,
+        "dates": [],
+        "values": [],
+        "missing_currencies": [],
+    }
+
+    if calendar.size == 0:
+        return result
+
+    inputs = load_series_inputs(start, end)
+    if inputs is None:
+        return result
+
+    result["dates"] = np.datetime_as_string(calendar).tolist()
+    assets = inputs["assets"]
+
+    if not assets:
+        result["values"] = [0.0] * calendar.size
+        return result
+
+    # --- Daily FX factor per asset (one as-of join per distinct currency) ---
+    # Each day uses that day's historical rate; days before any stored
+    # history fall back to today's rate.
+    factors = {}
+    for currency in {row["currency"] for row in assets}:
+        factors[currency] = convert_series(np.ones(calendar.size), calendar, currency, target_currency)
+
+    # Today's rates for the gaps, from one rate-table read under the FX deadline
+    spots = prefetch_rates([c for c, daily in factors.items() if np.isnan(daily).any()], target_currency)
+    for currency, daily in factors.items():
+        spot = spots.get(currency.upper())
+        if spot is not None:
+            daily[np.isnan(daily)] = spot
+
+    fx = np.nan_to_num(np.column_stack([factors[row["currency"]] for row in assets]), nan=0.0)
+    result["missing_currencies"] = sorted(c for c, daily in factors.items() if np.isnan(daily).any())
+
+    result["values"] = compute_values(inputs, calendar.size, fx).tolist()
+
+    return result
@@ -1,22 +1,155 @@
-from .external_api import get_exchange_rate
+from datetime import date
+
+import numpy as np
+
+from flask import current_app, has_app_context
+
+from .external_api import get_cross_rate, get_rate_table, cross_rate, FX_BASE
+
+# Module import, as in external_api: db imports this module.
+from . import db
 
 def convert_currency(amount: float, from_currency: str, to_currency: str):
     """
-    Converts an amount from one currency to another using a cached exchange rate.
+    Converts an amount from one currency to another. Every pair is
+    derived from the single stored FX_BASE rate table.
     """
 
-    if from_currency == to_currency:
+    if from_currency.upper() == to_currency.upper():
         return amount
-    
-    rates = get_exchange_rate(from_currency)
-    
-    if rates is None:
-        return None 
-        
-    rate = rates.get(to_currency.upper())
-    
+
+    rate = get_cross_rate(from_currency, to_currency)
+
     if rate is None:
-        print(f"Error: Target currency '{to_currency}' ont found.")
+        print(f"Error: No exchange rate from '{from_currency}' to '{to_currency}'.")
         return None
-    
-    return amount * rate
\ No newline at end of file
+
+    return amount * rate
+
+
+# Rates for a page come from one read of the FX_BASE table, which waits
+# at most app.config["FX_PREFETCH_TIMEOUT"] seconds when the table has
+# never been fetched, so an unreachable provider costs the page at most
+# the deadline.
+FX_PREFETCH_TIMEOUT = 2.0
+
+def prefetch_rates(currencies, to_currency : str, timeout : float = None):
+    """
+    Resolves the rate from each of currencies to to_currency with a
+    single rate-table read, deriving every pair from it in memory.
+
+    Returns {currency: rate}, uppercased, with None for currencies the
+    table lacks, or for all of them if no table arrived by the deadline.
+    A fetch still running at the deadline carries on in the background,
+    so the table it stores is there for the next request.
+    """
+
+    if timeout is None:
+        timeout = current_app.config.get("FX_PREFETCH_TIMEOUT", FX_PREFETCH_TIMEOUT) \
+            if has_app_context() else FX_PREFETCH_TIMEOUT
+
+    wanted = {currency.upper() for currency in currencies}
+    rates = {currency: 1.0 for currency in wanted if currency == to_currency.upper()}
+    if wanted == rates.keys():
+        return rates  # Nothing to convert; never touch the table
+
+    table = get_rate_table(timeout)
+    for currency in wanted - rates.keys():
+        rates[currency] = cross_rate(table, currency, to_currency) if table is not None else None
+
+    return rates
+
+
+def _as_of(history, days):
+    """Looks up the rate in force on each of days: the last stored rate
+    on or before the day. NaN for days before the first stored rate."""
+
+    history_days, rates = history
+    if rates.size == 0:
+        return np.full(days.shape, np.nan)
+
+    positions = np.searchsorted(history_days, days, side="right") - 1
+    found = positions >= 0
+    return np.where(found, rates[np.maximum(positions, 0)], np.nan)
+
+
+def _units_per_base(currency : str, days):
+    """Units of currency per 1 FX_BASE on each day, from fx_history."""
+
+    if currency == FX_BASE:
+        return np.ones(days.shape)
+
+    direct = db.get_fx_history(FX_BASE, currency)
+    if direct[1].size:
+        return _as_of(direct, days)
+    return 1.0 / _as_of(db.get_fx_history(currency, FX_BASE), days)
+
+
+def convert_series(amounts, dates, from_currency : str, to_currency : str):
+    """
+    Converts each amount at the historical rate of its own date.
+
+    amounts and dates are equal-length sequences; dates are ISO strings
+    or datetime64 values, in any order. Each date is matched to the last
+    stored fx_history rate on or before it (an as-of join done with one
+    binary search over all dates at once), so 100k amounts convert in
+    milliseconds.
+
+    A stored (from, to) pair, or its inverse, is used directly; any other
+    pair is derived from the two FX_BASE legs. Returns a float array with
+    NaN where no rate was known yet on that date.
+    """
+
+    amounts = np.asarray(amounts, dtype=float)
+    from_currency, to_currency = from_currency.upper(), to_currency.upper()
+    if from_currency == to_currency:
+        return amounts.copy()
+
+    days = np.asarray(dates, dtype="datetime64[D]")
+
+    direct = db.get_fx_history(from_currency, to_currency)
+    if direct[1].size:
+        return amounts * _as_of(direct, days)
+
+    inverse = db.get_fx_history(to_currency, from_currency)
+    if inverse[1].size:
+        return amounts / _as_of(inverse, days)
+
+    return amounts * _units_per_base(to_currency, days) / _units_per_base(from_currency, days)
+
+
+# Page size bounds for the transaction history (HTML and JSON)
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+
+def parse_history_args(args):
+    """Reads the transaction history filters from request args.
+
+    Accepts symbol, type (buy/sell), start and end (YYYY-MM-DD), and the
+    keyset cursor after_date + after_id. Returns a dict of keyword
+    arguments for db.iter_transactions(), plus "after" for paging.
+    Raises ValueError on malformed values.
+    """
+
+    filters = {
+        "symbol": args.get("symbol", "").strip().upper() or None,
+        "transaction_type": args.get("type", "").strip().lower() or None,
+        "start": args.get("start") or None,
+        "end": args.get("end") or None,
+    }
+
+    if filters["transaction_type"] not in (None, "buy", "sell"):
+        raise ValueError("type must be 'buy' or 'sell'.")
+
+    for key in ("start", "end"):
+        if filters[key]:
+            filters[key] = date.fromisoformat(filters[key]).isoformat()
+
+    after_date = args.get("after_date")
+    after_id = args.get("after_id")
+    if after_date and after_id:
+        filters["after"] = (date.fromisoformat(after_date).isoformat(), int(after_id))
+    else:
+        filters["after"] = None
+
+    return filters
@@ -0,0 +1,37 @@
+# Verify or rebuild the trigger-maintained holdings table.
+#
+# Run from the repository root:
+#   python -m investment_tracker.check_holdings            # verify only
+#   python -m investment_tracker.check_holdings --rebuild  # recompute from the ledger
+
+import argparse
+
+from investment_tracker.app import db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the holdings table against the transactions ledger.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recompute the holdings table from all transactions, then verify")
+    args = parser.parse_args()
+
+    db.initialize_database()
+
+    if args.rebuild:
+        db.rebuild_holdings()
+
+    mismatches = db.verify_holdings()
+    if not mismatches:
+        print("Holdings match the ledger.")
+        return
+
+    print(f"Found {len(mismatches)} mismatches:")
+    for mismatch in mismatches:
+        print(f"  asset {mismatch['asset_id']} {mismatch['field']}: "
+              f"ledger={mismatch['expected']} holdings={mismatch['actual']}")
+    print("Run with --rebuild to recompute the table.")
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
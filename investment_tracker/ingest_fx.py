@@ -0,0 +1,57 @@
+# Load historical exchange rates into fx_history.
+#
+# Run from the repository root:
+#   python -m investment_tracker.ingest_fx rates.csv
+#   python -m investment_tracker.ingest_fx --from-api 2024-01-01 2024-12-31 --currencies USD EUR
+#
+# CSV columns: date, base, quote, rate (1 base = rate quote). JSONL: one
+# object per line with the same keys. --from-api fetches one day at a time
+# from the rate provider's history endpoint, with DKK as the base.
+
+import argparse
+
+from investment_tracker.app import db
+from investment_tracker.app.fx_ingest import ingest_fx_history, iter_provider_records
+from investment_tracker.app.price_ingest import iter_records, DEFAULT_CHUNK_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load daily exchange rates into fx_history.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("path", nargs="?", help="CSV or JSONL file to load")
+    source.add_argument("--from-api", nargs=2, metavar=("START", "END"),
+                        help="Fetch every day in [START, END] from the rate provider")
+    parser.add_argument("--currencies", nargs="+",
+                        help="Quotes to keep with --from-api (default: all)")
+    parser.add_argument("--format", choices=["csv", "jsonl"],
+                        help="Input format (default: guessed from the file extension)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows per upsert batch (default: {DEFAULT_CHUNK_SIZE})")
+    args = parser.parse_args()
+
+    db.initialize_database()
+
+    if args.from_api:
+        start, end = args.from_api
+        result = ingest_fx_history(iter_provider_records(start, end, currencies=args.currencies),
+                                   chunk_size=args.chunk_size)
+    else:
+        fmt = args.format
+        if not fmt:
+            fmt = "jsonl" if args.path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+        with open(args.path, "rb") as stream:
+            result = ingest_fx_history(iter_records(stream, fmt), chunk_size=args.chunk_size)
+
+    print(f"Stored: {result['stored']}  Rejected: {result['rejected_count']}  "
+          f"Took {result['seconds']:.2f}s")
+
+    for rejection in result["rejected"][:20]:
+        print(f"  row {rejection['row']}: {rejection['reason']}")
+
+    if "error" in result:
+        print(f"Load stopped early: {result['error']}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
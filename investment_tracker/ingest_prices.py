@@ -0,0 +1,47 @@
+# Backfill price_history from a CSV or JSONL file.
+#
+# Run from the repository root:
+#   python -m investment_tracker.ingest_prices prices.csv
+#   python -m investment_tracker.ingest_prices prices.jsonl --chunk-size 10000
+#
+# CSV columns: symbol (or asset_id), date, price. JSONL: one object per line
+# with the same keys. Existing (asset_id, date) rows are updated in place.
+
+import argparse
+
+from investment_tracker.app import db
+from investment_tracker.app.price_ingest import ingest_prices, iter_records, DEFAULT_CHUNK_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream EOD prices into price_history.")
+    parser.add_argument("path", help="CSV or JSONL file to ingest")
+    parser.add_argument("--format", choices=["csv", "jsonl"],
+                        help="Input format (default: guessed from the file extension)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows per upsert batch (default: {DEFAULT_CHUNK_SIZE})")
+    args = parser.parse_args()
+
+    fmt = args.format
+    if not fmt:
+        fmt = "jsonl" if args.path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+    db.initialize_database()
+
+    with open(args.path, "rb") as stream:
+        result = ingest_prices(iter_records(stream, fmt), chunk_size=args.chunk_size)
+
+    print(f"Inserted: {result['inserted']}  Updated: {result['updated']}  "
+          f"Unchanged: {result['unchanged']}  Rejected: {result['rejected_count']}")
+    print(f"Took {result['seconds']:.2f}s ({result['rows_per_second']:.0f} rows/sec)")
+
+    for rejection in result["rejected"][:20]:
+        print(f"  row {rejection['row']}: {rejection['reason']}")
+
+    if "error" in result:
+        print(f"Ingest stopped early: {result['error']}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
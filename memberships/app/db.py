@@ -5,11 +5,26 @@ from contextlib import contextmanager
 from datetime import date, timedelta
 from flask import current_app, has_app_context
 
+from shared import sqlite_pool
+from shared.migrations import run_migrations
+from shared import read_cache, shared_cache
+
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
 INSTANCE_FOLDER = os.path.join(PROJECT_ROOT, "instance")
 DB_FILE = os.path.join(INSTANCE_FOLDER, "memberships.db")
 
+# Read functions are memoized per request (see shared/read_cache.py);
+# every function that writes bumps the database's generation.
+memoized = read_cache.memoized("MEMBERSHIPS_DATABASE", DB_FILE)
+invalidates = read_cache.invalidates("MEMBERSHIPS_DATABASE", DB_FILE)
+
+# Results shared by all gunicorn workers (see shared/shared_cache.py).
+# Writes drop them at once, so the TTL only limits how long unused
+# entries stay in the cache file.
+SHARED_CACHE_TTL = 3600
+shared_cached = shared_cache.cached("MEMBERSHIPS_DATABASE", DB_FILE, ttl=SHARED_CACHE_TTL)
+
 CREATE_MEMBERSHIPS_TABLE = """
 CREATE TABLE IF NOT EXISTS memberships (
     id                 INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -26,20 +41,42 @@ CREATE TABLE IF NOT EXISTS memberships (
 """
 
 
+def _add_renewal_date_column(conn):
+    """Adds renewal_date to databases created before the column existed."""
+
+    columns = [row["name"] for row in conn.execute("PRAGMA table_info(memberships);")]
+    if "renewal_date" not in columns:
+        conn.execute("ALTER TABLE memberships ADD COLUMN renewal_date TEXT;")
+
+
+# Schema migrations, applied in order by initialize_database().
+# PRAGMA user_version records the last applied number, so each runs once.
+# Append new migrations to the end; never edit one that has shipped.
+MIGRATIONS = [
+    (1, "Create memberships table", [CREATE_MEMBERSHIPS_TABLE]),
+    (2, "Add renewal_date column", _add_renewal_date_column),
+    (3, "Index memberships for paid/free listings and renewals", [
+        # get_paid_memberships / get_free_memberships / get_all_memberships
+        "CREATE INDEX IF NOT EXISTS idx_memberships_paid_org ON memberships (is_paid, organization);",
+        # get_upcoming_renewals: is_paid = 1 AND renewal_date BETWEEN ...
+        "CREATE INDEX IF NOT EXISTS idx_memberships_paid_renewal ON memberships (is_paid, renewal_date);",
+    ]),
+]
+
+
 @contextmanager
 def get_db_connection():
-    """Creates a connection to the memberships database.
-    Uses context manager to ensure proper closing of connection.
+    """Borrows this thread's pooled connection to the memberships database.
+    The connection stays open between calls (see shared/sqlite_pool.py).
     Usage:
         with get_db_connection() as conn:
             cursor = conn.cursor()
     """
 
-    conn = None
+    db_path = None
     try:
         db_path = current_app.config.get("MEMBERSHIPS_DATABASE", DB_FILE) if has_app_context() else DB_FILE
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = sqlite_pool.acquire(db_path)
 
         yield conn
 
@@ -47,16 +84,15 @@ def get_db_connection():
         print(f"An error occurred: {e}")
 
     finally:
-        if conn:
-            conn.close()
+        if db_path:
+            sqlite_pool.release(db_path)
 
 
+@invalidates
 def initialize_database():
-    """Creates the database file and tables.
-    Checks if tables already exist.
-
-    Also runs lightweight column migrations so existing databases
-    are updated without destroying data.
+    """Creates the database file and brings its schema up to date.
+    Runs any pending MIGRATIONS; does no DDL if the schema is current,
+    and existing databases are updated without destroying data.
 
     Skips instance folder creation when using an in-memory database,
     since ':memory:' is not a real file path.
@@ -72,21 +108,8 @@ def initialize_database():
     try:
         with get_db_connection() as conn:
             print(f"Checking database at: {db_path}")
-            cursor = conn.cursor()
-            cursor.execute(CREATE_MEMBERSHIPS_TABLE)
-            conn.commit()
-
-            # Migration: add renewal_date to existing databases that predate the column.
-            # SQLite raises OperationalError ("duplicate column name") if the column
-            # already exists; we catch that and ignore it.
-            try:
-                cursor.execute("ALTER TABLE memberships ADD COLUMN renewal_date TEXT;")
-                conn.commit()
-                print("Migration applied: added renewal_date column.")
-            except sqlite3.OperationalError:
-                pass  # Column already exists — nothing to do.
-
-            print("Database tables verified/created successfully.")
+            version = run_migrations(conn, MIGRATIONS)
+            print(f"Database schema at version {version}.")
 
     except sqlite3.Error as e:
         print(f"Database initialization failed: {e}")
@@ -94,6 +117,7 @@ def initialize_database():
 
 # --- CREATE ---
 
+@invalidates
 def add_membership(organization: str, description: str, membership_type: str,
                    member_since: str, is_paid: bool,
                    payment_frequency: str = None, price_per_period: float = None,
@@ -122,6 +146,7 @@ def add_membership(organization: str, description: str, membership_type: str,
 
 # --- READ ---
 
+@memoized
 def get_all_memberships():
     """Read all memberships, ordered by paid first, then alphabetically."""
 
@@ -141,6 +166,7 @@ def get_all_memberships():
         return []
 
 
+@memoized
 def get_membership_by_id(membership_id: int):
     """Read a single membership by its ID."""
 
@@ -160,6 +186,7 @@ def get_membership_by_id(membership_id: int):
         return None
 
 
+@memoized
 def get_paid_memberships():
     """Read only memberships where is_paid is true."""
 
@@ -180,6 +207,7 @@ def get_paid_memberships():
         return []
 
 
+@memoized
 def get_free_memberships():
     """Read only memberships where is_paid is false."""
 
@@ -204,6 +232,7 @@ def get_upcoming_renewals(days: int = 30):
     """Returns paid memberships with a renewal_date within the next N days,
     ordered by renewal_date ascending. Each result is enriched with a
     days_until integer for display urgency.
+    Not memoized: the result depends on today's date, not just the data.
     """
 
     today = date.today()
@@ -236,6 +265,8 @@ def get_upcoming_renewals(days: int = 30):
         return []
 
 
+@memoized
+@shared_cached
 def get_total_monthly_cost():
     """Calculates total monthly cost across all paid memberships, keyed by currency.
 
@@ -276,6 +307,7 @@ def get_total_monthly_cost():
 
 # --- UPDATE ---
 
+@invalidates
 def update_membership(membership_id: int, organization: str, description: str,
                       membership_type: str, member_since: str, is_paid: bool,
                       payment_frequency: str = None, price_per_period: float = None,
@@ -308,6 +340,7 @@ def update_membership(membership_id: int, organization: str, description: str,
 
 # --- DELETE ---
 
+@invalidates
 def delete_membership_by_id(membership_id: int):
     """Deletes a membership by its ID."""
 
@@ -0,0 +1,206 @@
+import os
+import threading
+import time
+
+from investment_tracker.app.db import get_portfolio_value, get_portfolio_summary
+from portal.system_sampler import get_sampler
+from shared import metrics
+from shared.broadcast import Broadcaster, format_event
+
+# Live updates for the portal and investment pages over Server-Sent Events.
+#
+# One producer thread per worker reads the newest system sample (already
+# collected by system_sampler) and the portfolio value, and publishes
+# them to a Broadcaster. Every open /api/stream connection only waits on
+# its own small queue, so the backend work per interval is the same for
+# one open tab as for twenty. Events are sent only when a value changed;
+# in between, each stream sends a comment line as a heartbeat so proxies
+# keep the connection open and dead clients are noticed.
+#
+# Settings:
+#   SSE_SYSTEM_INTERVAL:    seconds between system checks (default 5)
+#   SSE_PORTFOLIO_INTERVAL: seconds between portfolio checks (default 30)
+#   SSE_HEARTBEAT:          seconds of silence before a heartbeat (default 15)
+#   SSE_QUEUE_SIZE:         events buffered per client (default 16)
+#   SSE_MAX_SECONDS:        a stream ends after this long and the browser
+#                           reconnects, so no worker thread is held forever
+#                           (default 300)
+#   SSE_MAX_CLIENTS:        open streams allowed per worker (default 4)
+#
+# Each stream holds a worker thread while open, so the app must run with
+# threaded workers (gunicorn --threads) rather than plain sync workers,
+# and SSE_MAX_CLIENTS must stay below --threads so page and API requests
+# always have a thread left. Over the cap /api/stream answers 503, and
+# the pages fall back to polling.
+DEFAULTS = {
+    "SSE_SYSTEM_INTERVAL": 5.0,
+    "SSE_PORTFOLIO_INTERVAL": 30.0,
+    "SSE_HEARTBEAT": 15.0,
+    "SSE_QUEUE_SIZE": 16,
+    "SSE_MAX_SECONDS": 300.0,
+    "SSE_MAX_CLIENTS": 4,
+}
+EVENTS = ("system", "portfolio")
+RECONNECT_MS = 3000     # How long the browser waits before reconnecting
+
+
+def get_settings(app):
+    return {key: app.config.get(key, default) for key, default in DEFAULTS.items()}
+
+
+def portfolio_snapshot():
+    """The figures the dashboard shows live. Needs an app context."""
+
+    summary = get_portfolio_summary()
+    return {
+        "total_value_dkk": round(get_portfolio_value(), 2),
+        "assets": len(summary),
+        "fx_missing": any(data["fx_missing"] for data in summary.values()),
+    }
+
+
+class LiveProducer:
+    """Publishes system and portfolio updates to hub from a background
+    thread, and does nothing while no client is subscribed."""
+
+    def __init__(self, app, hub : Broadcaster):
+        self.app = app
+        self.hub = hub
+        self.settings = get_settings(app)
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._next_portfolio = 0.0
+
+    def poll(self):
+        """Publishes whatever is due now. Returns the events that were
+        sent (unchanged values are not)."""
+
+        sent = []
+        sample = get_sampler().latest()
+        # The timestamp changes every sample; only the readings count
+        readings = {key: value for key, value in sample.items() if key != "time"}
+        if self.hub.publish("system", sample, key=readings):
+            sent.append("system")
+
+        now = time.monotonic()
+        if now >= self._next_portfolio:
+            self._next_portfolio = now + float(self.settings["SSE_PORTFOLIO_INTERVAL"])
+            with self.app.app_context():
+                if self.hub.publish("portfolio", portfolio_snapshot()):
+                    sent.append("portfolio")
+        return sent
+
+    def _poll_safely(self):
+        try:
+            self.poll()
+        except Exception as e:
+            print(f"An error occurred in LiveProducer: {e}")
+
+    def _run(self):
+        # Publish once up front, so the first client gets values at once
+        self._poll_safely()
+        while not self._stop.wait(float(self.settings["SSE_SYSTEM_INTERVAL"])):
+            if self.hub.subscriber_count:
+                self._poll_safely()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="live-producer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(float(self.settings["SSE_SYSTEM_INTERVAL"]) + 1)
+            self._thread = None
+
+
+_hub = None
+_producer = None
+_producer_pid = None
+_producer_lock = threading.Lock()
+
+
+def get_hub(app):
+    """This process's broadcaster, with its producer running."""
+
+    global _hub, _producer, _producer_pid
+
+    with _producer_lock:
+        # Like the sampler, never reuse a thread from before a fork
+        # The first poll runs on the producer thread, never under this lock,
+        # so a slow portfolio summary does not hold up other connections
+        if _producer is None or _producer_pid != os.getpid():
+            _hub = Broadcaster(int(get_settings(app)["SSE_QUEUE_SIZE"]))
+            _producer = LiveProducer(app, _hub)
+            _producer_pid = os.getpid()
+            _producer.start()
+        return _hub
+
+
+def stop_producer():
+    """Stops and forgets this process's producer (for tests)."""
+
+    global _hub, _producer
+
+    with _producer_lock:
+        if _producer is not None and _producer_pid == os.getpid():
+            _producer.stop()
+        _hub = None
+        _producer = None
+
+
+def open_stream(app, events : set = None):
+    """A subscription for one new client, or None if this worker already
+    has SSE_MAX_CLIENTS streams open."""
+
+    return get_hub(app).subscribe(events, limit=int(get_settings(app)["SSE_MAX_CLIENTS"]))
+
+
+def close_stream(subscription):
+    """Frees the slot taken by open_stream(). Safe to call twice, and
+    never starts a producer."""
+
+    hub = _hub
+    if hub is not None:
+        hub.unsubscribe(subscription)
+
+
+def stream(app, subscription):
+    """Generator of SSE text for one client subscription (from
+    open_stream): the current values, then every change, with heartbeats
+    in between, until SSE_MAX_SECONDS."""
+
+    settings = get_settings(app)
+    deadline = time.monotonic() + float(settings["SSE_MAX_SECONDS"])
+    try:
+        yield f"retry: {RECONNECT_MS}\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            item = subscription.get(timeout=min(float(settings["SSE_HEARTBEAT"]), remaining))
+            if item is None:
+                yield ": heartbeat\n\n"
+            else:
+                yield format_event(*item)
+    finally:
+        # Also runs when the client disconnects and the server closes us
+        close_stream(subscription)
+
+
+def _stream_gauges():
+    if _hub is None:
+        return []
+    stats = _hub.stats()
+    return [
+        ("sse_clients", "Open /api/stream connections in this worker.", stats["subscribers"]),
+        ("sse_events_published", "Changed values sent to clients.", stats["published"]),
+        ("sse_events_unchanged", "Checks that found nothing new to send.", stats["unchanged"]),
+        ("sse_events_dropped", "Events discarded from full client queues.", stats["dropped"]),
+        ("sse_clients_rejected", "Streams refused over SSE_MAX_CLIENTS.", stats["rejected"]),
+    ]
+
+metrics.register_collector(_stream_gauges)
@@ -1,5 +1,11 @@
-import psutil
-from flask import Blueprint, render_template, jsonify, url_for
+from flask import Blueprint, Response, current_app, render_template, jsonify, url_for, request
+
+from portal.live_stream import EVENTS, close_stream, open_stream, stream
+from portal.system_sampler import get_sampler
+from shared.sqlite_pool import get_pool_stats
+from shared.read_cache import get_cache_stats
+from shared.metrics import metrics_response
+from shared.slow_queries import get_slow_queries, get_slow_query_stats, SORT_KEYS
 
 # Define the Blueprint
 portal_bp = Blueprint('portal', __name__,
@@ -12,26 +18,60 @@ def home():
 
 @portal_bp.route('/api/system_status')
 def system_status():
-    # CPU
-    cpu_percent = psutil.cpu_percent(interval=0.1)
-    
-    # Memory
-    memory = psutil.virtual_memory()
-    memory_percent = memory.percent
-    
-    # Temp
-    cpu_temp = "N/A"
-    try:
-        temps = psutil.sensors_temperatures()
-        if 'cpu_thermal' in temps:
-            cpu_temp = round(temps['cpu_thermal'][0].current, 1)
-        elif 'coretemp' in temps: 
-            cpu_temp = round(temps['coretemp'][0].current, 1)
-    except Exception:
-        pass 
-
-    return jsonify({
-        "cpu_usage": cpu_percent,
-        "memory_usage": memory_percent,
-        "cpu_temp": cpu_temp
-    })
\ No newline at end of file
+    # Newest background sample; never waits to measure (see system_sampler)
+    return jsonify(get_sampler().latest())
+
+@portal_bp.route('/api/system_history')
+def system_history():
+    # Recent samples, oldest first, for the sparklines
+    sampler = get_sampler()
+    limit = request.args.get("limit", None, type=int)
+    return jsonify({"interval": sampler.interval, "samples": sampler.history(limit)})
+
+@portal_bp.route('/api/stream')
+def live_stream():
+    # Server-Sent Events: system samples and portfolio value as they change.
+    # ?events=system limits the stream to some of EVENTS.
+    requested = {name for name in request.args.get("events", "").split(",") if name}
+    unknown = requested - set(EVENTS)
+    if unknown:
+        return jsonify({"error": f"Unknown events: {', '.join(sorted(unknown))}"}), 400
+
+    # Every open stream holds a worker thread, so past SSE_MAX_CLIENTS the
+    # client is told to poll instead
+    app = current_app._get_current_object()
+    subscription = open_stream(app, requested or None)
+    if subscription is None:
+        error = jsonify({"error": "Too many open streams; poll /api/system_status instead"})
+        return error, 503, {"Retry-After": "30"}
+
+    response = Response(stream(app, subscription),
+                        mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # A response that is never iterated does not run the generator's finally
+    response.call_on_close(lambda: close_stream(subscription))
+    return response
+
+@portal_bp.route('/api/db_pool')
+def db_pool_status():
+    # Per-worker counters: a high hit rate means connections are being reused
+    return jsonify(get_pool_stats())
+
+@portal_bp.route('/api/read_cache')
+def read_cache_status():
+    # Per-worker counters for the memoized db reads
+    return jsonify(get_cache_stats())
+
+@portal_bp.route('/metrics')
+def metrics():
+    # Prometheus text format; per-worker like the stats endpoints above
+    return metrics_response()
+
+@portal_bp.route('/api/slow_queries')
+def slow_queries_status():
+    # Per-worker worst statements; empty unless SQLITE_SLOW_QUERY_MS is set
+    sort = request.args.get("sort", "total")
+    if sort not in SORT_KEYS:
+        return jsonify({"error": f"sort must be one of {', '.join(SORT_KEYS)}"}), 400
+    limit = request.args.get("limit", 20, type=int)
+    return jsonify({**get_slow_query_stats(), "queries": get_slow_queries(sort, limit)})
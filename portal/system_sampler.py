@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+
+from collections import deque
+
+import psutil
+from flask import current_app, has_app_context
+
+# Background sampling for the portal's system status.
+#
+# psutil.cpu_percent(interval=0.1) sleeps for its interval, so measuring
+# on every poll tied up a sync gunicorn worker for 100 ms each time. A
+# daemon thread now samples at a fixed interval instead, and the routes
+# only read the newest sample (or the ring buffer of recent ones).
+#
+# Settings, read when the sampler starts:
+#   SYSTEM_SAMPLE_INTERVAL: seconds between samples (default 5)
+#   SYSTEM_SAMPLE_HISTORY:  samples kept for /api/system_history (default 120)
+#   SYSTEM_DISK_PATH:       filesystem reported as disk_usage (default "/")
+#
+# Like the connection pool, each gunicorn worker runs its own sampler.
+# It is started on first use in the worker, never in the master, because
+# threads do not survive a fork.
+DEFAULT_INTERVAL = 5.0
+DEFAULT_HISTORY = 120
+DEFAULT_DISK_PATH = "/"
+
+# Sensor names for the CPU temperature: Raspberry Pi first, then x86
+TEMPERATURE_SENSORS = ("cpu_thermal", "coretemp")
+
+
+def read_cpu_temperature():
+    """CPU temperature in °C, or "N/A" where psutil has no sensor for it
+    (e.g. Windows)."""
+
+    try:
+        temps = psutil.sensors_temperatures()
+        for name in TEMPERATURE_SENSORS:
+            if temps.get(name):
+                return round(temps[name][0].current, 1)
+    except Exception:
+        pass
+    return "N/A"
+
+
+class SystemSampler:
+    """Collects CPU, memory, temperature, disk and load average every
+    interval seconds into a ring buffer of the last history samples.
+
+    cpu_usage is the average since the previous sample, so only the
+    first sample waits to measure it.
+    """
+
+    def __init__(self, interval : float = DEFAULT_INTERVAL, history : int = DEFAULT_HISTORY,
+                 disk_path : str = DEFAULT_DISK_PATH):
+        self.interval = interval
+        self.disk_path = disk_path
+
+        self._samples = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._measured_cpu = False
+
+    def sample(self):
+        """Takes one sample now, stores it and returns it."""
+
+        # A non-blocking cpu_percent() has nothing to compare against on
+        # its first call, so the very first sample measures over 0.1 s
+        cpu_percent = psutil.cpu_percent(interval=None if self._measured_cpu else 0.1)
+        self._measured_cpu = True
+
+        memory = psutil.virtual_memory()
+        try:
+            disk_percent = psutil.disk_usage(self.disk_path).percent
+        except OSError:
+            disk_percent = None
+        try:
+            load_average = [round(load, 2) for load in psutil.getloadavg()]
+        except (AttributeError, OSError):
+            load_average = None
+
+        sample = {
+            "time": time.time(),
+            "cpu_usage": cpu_percent,
+            "memory_usage": memory.percent,
+            "cpu_temp": read_cpu_temperature(),
+            "disk_usage": disk_percent,
+            "load_average": load_average,
+        }
+        with self._lock:
+            self._samples.append(sample)
+        return sample
+
+    def latest(self):
+        """The newest sample, taking one first if there is none yet."""
+
+        with self._lock:
+            if self._samples:
+                return self._samples[-1]
+        return self.sample()
+
+    def history(self, limit : int = None):
+        """Up to limit of the most recent samples, oldest first; all of
+        them if limit is None. limit is clamped to 0..capacity, so 0 or
+        a negative value gives an empty list."""
+
+        with self._lock:
+            samples = list(self._samples)
+        if limit is None:
+            return samples
+        # samples[-0:] would be the whole list, so slice from the front
+        limit = max(0, min(limit, len(samples)))
+        return samples[len(samples) - limit:]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"An error occurred in SystemSampler: {e}")
+
+    def start(self):
+        """Starts the background thread (once)."""
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+_sampler = None
+_sampler_pid = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """This process's running sampler, started on first use with the
+    current app's settings."""
+
+    global _sampler, _sampler_pid
+
+    with _sampler_lock:
+        # A sampler inherited across a fork has no thread; start a new one
+        if _sampler is None or _sampler_pid != os.getpid():
+            config = current_app.config if has_app_context() else {}
+            _sampler = SystemSampler(
+                interval=float(config.get("SYSTEM_SAMPLE_INTERVAL", DEFAULT_INTERVAL)),
+                history=int(config.get("SYSTEM_SAMPLE_HISTORY", DEFAULT_HISTORY)),
+                disk_path=config.get("SYSTEM_DISK_PATH", DEFAULT_DISK_PATH),
+            )
+            _sampler.sample()
+            _sampler.start()
+            _sampler_pid = os.getpid()
+        return _sampler
+
+
+def stop_sampler():
+    """Stops and forgets this process's sampler (for tests)."""
+
+    global _sampler
+
+    with _sampler_lock:
+        if _sampler is not None and _sampler_pid == os.getpid():
+            _sampler.stop()
+        _sampler = None
@@ -14,6 +14,7 @@ from memberships.app.routes_web import web as memberships_web
 # Import database modules
 from investment_tracker.app import db as investment_db
 from memberships.app import db as memberships_db
+from shared import metrics, shared_cache
 
 # Path setup
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -46,6 +47,11 @@ def create_app(config_object=None):
         # Point each module at its own database file
         app.config["INVESTMENT_DATABASE"] = investment_db.DB_FILE
         app.config["MEMBERSHIPS_DATABASE"] = memberships_db.DB_FILE
+        # Cache file shared by all gunicorn workers
+        app.config["SHARED_CACHE_DATABASE"] = shared_cache.DB_FILE
+
+    # Per-request timing for /metrics
+    metrics.init_app(app)
 
     # Register blueprints
     app.register_blueprint(portal_bp)
@@ -0,0 +1,125 @@
+import json
+import queue
+import threading
+
+
+class Subscription:
+    """One client's bounded queue of (event, data) pairs.
+
+    A client that falls behind loses its oldest events rather than
+    holding memory or blocking the producer.
+    """
+
+    def __init__(self, events : set = None, size : int = 16):
+        self.events = events
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=size)
+
+    def wants(self, event : str):
+        return self.events is None or event in self.events
+
+    def put(self, item : tuple):
+        """Adds item, discarding the oldest queued item if full."""
+
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout : float = None):
+        """The next (event, data) pair, or None after timeout seconds."""
+
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Broadcaster:
+    """Fans events from one producer out to many subscribers.
+
+    publish() only forwards an event when its value differs from the last
+    one published under that name, and every new subscriber starts with
+    the latest value of each event, so clients never wait a full interval
+    for their first update.
+
+    Usage:
+        hub = Broadcaster()
+        subscription = hub.subscribe({"system"})
+        hub.publish("system", {"cpu_usage": 12.5})
+        event, data = subscription.get(timeout=15)
+        hub.unsubscribe(subscription)
+    """
+
+    def __init__(self, queue_size : int = 16):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._latest = {}
+        self._stats = {"published": 0, "unchanged": 0, "dropped": 0, "rejected": 0}
+
+    def subscribe(self, events : set = None, limit : int = None):
+        """A new subscription to events (None for all of them), or None if
+        limit subscribers are already open."""
+
+        subscription = Subscription(events, self.queue_size)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                self._stats["rejected"] += 1
+                return None
+            for event, (_, data) in self._latest.items():
+                if subscription.wants(event):
+                    subscription.put((event, data))
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription : Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+                self._stats["dropped"] += subscription.dropped
+
+    def publish(self, event : str, data, key=None):
+        """Sends data to every subscriber of event, unless it equals the
+        previous value. key, if given, is compared instead of data (e.g.
+        data without its timestamp). Returns True if it was sent."""
+
+        key = data if key is None else key
+        with self._lock:
+            previous = self._latest.get(event)
+            if previous is not None and previous[0] == key:
+                self._stats["unchanged"] += 1
+                return False
+            self._latest[event] = (key, data)
+            self._stats["published"] += 1
+            subscribers = [s for s in self._subscribers if s.wants(event)]
+
+        for subscription in subscribers:
+            subscription.put((event, data))
+        return True
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def stats(self):
+        """subscribers, events published and skipped as unchanged, events
+        dropped from full client queues, and subscriptions refused for
+        being over their limit."""
+
+        with self._lock:
+            dropped = self._stats["dropped"] + sum(s.dropped for s in self._subscribers)
+            return {**self._stats, "dropped": dropped, "subscribers": len(self._subscribers)}
+
+
+def format_event(event : str, data):
+    """One Server-Sent Events message carrying data as JSON."""
+
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
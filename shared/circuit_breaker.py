@@ -0,0 +1,102 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """Fails fast while an upstream service is down.
+
+    closed:    calls go through. failure_threshold consecutive failures
+               open the breaker.
+    open:      calls are refused without touching the network until the
+               cool-down has passed. The cool-down doubles every time the
+               breaker opens again without an intervening success
+               (base_delay, 2 x base_delay, ... up to max_delay).
+    half_open: after the cool-down one trial call is let through; success
+               closes the breaker and resets the backoff, failure opens
+               it again.
+
+    Every allowed call must end in record_success() or record_failure(),
+    whatever it raises; a half-open breaker lets no other call through
+    until its trial is recorded.
+
+    Usage:
+        breaker = CircuitBreaker()
+        if breaker.allow():
+            healthy = False
+            try:
+                data = call_service()
+                healthy = True
+            finally:
+                if healthy:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+    """
+
+    def __init__(self, failure_threshold : int = 3, base_delay : float = 5.0,
+                 max_delay : float = 300.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._trips = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._stats = {"successes": 0, "failures": 0, "rejected": 0}
+
+    def _cool_down(self):
+        return min(self.max_delay, self.base_delay * 2 ** max(self._trips - 1, 0))
+
+    def allow(self):
+        """True if a call may go ahead now. Counts refused calls."""
+
+        with self._lock:
+            if self._state == "open" and self._clock() - self._opened_at >= self._cool_down():
+                self._state = "half_open"
+                self._trial_running = False
+
+            if self._state == "closed":
+                return True
+            if self._state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._state = "closed"
+            self._consecutive_failures = 0
+            self._trips = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._consecutive_failures += 1
+            if self._state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                self._state = "open"
+                self._trips += 1
+                self._opened_at = self._clock()
+                self._trial_running = False
+
+    def state(self):
+        """Returns the current state and counters as a dict."""
+
+        with self._lock:
+            retry_in = 0.0
+            if self._state == "open":
+                retry_in = max(0.0, self._opened_at + self._cool_down() - self._clock())
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "trips": self._trips,
+                "retry_in": round(retry_in, 3),
+                **self._stats,
+            }
@@ -0,0 +1,245 @@
+import bisect
+import threading
+import time
+
+from flask import Response, g, request
+
+# In-process counters and histograms, served in the Prometheus text
+# format by the portal's /metrics endpoint.
+#
+# Like the pool and read-cache stats, every gunicorn worker keeps its own
+# numbers; a scrape sees whichever worker answered. Metrics are created
+# once at import time with counter() / histogram() and updated with
+# inc() / observe(), which only take a lock and touch a dict.
+#
+# init_app() adds per-request timing for every endpoint, together with
+# the time and number of SQL queries each request spent (fed by
+# shared/sql_trace.py).
+
+# Latency buckets in seconds, from sub-millisecond queries to slow pages
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_metrics = {}
+_collectors = []
+_registry_lock = threading.Lock()
+
+
+def _label_key(labelnames : tuple, labels : dict):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames : tuple, key : tuple, extra : dict = None):
+    pairs = list(zip(labelnames, key)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+               for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value : float):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count, one series per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name : str, documentation : str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount : float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Observations counted into cumulative buckets, with a sum and count
+    per label set, as Prometheus histograms are."""
+
+    kind = "histogram"
+
+    def __init__(self, name : str, documentation : str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value : float, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            series["counts"][index] += 1
+            series["sum"] += value
+
+    def count(self, **labels):
+        with self._lock:
+            series = self._series.get(_label_key(self.labelnames, labels))
+            return sum(series["counts"]) if series else 0
+
+    def sum(self, **labels):
+        with self._lock:
+            series = self._series.get(_label_key(self.labelnames, labels))
+            return series["sum"] if series else 0.0
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: (list(s["counts"]), s["sum"]) for key, s in self._series.items()}
+
+        for key, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, {"le": _format_value(float(bound))})
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _register(metric):
+    with _registry_lock:
+        existing = _metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric {metric.name} is already registered differently")
+            return existing
+        _metrics[metric.name] = metric
+        return metric
+
+
+def counter(name : str, documentation : str, labelnames=()):
+    """Creates (or returns the already registered) counter called name."""
+
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(name : str, documentation : str, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Creates (or returns the already registered) histogram called name."""
+
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def register_collector(function):
+    """Adds a function called on every scrape that reports values kept
+    elsewhere (such as the pool stats) as gauges: it returns a list of
+    (name, documentation, value) tuples."""
+
+    with _registry_lock:
+        if function not in _collectors:
+            _collectors.append(function)
+
+
+def render():
+    """Returns every metric in the Prometheus text exposition format."""
+
+    with _registry_lock:
+        metrics = sorted(_metrics.values(), key=lambda metric: metric.name)
+        collectors = list(_collectors)
+
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+
+    for collect in collectors:
+        for name, documentation, value in collect():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    """Zeroes every counter and histogram (for tests)."""
+
+    with _registry_lock:
+        metrics = list(_metrics.values())
+    for metric in metrics:
+        metric.reset()
+
+
+def metrics_response():
+    """A Flask response with the current metrics."""
+
+    return Response(render(), mimetype=None, content_type=CONTENT_TYPE)
+
+
+# --- Per-request timing ---
+
+REQUESTS = counter(
+    "http_requests_total", "Requests handled, by endpoint, method and status.",
+    ("endpoint", "method", "status"))
+REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds", "Time from request start until the response was returned.",
+    ("endpoint", "method"))
+REQUEST_SQL_SECONDS = histogram(
+    "http_request_sql_seconds", "Time spent in SQL queries per request.",
+    ("endpoint",))
+REQUEST_SQL_QUERIES = histogram(
+    "http_request_sql_queries", "SQL queries run per request.",
+    ("endpoint",), buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 1000))
+
+
+def _start_timer():
+    g._metrics_started = time.perf_counter()
+    g._sql_seconds = 0.0
+    g._sql_queries = 0
+
+
+def _record_request(response):
+    started = g.pop("_metrics_started", None)
+    if started is None:
+        return response
+
+    endpoint = request.endpoint or "unmatched"
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+    REQUEST_SQL_SECONDS.observe(g.get("_sql_seconds", 0.0), endpoint=endpoint)
+    REQUEST_SQL_QUERIES.observe(g.get("_sql_queries", 0), endpoint=endpoint)
+    return response
+
+
+def init_app(app):
+    """Times every request the app handles. Streamed responses are timed
+    until their generator is returned, not until the last byte."""
+
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
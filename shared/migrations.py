@@ -0,0 +1,65 @@
+import sqlite3
+
+
+def get_schema_version(conn):
+    """Returns the database's PRAGMA user_version (0 for a new file)."""
+
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def run_migrations(conn, migrations):
+    """Brings a database up to the latest schema version.
+
+    migrations is an ordered list of (version, description, steps) tuples.
+    steps is either a list of SQL statements or a callable taking the
+    connection. Versions must be increasing; never edit a migration that
+    has shipped, append a new one instead.
+
+    Each pending migration runs in its own transaction together with the
+    PRAGMA user_version bump, so a failed migration leaves the database at
+    the previous version. When the database is already current, only the
+    PRAGMA is read and no DDL runs at all.
+
+    Several gunicorn workers may start at once, so each migration takes
+    the write lock (BEGIN IMMEDIATE) and re-reads the version under it;
+    a migration another process applied meanwhile is skipped rather
+    than run twice.
+
+    Returns the schema version after running.
+    """
+
+    current = get_schema_version(conn)
+    latest = migrations[-1][0] if migrations else 0
+
+    if current >= latest:
+        return current
+
+    for version, description, steps in migrations:
+        if version <= current:
+            continue
+
+        # Python's sqlite3 does not open transactions for DDL on its own
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            current = get_schema_version(conn)
+            if version <= current:
+                conn.rollback()
+                continue
+
+            if callable(steps):
+                steps(conn)
+            else:
+                for statement in steps:
+                    conn.execute(statement)
+            # PRAGMA values cannot be bound as parameters; version is an int
+            conn.execute(f"PRAGMA user_version = {int(version)};")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            print(f"Migration {version} failed: {description}")
+            raise
+
+        print(f"Migration {version} applied: {description}")
+        current = version
+
+    return current
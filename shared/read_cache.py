@@ -0,0 +1,181 @@
+import functools
+import threading
+
+from cachetools import LRUCache
+from flask import current_app, g, has_app_context, has_request_context
+
+from shared import metrics, shared_cache
+
+# Memoization for the db modules' read functions.
+#
+# Mode comes from app.config["READ_CACHE_MODE"]:
+#   "request" (default): results live for one request only (on flask.g),
+#                        so a page that asks for the same data twice hits
+#                        the database once. Never stale across requests.
+#   "process":           results are also kept across requests in this
+#                        worker, until the next write.
+#   "off":               no memoization.
+# Outside a request (scripts, tests calling db functions directly) reads
+# always go to the database.
+#
+# Every write function is wrapped with invalidates(), which bumps a
+# per-database generation counter. Cached entries remember the generation
+# they were read at and are ignored once it has moved on. The counter is
+# bumped in this process and in the shared cache file, and process mode
+# checks the shared one, so a write in one gunicorn worker also
+# invalidates the other workers' results.
+DEFAULT_MODE = "request"
+PROCESS_CACHE_SIZE = 256
+
+_generations = {}
+_generation_lock = threading.Lock()
+
+_process_cache = LRUCache(maxsize=PROCESS_CACHE_SIZE)
+_process_lock = threading.Lock()
+
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+_stats_lock = threading.Lock()
+
+
+def _database(config_key : str, default : str):
+    """The database a call reads or writes, used as the namespace."""
+
+    return current_app.config.get(config_key, default) if has_app_context() else default
+
+
+def _mode():
+    if not has_request_context():
+        return "off"
+    return current_app.config.get("READ_CACHE_MODE", DEFAULT_MODE)
+
+
+def get_generation(database : str):
+    """Current write generation for a database path."""
+
+    with _generation_lock:
+        return _generations.get(database, 0)
+
+
+def bump_generation(database : str):
+    """Marks every cached read of database as stale, in every worker."""
+
+    with _generation_lock:
+        _generations[database] = _generations.get(database, 0) + 1
+    shared_cache.bump_generation(database)
+    with _stats_lock:
+        _stats["invalidations"] += 1
+
+
+def _count(key : str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def memoized(config_key : str, default : str):
+    """Decorator for read functions of the database at
+    app.config[config_key] (default path: default).
+
+    Arguments must be hashable. Cached results are shared between
+    callers, so treat them as read-only.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            mode = _mode()
+            if mode == "off":
+                return function(*args, **kwargs)
+
+            database = _database(config_key, default)
+            if mode == "process":
+                generation = (get_generation(database), shared_cache.get_generation(database))
+            else:
+                generation = get_generation(database)
+            key = (database, function.__qualname__, args, tuple(sorted(kwargs.items())))
+
+            request_cache = g.setdefault("_read_cache", {})
+            entry = request_cache.get(key)
+            if entry is None and mode == "process":
+                with _process_lock:
+                    entry = _process_cache.get(key)
+
+            if entry is not None and entry[0] == generation:
+                _count("hits")
+                return entry[1]
+
+            _count("misses")
+            result = function(*args, **kwargs)
+
+            entry = (generation, result)
+            request_cache[key] = entry
+            if mode == "process":
+                with _process_lock:
+                    _process_cache[key] = entry
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates(config_key : str, default : str):
+    """Decorator for write functions: bumps the database's generation
+    once the write has finished (even if it failed part-way)."""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            try:
+                return function(*args, **kwargs)
+            finally:
+                bump_generation(_database(config_key, default))
+
+        return wrapper
+
+    return decorator
+
+
+def get_cache_stats():
+    """Returns hit/miss counters for this process.
+
+    hits:          reads served from the request or process cache
+    misses:        reads that went to the database
+    invalidations: writes that bumped a generation
+    process_entries: results currently held across requests
+    """
+
+    with _stats_lock:
+        stats = dict(_stats)
+    with _process_lock:
+        stats["process_entries"] = len(_process_cache)
+
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else 0.0
+    return stats
+
+
+def reset_cache_stats():
+    """Resets the counters to zero."""
+
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def clear_cache():
+    """Drops every result kept across requests."""
+
+    with _process_lock:
+        _process_cache.clear()
+
+
+def _cache_gauges():
+    stats = get_cache_stats()
+    return [
+        ("read_cache_hits", "Memoized reads served from the request or process cache.", stats["hits"]),
+        ("read_cache_misses", "Memoized reads that went to the database.", stats["misses"]),
+        ("read_cache_invalidations", "Writes that bumped a database generation.", stats["invalidations"]),
+        ("read_cache_process_entries", "Results held across requests.", stats["process_entries"]),
+    ]
+
+metrics.register_collector(_cache_gauges)
@@ -0,0 +1,237 @@
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+from shared import sqlite_pool
+
+# Key/value cache shared by every gunicorn worker on this machine.
+#
+# In-process caches are duplicated per worker and warmed separately, and a
+# write in one worker cannot invalidate another worker's copy. This store
+# is a small SQLite file instead: every worker reads and writes the same
+# rows, through the same pooled WAL connections as the app databases, so
+# no external service is needed.
+#
+# Values are JSON. Each entry belongs to a namespace and records the
+# namespace's generation when it was stored; bump_generation() (called by
+# the db modules' write functions) makes every older entry in the
+# namespace invisible to all workers at once. Entries also expire after
+# their TTL.
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+INSTANCE_FOLDER = os.path.join(CURRENT_DIR, "instance")
+DB_FILE = os.path.join(INSTANCE_FOLDER, "cache.db")
+
+CREATE_CACHE_TABLE = """
+CREATE TABLE IF NOT EXISTS cache (
+    key        TEXT    PRIMARY KEY,
+    namespace  TEXT    NOT NULL,
+    generation INTEGER NOT NULL,
+    expires_at REAL    NOT NULL,
+    value      TEXT    NOT NULL
+);
+"""
+
+CREATE_GENERATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS generations (
+    namespace  TEXT    PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+"""
+
+# A hit needs a live entry from the namespace's current generation
+SELECT_ENTRY = """
+SELECT c.value FROM cache c
+LEFT JOIN generations g ON g.namespace = c.namespace
+WHERE c.key = ?
+AND c.expires_at > ?
+AND c.generation = COALESCE(g.generation, 0);
+"""
+
+UPSERT_ENTRY = """
+INSERT OR REPLACE INTO cache (key, namespace, generation, expires_at, value)
+VALUES (?, ?, ?, ?, ?);
+"""
+
+SELECT_GENERATION = """
+SELECT generation FROM generations WHERE namespace = ?;
+"""
+
+BUMP_GENERATION = """
+INSERT INTO generations (namespace, generation) VALUES (?, 1)
+ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1;
+"""
+
+DELETE_EXPIRED = """
+DELETE FROM cache WHERE expires_at <= ?;
+"""
+
+# Expired rows are swept after this many writes per process
+SWEEP_EVERY = 100
+
+_initialized = set()
+_initialized_lock = threading.Lock()
+_writes = {"count": 0}
+
+
+def get_cache_path():
+    """The cache file for the current app (SHARED_CACHE_DATABASE), or the
+    default in shared/instance for scripts without an app context."""
+
+    return current_app.config.get("SHARED_CACHE_DATABASE", DB_FILE) if has_app_context() else DB_FILE
+
+
+def _acquire():
+    """Borrows a pooled connection to the cache file, creating the file
+    and tables the first time this process uses it."""
+
+    path = get_cache_path()
+    with _initialized_lock:
+        if path not in _initialized:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = sqlite_pool.acquire(path)
+            try:
+                conn.execute(CREATE_CACHE_TABLE)
+                conn.execute(CREATE_GENERATIONS_TABLE)
+                conn.commit()
+            except sqlite3.Error:
+                sqlite_pool.release(path)
+                raise
+            _initialized.add(path)
+            return path, conn
+
+    return path, sqlite_pool.acquire(path)
+
+
+def get(key : str, default=None):
+    """Returns the cached value for key, or default on a miss."""
+
+    path = None
+    try:
+        path, conn = _acquire()
+        row = conn.execute(SELECT_ENTRY, (key, time.time())).fetchone()
+        return json.loads(row[0]) if row else default
+
+    except (sqlite3.Error, ValueError) as e:
+        print(f"An error occurred in shared_cache.get: {e}")
+        return default
+
+    finally:
+        if path:
+            sqlite_pool.release(path)
+
+
+def set(key : str, value, ttl : float, namespace : str = "", generation : int = None):
+    """Stores value (anything JSON-serializable) for ttl seconds.
+
+    generation should be the namespace's generation read *before* the
+    value was computed, so a write that lands in between makes the entry
+    stale instead of hiding the write. Defaults to the current one.
+    """
+
+    path = None
+    try:
+        payload = json.dumps(value)
+        path, conn = _acquire()
+        if generation is None:
+            generation = _read_generation(conn, namespace)
+        conn.execute(UPSERT_ENTRY, (key, namespace, generation, time.time() + ttl, payload))
+
+        _writes["count"] += 1
+        if _writes["count"] % SWEEP_EVERY == 0:
+            conn.execute(DELETE_EXPIRED, (time.time(),))
+        conn.commit()
+
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"An error occurred in shared_cache.set: {e}")
+
+    finally:
+        if path:
+            sqlite_pool.release(path)
+
+
+def _read_generation(conn, namespace : str):
+    row = conn.execute(SELECT_GENERATION, (namespace,)).fetchone()
+    return row[0] if row else 0
+
+
+def get_generation(namespace : str):
+    """Current generation of namespace, as seen by every worker."""
+
+    path = None
+    try:
+        path, conn = _acquire()
+        return _read_generation(conn, namespace)
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in shared_cache.get_generation: {e}")
+        return 0
+
+    finally:
+        if path:
+            sqlite_pool.release(path)
+
+
+def bump_generation(namespace : str):
+    """Invalidates every entry in namespace, in all workers."""
+
+    path = None
+    try:
+        path, conn = _acquire()
+        conn.execute(BUMP_GENERATION, (namespace,))
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"An error occurred in shared_cache.bump_generation: {e}")
+
+    finally:
+        if path:
+            sqlite_pool.release(path)
+
+
+def close_cache(path : str = None):
+    """Closes this process's connections to the cache file (default: the
+    current app's). Call this before deleting the file, e.g. in tests."""
+
+    path = path or get_cache_path()
+    sqlite_pool.close_pool(path)
+    with _initialized_lock:
+        _initialized.discard(path)
+
+
+def cached(config_key : str, default : str, ttl : float, cache_if=None):
+    """Decorator: keeps a read function's result in the shared cache.
+
+    The namespace is the database at app.config[config_key] (default
+    path: default), so any write through a function wrapped with
+    read_cache.invalidates() for that database drops the entry. ttl
+    bounds staleness from outside sources, such as exchange rates.
+    Arguments and result must be JSON-serializable; a None result is
+    not cached, nor is one for which cache_if(result) is false.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            namespace = current_app.config.get(config_key, default) if has_app_context() else default
+            key = json.dumps([namespace, function.__module__, function.__qualname__, args, kwargs],
+                             sort_keys=True, default=str)
+
+            value = get(key)
+            if value is not None:
+                return value
+
+            generation = get_generation(namespace)
+            value = function(*args, **kwargs)
+            if value is not None and (cache_if is None or cache_if(value)):
+                set(key, value, ttl, namespace, generation)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,58 @@
+import threading
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key.
+
+    The first caller for a key (the leader) runs the function; callers
+    that arrive while it is running wait and receive the same result, or
+    the same exception. Nothing is cached: once the leader finishes, the
+    next call for that key runs the function again.
+
+    Usage:
+        flight = SingleFlight()
+        rows = flight.do(("prices", ids), lambda: load_prices(ids))
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    def do(self, key, function):
+        """Runs function() once for all concurrent callers with key."""
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                self._stats["leaders"] += 1
+                leader = True
+            else:
+                self._stats["coalesced"] += 1
+                leader = False
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = function()
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+        return call["result"]
+
+    def stats(self):
+        """Returns {"leaders": n, "coalesced": n} since creation."""
+
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,272 @@
+# Opt-in slow-query log for pooled SQLite connections.
+#
+# Enable it in the Flask config (both databases share the pool, so both
+# are covered):
+#   SQLITE_SLOW_QUERY_MS = 50                 # record statements slower than this
+#   SQLITE_SLOW_QUERY_LOG = "slow_queries.jsonl"   # optional, one JSON line each
+#
+# Every slow statement is kept with its parameters, duration, the function
+# that ran it and its EXPLAIN QUERY PLAN, which is flagged when it scans a
+# whole table or builds a temp B-tree (an ORDER BY / GROUP BY with no index
+# to follow). The plan is taken once per distinct statement.
+#
+# This worker's worst offenders are at /api/slow_queries; the log file,
+# which gathers every worker, can be summarized with:
+#   python -m shared.slow_queries slow_queries.jsonl --sort total --top 10
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from shared import metrics, sql_trace
+
+MAX_STATEMENTS = 500    # Distinct statements kept in memory per worker
+SORT_KEYS = ("total", "max", "count")
+
+SLOW_QUERIES = metrics.counter(
+    "sqlite_slow_queries_total", "Statements over SQLITE_SLOW_QUERY_MS.", ("database",))
+
+# Frames in these folders are the plumbing between a db function and
+# SQLite (the pool, the caches, this tracing), not the caller
+_SKIP_FOLDERS = (os.path.dirname(os.path.abspath(__file__)),
+                 os.path.dirname(os.path.abspath(sqlite3.__file__)))
+
+# "SCAN transactions" (or "SCAN TABLE transactions" on older SQLite) reads
+# every row; "SCAN transactions USING INDEX ..." walks an index instead
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")
+_TEMP_BTREE = re.compile(r"USE TEMP B-TREE FOR (.+)$")
+_EXPLAINABLE = ("select", "insert", "update", "delete", "replace", "with")
+
+_statements = {}
+_dropped = 0
+_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+def _caller():
+    """module.function:line of the nearest frame outside the db plumbing."""
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if not filename.startswith(_SKIP_FOLDERS) and "contextlib" not in filename:
+            return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def plan_flags(plan : list):
+    """Warnings for the EXPLAIN QUERY PLAN detail lines in plan."""
+
+    flags = []
+    for detail in plan:
+        full_scan = _FULL_SCAN.match(detail)
+        if full_scan:
+            flags.append(f"full table scan: {full_scan.group(1)}")
+        temp_btree = _TEMP_BTREE.search(detail)
+        if temp_btree:
+            flags.append(f"temp b-tree: {temp_btree.group(1)}")
+    return flags
+
+
+def explain(conn : sqlite3.Connection, sql : str, parameters=()):
+    """EXPLAIN QUERY PLAN detail lines for sql, or [] if it has none."""
+
+    if sql_trace.statement_kind(sql) not in _EXPLAINABLE:
+        return []
+    try:
+        # A plain cursor, so the EXPLAIN itself is not timed or logged
+        cursor = conn.cursor(sqlite3.Cursor)
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters)
+        return [row[3] for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        return [f"EXPLAIN failed: {e}"]
+
+
+def _jsonable(parameters):
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {key: _jsonable_value(value) for key, value in parameters.items()}
+    return [_jsonable_value(value) for value in parameters]
+
+
+def _jsonable_value(value):
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return repr(value)
+
+
+def record(conn : sqlite3.Connection, sql : str, parameters, seconds : float, log_path : str = None):
+    """Records one slow statement run on conn. parameters is None for
+    executemany() and executescript(), whose rows are not kept."""
+
+    global _dropped
+
+    database = conn.database_label
+    text = " ".join(sql.split())
+    key = (database, text)
+    caller = _caller()
+    SLOW_QUERIES.inc(database=database)
+
+    with _lock:
+        entry = _statements.get(key)
+        new = entry is None
+    # Explain outside the lock; two threads may both explain a new statement
+    plan = explain(conn, sql, parameters) if new and parameters is not None else None
+
+    with _lock:
+        entry = _statements.get(key)
+        if entry is None:
+            if len(_statements) >= MAX_STATEMENTS:
+                _dropped += 1
+                entry = None
+            else:
+                entry = _statements[key] = {
+                    "database": database,
+                    "sql": text,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "plan": plan or [],
+                    "flags": plan_flags(plan or []),
+                    "callers": [],
+                }
+        if entry is not None:
+            milliseconds = seconds * 1000
+            entry["count"] += 1
+            entry["total_ms"] += milliseconds
+            if milliseconds >= entry["max_ms"]:
+                entry["max_ms"] = milliseconds
+                entry["slowest_parameters"] = _jsonable(parameters)
+            if caller not in entry["callers"]:
+                entry["callers"].append(caller)
+            if plan and not entry["plan"]:
+                entry["plan"] = plan
+                entry["flags"] = plan_flags(plan)
+            plan = entry["plan"]
+
+    if log_path:
+        line = json.dumps({
+            "time": time.time(),
+            "database": database,
+            "sql": text,
+            "parameters": _jsonable(parameters),
+            "ms": round(seconds * 1000, 3),
+            "caller": caller,
+            "plan": plan or [],
+        })
+        with _log_lock:
+            try:
+                with open(log_path, "a", encoding="utf-8") as handle:
+                    handle.write(line + "\n")
+            except OSError as e:
+                print(f"An error occurred in slow_queries.record: {e}")
+
+
+def _ranked(entries : list, sort : str, limit : int):
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of {SORT_KEYS}")
+    field = "count" if sort == "count" else f"{sort}_ms"
+    ranked = sorted(entries, key=lambda entry: entry[field], reverse=True)
+    return ranked[:limit] if limit else ranked
+
+
+def get_slow_queries(sort : str = "total", limit : int = 20):
+    """This worker's slow statements, worst first by sort ("total",
+    "max" or "count"), with their mean time in mean_ms."""
+
+    with _lock:
+        entries = [dict(entry, callers=list(entry["callers"])) for entry in _statements.values()]
+    for entry in entries:
+        entry["mean_ms"] = entry["total_ms"] / entry["count"]
+    return _ranked(entries, sort, limit)
+
+
+def get_slow_query_stats():
+    """How many distinct statements are kept, and how many slow runs of
+    other statements were not because MAX_STATEMENTS was reached."""
+
+    with _lock:
+        return {"statements": len(_statements), "dropped": _dropped}
+
+
+def reset_slow_queries():
+    """Forgets every recorded statement (for tests)."""
+
+    global _dropped
+
+    with _lock:
+        _statements.clear()
+        _dropped = 0
+
+
+def summarize_log(path : str, sort : str = "total", limit : int = 10):
+    """Groups the lines of a SQLITE_SLOW_QUERY_LOG file by statement, in
+    the same shape as get_slow_queries()."""
+
+    grouped = {}
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            entry = grouped.setdefault((item["database"], item["sql"]), {
+                "database": item["database"],
+                "sql": item["sql"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "plan": [],
+                "callers": [],
+            })
+            entry["count"] += 1
+            entry["total_ms"] += item["ms"]
+            if item["ms"] >= entry["max_ms"]:
+                entry["max_ms"] = item["ms"]
+                entry["slowest_parameters"] = item["parameters"]
+            if item["caller"] not in entry["callers"]:
+                entry["callers"].append(item["caller"])
+            if item["plan"] and not entry["plan"]:
+                entry["plan"] = item["plan"]
+
+    for entry in grouped.values():
+        entry["mean_ms"] = entry["total_ms"] / entry["count"]
+        entry["flags"] = plan_flags(entry["plan"])
+    return _ranked(list(grouped.values()), sort, limit)
+
+
+def main(argv : list = None):
+    parser = argparse.ArgumentParser(description="List the worst statements in a slow-query log.")
+    parser.add_argument("log", help="The SQLITE_SLOW_QUERY_LOG file")
+    parser.add_argument("--sort", choices=SORT_KEYS, default="total",
+                        help="Rank by total time, slowest single run, or number of runs")
+    parser.add_argument("--top", type=int, default=10, help="How many statements to show")
+    args = parser.parse_args(argv)
+
+    entries = summarize_log(args.log, args.sort, args.top)
+    if not entries:
+        print("No slow queries logged.")
+        return
+
+    for rank, entry in enumerate(entries, start=1):
+        print(f"{rank}. [{entry['database']}] {entry['count']}x  total {entry['total_ms']:.1f} ms  "
+              f"mean {entry['mean_ms']:.1f} ms  max {entry['max_ms']:.1f} ms")
+        print(f"   {entry['sql']}")
+        print(f"   called from: {', '.join(entry['callers'])}")
+        print(f"   slowest parameters: {entry.get('slowest_parameters')}")
+        for detail in entry["plan"]:
+            print(f"   plan: {detail}")
+        for flag in entry["flags"]:
+            print(f"   ! {flag}")
+
+
+if __name__ == "__main__":
+    main()
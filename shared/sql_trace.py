@@ -0,0 +1,117 @@
+import sqlite3
+import time
+
+from flask import g, has_request_context
+
+from shared import metrics, slow_queries
+
+# SQL instrumentation for pooled connections (see sqlite_pool).
+#
+# Two hooks, because neither sees everything on its own:
+#   set_trace_callback: SQLite reports every statement it runs, including
+#       the ones inside triggers and the implicit BEGINs, but only as it
+#       starts, so it gives counts and not durations.
+#   TracedConnection / TracedCursor: wall-clock time around each
+#       execute() / executemany() / executescript() call made from Python.
+#       Time spent in triggers is part of the statement that fired them.
+#
+# Query times also add up per request (g._sql_seconds / g._sql_queries),
+# which shared/metrics.py reports next to the request's total time.
+# Statements over the connection's slow-query threshold are also handed
+# to shared/slow_queries.py.
+
+STATEMENTS = metrics.counter(
+    "sqlite_statements_total", "Statements SQLite ran (trace callback), by kind.",
+    ("database", "kind"))
+QUERY_SECONDS = metrics.histogram(
+    "sqlite_query_duration_seconds", "Wall-clock time of execute calls from Python, by kind.",
+    ("database", "kind"))
+
+
+def statement_kind(sql : str):
+    """The statement's leading keyword, lowercased ("select", "insert",
+    ...), or "trigger" for statements SQLite runs inside a trigger."""
+
+    text = sql.lstrip()
+    if text.startswith("--"):
+        return "trigger" if text[2:].lstrip().upper().startswith("TRIGGER") else "comment"
+    return (text.split(None, 1) or ["empty"])[0].lower().rstrip(";")
+
+
+def _record(database : str, sql : str, seconds : float):
+    QUERY_SECONDS.observe(seconds, database=database, kind=statement_kind(sql))
+    if has_request_context():
+        g._sql_seconds = g.get("_sql_seconds", 0.0) + seconds
+        g._sql_queries = g.get("_sql_queries", 0) + 1
+
+
+class TracedCursor(sqlite3.Cursor):
+    """A cursor that times its execute calls."""
+
+    def _finished(self, sql : str, parameters, started : float):
+        seconds = time.perf_counter() - started
+        _record(self.connection.database_label, sql, seconds)
+        if seconds >= self.connection.slow_query_seconds:
+            slow_queries.record(self.connection, sql, parameters, seconds,
+                                self.connection.slow_query_log)
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._finished(sql, parameters, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._finished(sql, None, started)
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._finished(sql_script, None, started)
+
+
+class TracedConnection(sqlite3.Connection):
+    """A connection whose cursors (and shortcut execute methods) are
+    timed. Pass as factory= to sqlite3.connect()."""
+
+    database_label = "unknown"
+    slow_query_seconds = float("inf")   # Set by install(); inf = log nothing
+    slow_query_log = None
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute() makes its own cursor internally, and on newer
+    # Pythons does not go through cursor(), so time these directly
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def install(conn : TracedConnection, database : str, slow_query_ms : float = None, slow_query_log : str = None):
+    """Labels conn's metrics with database (the file name, not the full
+    path, to keep the label set small) and hooks its trace callback.
+    Statements taking slow_query_ms or longer go to the slow-query log;
+    None leaves it off."""
+
+    conn.database_label = database
+    if slow_query_ms is not None:
+        conn.slow_query_seconds = float(slow_query_ms) / 1000
+        conn.slow_query_log = slow_query_log
+
+    def trace(sql):
+        STATEMENTS.inc(database=database, kind=statement_kind(sql))
+
+    conn.set_trace_callback(trace)
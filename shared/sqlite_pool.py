@@ -0,0 +1,236 @@
+import sqlite3
+import os
+import threading
+import weakref
+
+from flask import current_app, has_app_context
+
+from shared import metrics, sql_trace
+
+# Default connection settings. Each key can be overridden in the Flask config,
+# e.g. app.config["SQLITE_SYNCHRONOUS"] = "FULL".
+#
+# WAL lets readers and the single writer work at the same time, and with
+# synchronous=NORMAL a commit no longer waits for an fsync of the main file.
+# That is the biggest win on the Pi's SD card.
+DEFAULT_SETTINGS = {
+    "SQLITE_JOURNAL_MODE": "WAL",
+    "SQLITE_SYNCHRONOUS": "NORMAL",
+    "SQLITE_CACHE_SIZE": -8000,             # Negative value = size in KiB (8 MB)
+    "SQLITE_MMAP_SIZE": 64 * 1024 * 1024,   # 64 MB of memory-mapped reads
+    "SQLITE_BUSY_TIMEOUT": 5000,            # Milliseconds to wait for a lock
+    "SQLITE_SLOW_QUERY_MS": None,           # Log statements at least this slow; None = off
+    "SQLITE_SLOW_QUERY_LOG": None,          # Optional JSON-lines file for the slow-query log
+}
+
+# One _ThreadConnections per thread. Connections are never shared between
+# threads while in use, but we open them with check_same_thread=False so
+# close_pool() can close every connection from a single thread, and so a
+# thread's connections can be closed after it has exited.
+_local = threading.local()
+
+# Every pooled connection, keyed by id(conn), so close_pool() can reach
+# connections owned by other threads. A thread whose connection is no
+# longer registered opens a fresh one on its next acquire().
+_registry = {}
+_registry_lock = threading.Lock()
+
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+def _get_settings():
+    """Reads the pool settings from the Flask config, falling back to defaults
+    for scripts that run without an app context."""
+
+    if has_app_context():
+        return {key: current_app.config.get(key, default)
+                for key, default in DEFAULT_SETTINGS.items()}
+    return dict(DEFAULT_SETTINGS)
+
+
+def _close_thread_connections(pid : int, connections : dict):
+    """Closes the connections a finished thread left in the pool."""
+
+    if pid != os.getpid():
+        return  # Inherited across a fork; the parent still owns them
+
+    with _registry_lock:
+        for conn in connections.values():
+            entry = _registry.get(id(conn))
+            if entry is not None and entry[2] is conn:
+                conn.close()
+                del _registry[id(conn)]
+
+
+class _ThreadConnections:
+    """One thread's pool state: {db_path: connection} and nesting depths.
+
+    Only the thread's threading.local refers to it, so it is freed when
+    the thread exits, and the finalizer then closes the thread's
+    connections. Without this, every short-lived thread (request threads
+    of a threaded server, background refreshes) would leave its
+    connections open until close_pool().
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.connections = {}
+        self.depth = {}
+        weakref.finalize(self, _close_thread_connections, self.pid, self.connections)
+
+
+def _thread_state():
+    """Returns this thread's pool state.
+
+    Gunicorn forks workers after the master may already have opened
+    connections. A SQLite connection must never cross a fork, so the
+    state is reset whenever the process ID changes.
+    """
+
+    state = getattr(_local, "state", None)
+    if state is None or state.pid != os.getpid():
+        state = _local.state = _ThreadConnections()
+    return state
+
+
+def _open_connection(db_path : str, settings : dict):
+    """Opens a new connection and applies the configured PRAGMAs."""
+
+    busy_timeout = int(settings["SQLITE_BUSY_TIMEOUT"])
+
+    conn = sqlite3.connect(db_path, timeout=busy_timeout / 1000,
+                           check_same_thread=False, factory=sql_trace.TracedConnection)
+    conn.row_factory = sqlite3.Row  # Rows accessible by column name: row["symbol"]
+    # Query counts and timings for /metrics, and the slow-query log
+    # (see shared/sql_trace.py and shared/slow_queries.py)
+    sql_trace.install(conn, os.path.basename(db_path),
+                      settings["SQLITE_SLOW_QUERY_MS"], settings["SQLITE_SLOW_QUERY_LOG"])
+
+    # In-memory databases have no journal file to switch to WAL
+    if db_path != ":memory:":
+        conn.execute(f"PRAGMA journal_mode = {settings['SQLITE_JOURNAL_MODE']};")
+    conn.execute(f"PRAGMA synchronous = {settings['SQLITE_SYNCHRONOUS']};")
+    conn.execute(f"PRAGMA cache_size = {int(settings['SQLITE_CACHE_SIZE'])};")
+    conn.execute(f"PRAGMA mmap_size = {int(settings['SQLITE_MMAP_SIZE'])};")
+    conn.execute(f"PRAGMA busy_timeout = {busy_timeout};")
+
+    return conn
+
+
+def acquire(db_path : str):
+    """Returns this thread's connection to db_path, opening it on first use.
+
+    Every acquire() must be paired with a release(). Calls may be nested;
+    the innermost calls share the outer call's connection and transaction.
+    """
+
+    state = _thread_state()
+    conn = state.connections.get(db_path)
+
+    if conn is not None:
+        with _registry_lock:
+            if id(conn) not in _registry:
+                conn = None  # Closed by close_pool() from another thread
+
+    if conn is not None:
+        with _stats_lock:
+            _stats["hits"] += 1
+    else:
+        with _stats_lock:
+            _stats["misses"] += 1
+        conn = _open_connection(db_path, _get_settings())
+        state.connections[db_path] = conn
+        with _registry_lock:
+            _registry[id(conn)] = (os.getpid(), db_path, conn)
+
+    state.depth[db_path] = state.depth.get(db_path, 0) + 1
+    return conn
+
+
+def release(db_path : str):
+    """Hands the connection back to the pool.
+
+    When the outermost user releases it, any transaction left open
+    (e.g. after an error before commit) is rolled back, so the next
+    user always starts from a clean connection.
+    """
+
+    state = _thread_state()
+    depth = state.depth.get(db_path, 0) - 1
+    state.depth[db_path] = max(depth, 0)
+
+    conn = state.connections.get(db_path)
+    if depth <= 0 and conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
+def close_pool(db_path : str = None):
+    """Closes pooled connections in this process.
+
+    Closes every connection to db_path, or all of them if db_path is None.
+    Call this before deleting a database file (e.g. in test teardown).
+    """
+
+    pid = os.getpid()
+    with _registry_lock:
+        for key, (owner_pid, path, conn) in list(_registry.items()):
+            if owner_pid != pid:
+                # Inherited across a fork; the parent still owns it
+                del _registry[key]
+            elif db_path is None or path == db_path:
+                conn.close()
+                del _registry[key]
+
+    # Forget the closed connections in the calling thread. Other threads
+    # notice on their next acquire(), because the connection is no longer
+    # in the registry.
+    state = _thread_state()
+    for path in list(state.connections):
+        if db_path is None or path == db_path:
+            del state.connections[path]
+            state.depth.pop(path, None)
+
+
+def get_pool_stats():
+    """Returns a snapshot of pool usage for this process.
+
+    hits:   acquire() calls served by an already-open connection
+    misses: acquire() calls that had to open a new connection
+    open_connections: connections currently held by the pool
+    """
+
+    with _stats_lock:
+        hits = _stats["hits"]
+        misses = _stats["misses"]
+
+    pid = os.getpid()
+    with _registry_lock:
+        open_connections = sum(1 for owner_pid, _, _ in _registry.values() if owner_pid == pid)
+
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+        "open_connections": open_connections,
+    }
+
+
+def reset_pool_stats():
+    """Resets the hit and miss counters to zero."""
+
+    with _stats_lock:
+        _stats["hits"] = 0
+        _stats["misses"] = 0
+
+
+def _pool_gauges():
+    stats = get_pool_stats()
+    return [
+        ("sqlite_pool_hits", "acquire() calls served by an open connection.", stats["hits"]),
+        ("sqlite_pool_misses", "acquire() calls that opened a new connection.", stats["misses"]),
+        ("sqlite_pool_open_connections", "Connections currently held by the pool.", stats["open_connections"]),
+    ]
+
+metrics.register_collector(_pool_gauges)
@@ -3,33 +3,44 @@ import tempfile
 import os
 
 from run import create_app
+from shared.sqlite_pool import close_pool
+from shared.shared_cache import close_cache
 
 
 @pytest.fixture
 def app():
     """Creates a fresh app instance backed by temporary database files.
 
-    One temp file per database so each module's connections stay isolated.
-    Both are deleted automatically in teardown.
+    One temp file per database (and one for the shared cache) so each
+    module's connections stay isolated. All are deleted automatically in
+    teardown.
     """
 
     inv_fd, inv_path = tempfile.mkstemp(suffix=".db")
     mem_fd, mem_path = tempfile.mkstemp(suffix=".db")
+    cache_fd, cache_path = tempfile.mkstemp(suffix=".db")
     os.close(inv_fd)
     os.close(mem_fd)
+    os.close(cache_fd)
 
     class TestConfig:
         TESTING = True
         SECRET_KEY = "test-secret-key"
         INVESTMENT_DATABASE = inv_path
         MEMBERSHIPS_DATABASE = mem_path
+        SHARED_CACHE_DATABASE = cache_path
 
     app = create_app(TestConfig)
 
     yield app
 
+    # Pooled connections keep the files open; close them before deleting
+    close_pool(inv_path)
+    close_pool(mem_path)
+    close_cache(cache_path)
     os.unlink(inv_path)
     os.unlink(mem_path)
+    os.unlink(cache_path)
 
 
 @pytest.fixture
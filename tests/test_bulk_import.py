@@ -0,0 +1,97 @@
+import io
+
+from investment_tracker.app.db import (
+    add_asset,
+    get_asset_id_by_symbol,
+    calculate_holdings,
+    get_all_transactions,
+)
+from investment_tracker.app.bulk_import import import_transactions, iter_csv_records
+
+
+CSV_EXPORT = """Ticker,Action,Trade_Date,Qty,Price,Commission
+AAPL,BUY,2024-01-02,10,180.5,1.0
+AAPL,sell,2024-02-01,4,190,1.0
+MSFT,buy,2024-01-03,5,370,
+AAPL,hold,2024-03-01,1,1,0
+NOPE,buy,2024-03-01,1,1,0
+AAPL,buy,not-a-date,1,1,0
+"""
+
+
+def _add_assets(app):
+    with app.app_context():
+        add_asset("AAPL", "Apple Inc.", "Stock", "USD")
+        add_asset("MSFT", "Microsoft", "Stock", "USD")
+
+
+def test_csv_import_inserts_valid_rows_and_reports_rejects(app):
+    _add_assets(app)
+    with app.app_context():
+        stream = io.BytesIO(CSV_EXPORT.encode("utf-8-sig"))
+        result = import_transactions(iter_csv_records(stream))
+
+        assert result["imported"] == 3
+        assert result["rejected_count"] == 3
+        assert [r["row"] for r in result["rejected"]] == [4, 5, 6]
+        assert "Unknown symbol" in result["rejected"][1]["reason"]
+
+        assert calculate_holdings(get_asset_id_by_symbol("AAPL")) == 6.0
+        assert calculate_holdings(get_asset_id_by_symbol("MSFT")) == 5.0
+
+
+def test_import_with_no_valid_rows_writes_nothing(app):
+    _add_assets(app)
+    with app.app_context():
+        result = import_transactions([{"symbol": "NOPE"}])
+        assert result["imported"] == 0
+        assert result["rejected_count"] == 1
+        assert get_all_transactions() == []
+
+
+def test_non_finite_numbers_reject_only_their_row(app):
+    _add_assets(app)
+    with app.app_context():
+        result = import_transactions([
+            {"symbol": "AAPL", "type": "buy", "date": "2024-01-02", "quantity": "nan", "price": "1"},
+            {"symbol": "AAPL", "type": "buy", "date": "2024-01-02", "quantity": "1", "price": "inf"},
+            {"symbol": "AAPL", "type": "buy", "date": "2024-01-02", "quantity": "2", "price": "10"},
+        ])
+        assert result["imported"] == 1
+        assert result["rejected_count"] == 2
+        assert "finite" in result["rejected"][0]["reason"]
+        assert calculate_holdings(get_asset_id_by_symbol("AAPL")) == 2.0
+
+
+def test_json_bulk_endpoint(app, client):
+    _add_assets(app)
+    payload = [
+        {"symbol": "aapl", "transaction_type": "buy", "date": "2024-01-02",
+         "quantity": 2, "price_per_unit": 100, "fees": 0},
+        {"symbol": "AAPL", "transaction_type": "buy", "date": "2024-01-03",
+         "quantity": "3", "price_per_unit": "100"},
+        "not an object",
+    ]
+    response = client.post("/finance/investments/api/transactions/bulk", json=payload)
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body["imported"] == 2
+    assert body["rejected_count"] == 1
+    assert "rows_per_second" in body
+
+
+def test_json_bulk_endpoint_rejects_non_array(client):
+    response = client.post("/finance/investments/api/transactions/bulk", json={"symbol": "AAPL"})
+    assert response.status_code == 400
+
+
+def test_csv_upload_route(app, client):
+    _add_assets(app)
+    data = {"file": (io.BytesIO(CSV_EXPORT.encode("utf-8")), "export.csv")}
+    response = client.post("/finance/investments/import-transactions",
+                           data=data, content_type="multipart/form-data")
+
+    assert response.status_code == 302
+    with app.app_context():
+        assert len(get_all_transactions()) == 3
@@ -0,0 +1,58 @@
+from shared.circuit_breaker import CircuitBreaker
+
+
+def _breaker(**kwargs):
+    clock = [0.0]
+    breaker = CircuitBreaker(clock=lambda: clock[0], **kwargs)
+    return breaker, clock
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker, _ = _breaker(failure_threshold=3, base_delay=5.0)
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    breaker.record_success()   # A success resets the count
+
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+
+    assert not breaker.allow()
+    assert not breaker.allow()
+    state = breaker.state()
+    assert state["state"] == "open"
+    assert state["rejected"] == 2
+    assert state["retry_in"] == 5.0
+
+
+def test_half_open_lets_one_trial_through():
+    breaker, clock = _breaker(failure_threshold=1, base_delay=5.0)
+    breaker.allow()
+    breaker.record_failure()
+
+    clock[0] = 5.0
+    assert breaker.allow()
+    assert not breaker.allow()   # Only one trial at a time
+    assert breaker.state()["state"] == "half_open"
+
+    breaker.record_success()
+    assert breaker.state()["state"] == "closed"
+    assert breaker.allow()
+
+
+def test_cool_down_doubles_each_time_the_trial_fails():
+    breaker, clock = _breaker(failure_threshold=1, base_delay=5.0, max_delay=15.0)
+    breaker.allow()
+    breaker.record_failure()
+
+    delays = []
+    for _ in range(3):
+        delays.append(breaker.state()["retry_in"])
+        clock[0] += delays[-1]
+        assert breaker.allow()
+        breaker.record_failure()
+
+    assert delays == [5.0, 10.0, 15.0]
+    assert breaker.state()["retry_in"] == 15.0
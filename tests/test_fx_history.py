@@ -0,0 +1,107 @@
+import io
+
+import numpy as np
+import pytest
+
+from investment_tracker.app import external_api
+from investment_tracker.app.db import (
+    add_asset,
+    get_asset_id_by_symbol,
+    add_transaction,
+    add_price_to_history,
+    get_all_transactions,
+)
+from investment_tracker.app.fx_ingest import ingest_fx_history
+from investment_tracker.app.price_ingest import iter_records
+from investment_tracker.app.timeseries import portfolio_value_series
+from investment_tracker.app.utils import convert_series
+
+RATES_CSV = (
+    "date,base,quote,rate\n"
+    "2024-01-01,DKK,USD,0.15\n"
+    "2024-01-03,DKK,USD,0.10\n"
+    "2024-01-01,DKK,EUR,0.13\n"
+    "2024-01-02,DKK,XX,1\n"        # rejected: not a currency code
+    "2024-01-02,DKK,EUR,-1\n"      # rejected: not positive
+    "2024-13-01,DKK,EUR,0.13\n"    # rejected: bad date
+)
+
+
+def _load_rates(app):
+    with app.app_context():
+        stream = io.BytesIO(RATES_CSV.encode())
+        return ingest_fx_history(iter_records(stream, "csv"))
+
+
+def _no_spot_rates(monkeypatch):
+    monkeypatch.setattr(external_api, "_fetch_exchange_rate", lambda base: None)
+
+
+def test_csv_load_stores_valid_rows_and_reports_the_rest(app):
+    result = _load_rates(app)
+
+    assert result["stored"] == 3
+    assert result["rejected_count"] == 3
+    assert [r["row"] for r in result["rejected"]] == [4, 5, 6]
+
+
+def test_convert_series_uses_the_rate_in_force_on_each_date(app):
+    _load_rates(app)
+    dates = ["2024-01-05", "2023-12-31", "2024-01-01", "2024-01-02", "2024-01-03"]
+
+    with app.app_context():
+        # Direct pair, unsorted dates; nothing known before the first rate
+        usd = convert_series([100.0] * 5, dates, "dkk", "USD")
+        # Inverse of a stored pair
+        dkk = convert_series([15.0, 10.0], ["2024-01-02", "2024-01-03"], "USD", "DKK")
+        # Cross pair through the DKK legs
+        eur = convert_series([0.15], ["2024-01-02"], "USD", "EUR")
+
+    assert np.isnan(usd[1])
+    assert usd[[0, 2, 3, 4]] == pytest.approx([10.0, 15.0, 15.0, 10.0])
+    assert dkk == pytest.approx([100.0, 100.0])
+    assert eur == pytest.approx([0.13])
+
+
+def test_convert_series_handles_many_dates_in_one_pass(app):
+    _load_rates(app)
+    days = np.datetime64("2024-01-01") + np.arange(100_000) % 5
+
+    with app.app_context():
+        converted = convert_series(np.ones(days.size), days, "DKK", "USD")
+
+    expected = np.where(days >= np.datetime64("2024-01-03"), 0.10, 0.15)
+    assert converted == pytest.approx(expected)
+
+
+def test_transaction_totals_use_their_own_dates_rate(app, monkeypatch):
+    _no_spot_rates(monkeypatch)
+    _load_rates(app)
+    with app.app_context():
+        add_asset("AAPL", "Apple Inc.", "Stock", "USD")
+        asset_id = get_asset_id_by_symbol("AAPL")
+        add_transaction(asset_id, "buy", "2024-01-02", 1.0, 15.0, 0.0)
+        add_transaction(asset_id, "buy", "2024-01-04", 1.0, 10.0, 0.0)
+        add_transaction(asset_id, "buy", "2023-06-01", 1.0, 10.0, 0.0)
+
+        totals = {t["date"]: t["total_price_dkk"] for t in get_all_transactions()}
+
+    assert totals["2024-01-02"] == pytest.approx(100.0)
+    assert totals["2024-01-04"] == pytest.approx(100.0)
+    # Before any history, and no current rate either
+    assert totals["2023-06-01"] is None
+
+
+def test_portfolio_value_series_converts_each_day_at_its_rate(app, monkeypatch):
+    _no_spot_rates(monkeypatch)
+    _load_rates(app)
+    with app.app_context():
+        add_asset("AAPL", "Apple Inc.", "Stock", "USD")
+        asset_id = get_asset_id_by_symbol("AAPL")
+        add_transaction(asset_id, "buy", "2024-01-01", 1.0, 15.0, 0.0)
+        add_price_to_history(asset_id, "2024-01-01", 15.0)
+
+        series = portfolio_value_series("2024-01-01", "2024-01-04")
+
+    assert series["values"] == pytest.approx([100.0, 100.0, 150.0, 150.0])
+    assert series["missing_currencies"] == []
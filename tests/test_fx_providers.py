@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from investment_tracker.app import external_api
+from investment_tracker.app.external_api import FileRateProvider, get_provider
+from investment_tracker.app.fx_ingest import ingest_fx_history, iter_provider_records
+from investment_tracker.app.fx_stub import StubRateServer
+from investment_tracker.app.utils import convert_currency, convert_series
+from shared.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture
+def rates_file(tmp_path):
+    path = tmp_path / "rates.json"
+    path.write_text(json.dumps({
+        "base": "DKK",
+        "rates": {"USD": 0.145, "EUR": 0.134},
+        "history": {"2024-01-02": {"USD": 0.15}},
+    }))
+    return str(path)
+
+
+@pytest.fixture
+def stub(app, monkeypatch):
+    # A fresh breaker, so failures from other tests do not leak in
+    monkeypatch.setattr(external_api, "_breaker", CircuitBreaker(failure_threshold=2))
+    with StubRateServer() as server:
+        app.config["FX_API_BASE_URL"] = server.base_url
+        yield server
+
+
+def test_file_provider_serves_latest_and_history(app, rates_file):
+    app.config["FX_PROVIDER"] = "file"
+    app.config["FX_RATES_FILE"] = rates_file
+
+    with app.app_context():
+        provider = get_provider()
+        assert isinstance(provider, FileRateProvider)
+        assert provider.latest("USD")["DKK"] == pytest.approx(1 / 0.145)
+        assert provider.historical("DKK", "2024-01-03") is None
+
+        assert convert_currency(100.0, "EUR", "USD") == pytest.approx(100 * 0.145 / 0.134)
+
+        ingest_fx_history(iter_provider_records("2024-01-01", "2024-01-03"))
+        assert convert_series([1.0], ["2024-01-05"], "DKK", "USD") == pytest.approx([0.15])
+
+
+def test_unknown_provider_is_rejected(app):
+    app.config["FX_PROVIDER"] = "carrier-pigeon"
+    with app.app_context():
+        with pytest.raises(ValueError):
+            get_provider()
+
+
+def test_live_provider_against_the_stub(app, stub):
+    with app.app_context():
+        assert convert_currency(100.0, "DKK", "SEK") == pytest.approx(155.0)
+        assert convert_currency(100.0, "USD", "EUR") == pytest.approx(100 * 0.134 / 0.145)
+        assert external_api.fetch_historical_rates("USD", "2024-01-02")["USD"] == pytest.approx(1.0)
+
+    assert stub.calls == 2
+
+
+def test_stub_errors_open_the_breaker(app, client, stub):
+    stub.error_rate = 1.0
+
+    with app.app_context():
+        for _ in range(4):
+            assert external_api._fetch_exchange_rate("DKK") is None
+
+    assert stub.calls == 2
+    status = client.get("/finance/investments/api/fx-status").get_json()
+    assert status["provider"] == "exchangerate-api"
+    assert status["breaker"]["state"] == "open"
@@ -0,0 +1,271 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from investment_tracker.app import db, external_api, pnl, timeseries, utils
+from investment_tracker.app.utils import convert_currency, prefetch_rates
+from shared.circuit_breaker import CircuitBreaker
+
+DKK_TABLE = {"DKK": 1.0, "USD": 0.145, "EUR": 0.134, "SEK": 1.55}
+
+
+def _fake_provider(monkeypatch, table=DKK_TABLE, delay=0.0, gate=None):
+    calls = []
+
+    def fake_fetch(base_currency):
+        calls.append(base_currency)
+        time.sleep(delay)
+        if gate is not None:
+            gate.wait(5)
+        return dict(table) if table is not None else None
+
+    monkeypatch.setattr(external_api, "_fetch_exchange_rate", fake_fetch)
+    return calls
+
+
+def test_every_pair_comes_from_one_stored_table(app, monkeypatch):
+    calls = _fake_provider(monkeypatch)
+
+    with app.app_context():
+        assert convert_currency(100.0, "USD", "DKK") == pytest.approx(100 / 0.145)
+        assert convert_currency(100.0, "eur", "SEK") == pytest.approx(100 * 1.55 / 0.134)
+        assert convert_currency(100.0, "DKK", "EUR") == pytest.approx(13.4)
+        assert external_api.get_exchange_rate("USD")["DKK"] == pytest.approx(1 / 0.145)
+        assert convert_currency(100.0, "XXX", "DKK") is None
+
+        assert db.get_fx_rates("DKK")["rates"] == DKK_TABLE
+
+    assert calls == ["DKK"]
+
+
+def test_failures_are_not_stored_and_briefly_not_retried(app, monkeypatch):
+    calls = _fake_provider(monkeypatch, table=None)
+
+    with app.app_context():
+        assert convert_currency(1.0, "USD", "DKK") is None
+        assert convert_currency(1.0, "USD", "DKK") is None
+        assert db.get_fx_rates("DKK") is None
+        assert calls == ["DKK"]
+
+        # Once the negative entry expires the provider is asked again
+        external_api._failed_fetches.clear()
+        convert_currency(1.0, "USD", "DKK")
+
+    assert calls == ["DKK", "DKK"]
+
+
+def test_concurrent_misses_share_one_fetch(app, monkeypatch):
+    calls = _fake_provider(monkeypatch, delay=0.2)
+    results = []
+
+    def convert():
+        with app.app_context():
+            results.append(convert_currency(1.0, "USD", "DKK"))
+
+    threads = [threading.Thread(target=convert) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == ["DKK"]
+    assert results == [pytest.approx(1 / 0.145)] * 5
+
+
+def test_stored_rates_are_served_without_the_network(app, monkeypatch):
+    calls = _fake_provider(monkeypatch)
+
+    with app.app_context():
+        # As after a restart: the table is on disk, nothing in memory
+        db.save_fx_rates("DKK", {"DKK": 1.0, "EUR": 0.1})
+        assert convert_currency(1.0, "EUR", "DKK") == pytest.approx(10.0)
+
+    assert calls == []
+
+
+def test_stale_rates_are_served_while_one_refresh_runs(app, monkeypatch):
+    # The refresh cannot finish until both stale reads are done
+    gate = threading.Event()
+    calls = _fake_provider(monkeypatch, gate=gate)
+
+    with app.app_context():
+        db.save_fx_rates("DKK", {"DKK": 1.0, "EUR": 0.1},
+                         fetched_at=time.time() - 2 * external_api.EXCHANGE_RATE_TTL)
+
+        # Both reads get the stale table at once; only the first claims the refresh
+        assert convert_currency(1.0, "EUR", "DKK") == pytest.approx(10.0)
+        assert convert_currency(1.0, "EUR", "DKK") == pytest.approx(10.0)
+        gate.set()
+        external_api.wait_for_refreshes(5)
+
+        assert calls == ["DKK"]
+        assert convert_currency(1.0, "EUR", "DKK") == pytest.approx(1 / 0.134)
+
+
+def _holdings(currencies):
+    for currency in currencies:
+        symbol = f"ASSET{currency}"
+        db.add_asset(symbol, symbol, "Stock", currency)
+        asset_id = db.get_asset_id_by_symbol(symbol)
+        db.add_transaction(asset_id, "buy", "2024-01-01", 2.0, 10.0, 0.0)
+        db.add_price_to_history(asset_id, "2024-01-01", 10.0)
+
+
+def test_summary_is_rendered_by_the_deadline_with_missing_rates_flagged(app, monkeypatch):
+    app.config["FX_PREFETCH_TIMEOUT"] = 0.2
+    calls = _fake_provider(monkeypatch, delay=1.0)
+
+    with app.app_context():
+        _holdings(["DKK", "USD", "EUR", "SEK"])
+
+        started = time.perf_counter()
+        summary = db.get_portfolio_summary()
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.8
+        assert summary["ASSETDKK"]["asset_dkk_price"] == pytest.approx(10.0)
+        assert not summary["ASSETDKK"]["fx_missing"]
+        for symbol in ("ASSETUSD", "ASSETEUR", "ASSETSEK"):
+            assert summary[symbol]["asset_dkk_price"] is None
+            assert summary[symbol]["fx_missing"]
+
+        # The late fetch still lands, and the degraded summary was not
+        # kept in the shared cache
+        external_api.get_rate_table()
+        summary = db.get_portfolio_summary()
+
+    assert summary["ASSETUSD"]["asset_dkk_price"] == pytest.approx(10.0 / 0.145)
+    assert not summary["ASSETUSD"]["fx_missing"]
+    assert calls == ["DKK"]
+
+
+def test_every_current_rate_lookup_is_bounded_by_the_deadline(app, client, monkeypatch):
+    app.config["FX_PREFETCH_TIMEOUT"] = 0.2
+    _fake_provider(monkeypatch, delay=3.0)
+
+    with app.app_context():
+        _holdings(["DKK", "USD"])
+
+        started = time.perf_counter()
+        summary = pnl.get_pnl_summary()
+        series = timeseries.portfolio_value_series("2024-01-01", "2024-01-03")
+    transactions = client.get("/finance/investments/api/transactions").get_json()["transactions"]
+    elapsed = time.perf_counter() - started
+
+    # Three deadlines, not the provider's full delay
+    assert elapsed < 2.0
+    assert summary["assets"]["ASSETUSD"]["market_value_dkk"] is None
+    assert summary["assets"]["ASSETDKK"]["market_value_dkk"] == pytest.approx(20.0)
+    assert series["missing_currencies"] == ["USD"]
+    totals = {t["symbol"]: t["total_price_dkk"] for t in transactions}
+    assert totals == {"ASSETDKK": pytest.approx(20.0), "ASSETUSD": None}
+
+
+def test_prefetch_reads_the_rate_table_once(app, monkeypatch):
+    _fake_provider(monkeypatch)
+    reads = []
+
+    def counting_table(timeout=None):
+        reads.append(timeout)
+        return external_api.get_rate_table(timeout)
+
+    monkeypatch.setattr(utils, "get_rate_table", counting_table)
+
+    with app.app_context():
+        rates = prefetch_rates(["usd", "USD", "EUR", "DKK", "XXX"], "DKK")
+        assert prefetch_rates(["DKK"], "DKK") == {"DKK": 1.0}
+
+    assert reads == [utils.FX_PREFETCH_TIMEOUT]
+
+    assert rates == {
+        "USD": pytest.approx(1 / 0.145),
+        "EUR": pytest.approx(1 / 0.134),
+        "DKK": 1.0,
+        "XXX": None,
+    }
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"result": "success", "conversion_rates": DKK_TABLE}
+
+
+def test_open_circuit_skips_the_provider_until_the_trial_call(app, client, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(external_api, "_breaker",
+                        CircuitBreaker(failure_threshold=2, base_delay=10.0, clock=lambda: clock[0]))
+    sent = []
+    up = [False]
+
+    def fake_get(url, timeout):
+        sent.append(url)
+        if not up[0]:
+            raise requests.exceptions.ConnectTimeout("provider down")
+        return _FakeResponse()
+
+    monkeypatch.setattr(external_api._session, "get", fake_get)
+
+    for _ in range(5):
+        assert external_api._fetch_exchange_rate("DKK") is None
+    assert len(sent) == 2
+
+    status = client.get("/finance/investments/api/fx-status").get_json()
+    assert status["breaker"]["state"] == "open"
+    assert status["breaker"]["rejected"] == 3
+    assert status["table"]["stored"] is False
+
+    # After the cool-down one trial call goes out and closes the circuit
+    clock[0] = 10.0
+    up[0] = True
+    assert external_api._fetch_exchange_rate("DKK") == DKK_TABLE
+    assert len(sent) == 3
+    assert external_api._breaker.state()["state"] == "closed"
+
+
+class _MalformedResponse(_FakeResponse):
+    def json(self):
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+
+@pytest.mark.parametrize("response", [_MalformedResponse(), None])
+def test_failed_trial_call_reopens_the_circuit(app, monkeypatch, response):
+    clock = [0.0]
+    monkeypatch.setattr(external_api, "_breaker",
+                        CircuitBreaker(failure_threshold=1, base_delay=10.0, clock=lambda: clock[0]))
+    sent = []
+
+    def fake_get(url, timeout):
+        sent.append(url)
+        if response is None:
+            raise RuntimeError("not a requests error")
+        return response
+
+    monkeypatch.setattr(external_api._session, "get", fake_get)
+
+    def fetch():
+        try:
+            return external_api._fetch_exchange_rate("DKK")
+        except RuntimeError:
+            return None
+
+    assert fetch() is None
+    assert external_api._breaker.state()["state"] == "open"
+
+    # The half-open trial fails the same way; the breaker opens again
+    # instead of waiting on a trial that never reports back
+    clock[0] = 10.0
+    assert fetch() is None
+    assert external_api._breaker.state()["state"] == "open"
+
+    clock[0] = 40.0
+    monkeypatch.setattr(external_api._session, "get", lambda url, timeout: _FakeResponse())
+    assert external_api._fetch_exchange_rate("DKK") == DKK_TABLE
+    assert external_api._breaker.state()["state"] == "closed"
+    assert len(sent) == 2
@@ -0,0 +1,83 @@
+import pytest
+
+from investment_tracker.app.db import (
+    add_asset,
+    get_asset_id_by_symbol,
+    add_transaction,
+    add_transactions_bulk,
+    get_db_connection,
+    get_holdings,
+    rebuild_holdings,
+    verify_holdings,
+)
+
+
+def _asset(app, symbol="NOVO"):
+    with app.app_context():
+        add_asset(symbol, "Novo Nordisk", "Stock", "DKK")
+        return get_asset_id_by_symbol(symbol)
+
+
+def test_insert_updates_totals_and_last_date(app):
+    asset_id = _asset(app)
+    with app.app_context():
+        add_transaction(asset_id, "buy", "2024-03-01", 10.0, 500.0, 5.0)
+        add_transaction(asset_id, "buy", "2024-01-01", 2.0, 400.0, 0.0)
+        add_transaction(asset_id, "sell", "2024-02-01", 4.0, 600.0, 1.0)
+
+        row = get_holdings(asset_id)
+        assert row["quantity"] == pytest.approx(8.0)
+        assert row["cost_total"] == pytest.approx(10 * 500 + 5 + 2 * 400)
+        assert row["proceeds_total"] == pytest.approx(4 * 600)
+        assert row["fees_total"] == pytest.approx(6.0)
+        assert row["transaction_count"] == 3
+        assert row["last_transaction_date"] == "2024-03-01"
+
+
+def test_delete_updates_holdings_and_removes_empty_rows(app):
+    asset_id = _asset(app)
+    with app.app_context():
+        add_transaction(asset_id, "buy", "2024-01-01", 10.0, 500.0, 0.0)
+        add_transaction(asset_id, "buy", "2024-05-01", 5.0, 500.0, 0.0)
+
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM transactions WHERE date = '2024-05-01';")
+            conn.commit()
+
+        row = get_holdings(asset_id)
+        assert row["quantity"] == pytest.approx(10.0)
+        assert row["last_transaction_date"] == "2024-01-01"
+
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM transactions;")
+            conn.commit()
+
+        assert get_holdings(asset_id) is None
+
+
+def test_bulk_insert_keeps_holdings_consistent(app):
+    first = _asset(app, "AAA")
+    second = _asset(app, "BBB")
+    with app.app_context():
+        rows = [(first if i % 2 else second, "buy" if i % 3 else "sell",
+                 f"2024-01-{(i % 28) + 1:02d}", 1.5, 10.0 + i, 0.25)
+                for i in range(300)]
+        add_transactions_bulk(rows)
+
+        assert verify_holdings() == []
+
+
+def test_verify_detects_drift_and_rebuild_repairs_it(app):
+    asset_id = _asset(app)
+    with app.app_context():
+        add_transaction(asset_id, "buy", "2024-01-01", 10.0, 500.0, 0.0)
+
+        with get_db_connection() as conn:
+            conn.execute("UPDATE holdings SET quantity = 99 WHERE asset_id = ?;", (asset_id,))
+            conn.commit()
+
+        mismatches = verify_holdings()
+        assert [m["field"] for m in mismatches] == ["quantity"]
+
+        rebuild_holdings()
+        assert verify_holdings() == []
@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+
+import pytest
+
+from investment_tracker.app.db import add_asset, add_transaction, add_price_to_history
+from portal import live_stream
+from shared.broadcast import Broadcaster, format_event
+
+SAMPLE = {"time": 1.0, "cpu_usage": 12.5, "memory_usage": 40.0, "cpu_temp": "N/A",
+          "disk_usage": 70.0, "load_average": [0.1, 0.1, 0.1]}
+
+
+class FakeSampler:
+    def __init__(self):
+        self.sample = dict(SAMPLE)
+        self.reads = 0
+
+    def latest(self):
+        self.reads += 1
+        return dict(self.sample)
+
+
+@pytest.fixture
+def sampler(monkeypatch):
+    fake = FakeSampler()
+    monkeypatch.setattr(live_stream, "get_sampler", lambda: fake)
+    yield fake
+    live_stream.stop_producer()
+
+
+def _events(body):
+    """(event, data) pairs in an SSE body."""
+
+    pairs = []
+    for message in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            pairs.append((lines["event"], json.loads(lines["data"])))
+    return pairs
+
+
+def test_publish_skips_unchanged_values_and_replays_latest():
+    hub = Broadcaster()
+    first = hub.subscribe()
+
+    assert hub.publish("system", {"cpu": 1})
+    assert not hub.publish("system", {"cpu": 1})
+    assert not hub.publish("system", {"cpu": 1, "time": 2}, key={"cpu": 1})
+    assert first.get(0) == ("system", {"cpu": 1})
+
+    # A late subscriber starts from the latest values of the events it wants
+    hub.publish("portfolio", {"total": 5})
+    late = hub.subscribe({"portfolio"})
+    assert late.get(0) == ("portfolio", {"total": 5})
+    assert late.get(0) is None
+
+    stats = hub.stats()
+    assert stats["subscribers"] == 2 and stats["published"] == 2 and stats["unchanged"] >= 1
+
+
+def test_slow_subscriber_loses_oldest_events():
+    hub = Broadcaster(queue_size=2)
+    slow = hub.subscribe()
+    for value in range(5):
+        hub.publish("system", value)
+
+    assert [slow.get(0), slow.get(0), slow.get(0)] == [("system", 3), ("system", 4), None]
+    assert hub.stats()["dropped"] == 3
+    hub.unsubscribe(slow)
+    assert hub.stats() == {**hub.stats(), "subscribers": 0, "dropped": 3}
+
+
+def test_one_poll_serves_every_client(app, sampler):
+    hub = Broadcaster()
+    producer = live_stream.LiveProducer(app, hub)
+    clients = [hub.subscribe({"system"}) for _ in range(20)]
+
+    assert producer.poll() == ["system", "portfolio"]
+    assert sampler.reads == 1
+    assert all(client.get(0) == ("system", SAMPLE) for client in clients)
+
+    # A new timestamp alone is not a change; the portfolio is not due yet
+    sampler.sample["time"] = 2.0
+    assert producer.poll() == []
+    sampler.sample["cpu_usage"] = 50.0
+    assert producer.poll() == ["system"]
+
+
+def test_portfolio_changes_are_pushed(app, sampler):
+    app.config["SSE_PORTFOLIO_INTERVAL"] = 0
+    hub = Broadcaster()
+    producer = live_stream.LiveProducer(app, hub)
+    subscription = hub.subscribe({"portfolio"})
+
+    producer.poll()
+    assert subscription.get(0) == ("portfolio", {"total_value_dkk": 0.0, "assets": 0, "fx_missing": False})
+
+    with app.app_context():
+        add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+        add_transaction(1, "buy", "2024-01-02", 10, 100.0, 0.0)
+        add_price_to_history(1, "2024-01-03", 120.0)
+
+    assert producer.poll() == ["portfolio"]
+    assert subscription.get(0)[1]["total_value_dkk"] == 1200.0
+    assert producer.poll() == []
+
+
+def test_stream_endpoint(app, client, sampler):
+    app.config["SSE_MAX_SECONDS"] = 0.2
+    app.config["SSE_HEARTBEAT"] = 0.05
+    app.config["SSE_SYSTEM_INTERVAL"] = 60
+
+    response = client.get("/api/stream?events=system")
+    assert response.mimetype == "text/event-stream"
+    body = response.get_data(as_text=True)
+
+    assert body.startswith("retry: ")
+    assert _events(body) == [("system", SAMPLE)]
+    assert ": heartbeat" in body
+    # The finished stream unsubscribed itself
+    assert live_stream.get_hub(app).subscriber_count == 0
+
+    assert client.get("/api/stream?events=nope").status_code == 400
+
+
+def test_streams_over_the_cap_are_refused(app, client, sampler):
+    app.config["SSE_MAX_CLIENTS"] = 1
+    app.config["SSE_MAX_SECONDS"] = 0.05
+    app.config["SSE_SYSTEM_INTERVAL"] = 60
+
+    hub = live_stream.get_hub(app)
+    held = live_stream.open_stream(app)
+    assert live_stream.open_stream(app) is None
+
+    response = client.get("/api/stream?events=system")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    assert hub.stats()["rejected"] == 2
+
+    # A freed slot can be taken again, and the finished stream frees it too
+    live_stream.close_stream(held)
+    assert client.get("/api/stream?events=system").status_code == 200
+    assert hub.subscriber_count == 0
+
+
+def test_first_poll_runs_off_the_request_thread(app, sampler, monkeypatch):
+    polls = []
+
+    def slow_failing_poll(self):
+        polls.append(threading.current_thread().name)
+        time.sleep(0.5)
+        raise RuntimeError("portfolio summary failed")
+
+    monkeypatch.setattr(live_stream.LiveProducer, "poll", slow_failing_poll)
+
+    started = time.perf_counter()
+    hub = live_stream.get_hub(app)
+    assert time.perf_counter() - started < 0.4
+
+    # A failed first poll leaves the one producer in place
+    deadline = time.monotonic() + 2
+    while not polls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert polls == ["live-producer"]
+    assert live_stream.get_hub(app) is hub
+
+
+def test_format_event():
+    assert format_event("system", {"a": 1}) == 'event: system\ndata: {"a": 1}\n\n'
@@ -0,0 +1,106 @@
+import pytest
+import requests
+
+from investment_tracker.app import external_api
+from investment_tracker.app.db import add_asset
+from investment_tracker.app.utils import convert_currency
+from shared import metrics, sql_trace
+from shared.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset_metrics()
+    yield
+
+
+def _sample(text, line_start):
+    """Value of the first exposition line starting with line_start."""
+
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"No sample {line_start} in:\n{text}")
+
+
+def test_histogram_buckets_are_cumulative():
+    latency = metrics.histogram("test_latency_seconds", "Test latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, route="/a")
+
+    text = metrics.render()
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 2' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="1.0"} 3' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'test_latency_seconds_count{route="/a"} 4' in text
+    assert _sample(text, 'test_latency_seconds_sum{route="/a"}') == pytest.approx(3.65)
+
+    with pytest.raises(ValueError):
+        latency.observe(1.0, path="/a")
+
+
+def test_statement_kinds():
+    assert sql_trace.statement_kind("  SELECT 1;") == "select"
+    assert sql_trace.statement_kind("INSERT INTO t VALUES (1)") == "insert"
+    assert sql_trace.statement_kind("-- TRIGGER trg_holdings") == "trigger"
+
+
+def test_requests_and_their_sql_are_timed(app, client):
+    with app.app_context():
+        add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+    metrics.reset_metrics()
+
+    assert client.get("/finance/investments/manage").status_code == 200
+    assert client.get("/no-such-page").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+
+    endpoint = 'endpoint="investment_web.manage"'
+    assert _sample(text, f'http_requests_total{{{endpoint},method="GET",status="200"}}') == 1
+    assert _sample(text, 'http_requests_total{endpoint="unmatched",method="GET",status="404"}') == 1
+    assert _sample(text, f'http_request_duration_seconds_count{{{endpoint},method="GET"}}') == 1
+    assert _sample(text, f'http_request_sql_queries_count{{{endpoint}}}') == 1
+    assert metrics.REQUEST_SQL_QUERIES.sum(endpoint="investment_web.manage") >= 1
+
+    database = app.config["INVESTMENT_DATABASE"].rsplit("/", 1)[-1]
+    assert sql_trace.QUERY_SECONDS.count(database=database, kind="select") >= 1
+    assert sql_trace.STATEMENTS.value(database=database, kind="select") >= 1
+    assert "sqlite_pool_open_connections" in text
+    assert "read_cache_hits" in text
+
+
+def test_fx_table_reads_and_upstream_calls_are_counted(app, monkeypatch):
+    monkeypatch.setattr(external_api, "_fetch_exchange_rate", lambda base: {"DKK": 1.0, "USD": 0.145})
+
+    with app.app_context():
+        convert_currency(1.0, "USD", "DKK")
+        convert_currency(1.0, "USD", "DKK")
+
+    assert external_api.TABLE_READS.value(result="miss") == 1
+    assert external_api.TABLE_READS.value(result="hit") == 1
+
+
+class _UnreadableResponse:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        raise requests.exceptions.JSONDecodeError("Expecting value", "<html>", 0)
+
+
+def test_unreadable_upstream_body_is_counted_once(app, monkeypatch):
+    monkeypatch.setattr(external_api, "_breaker", CircuitBreaker())
+    monkeypatch.setattr(external_api._session, "get", lambda url, timeout: _UnreadableResponse())
+
+    with app.app_context():
+        assert external_api._fetch_exchange_rate("DKK") is None
+
+    assert external_api.UPSTREAM_REQUESTS.value(outcome="bad_response") == 1
+    assert external_api.UPSTREAM_REQUESTS.value(outcome="ok") == 0
+    assert external_api.UPSTREAM_REQUESTS.value(outcome="transport_error") == 0
@@ -0,0 +1,109 @@
+import sqlite3
+
+import pytest
+
+from investment_tracker.app import db as investment_db
+from memberships.app import db as memberships_db
+from shared.migrations import get_schema_version, run_migrations
+
+
+def _index_names(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA index_list({table});")}
+
+
+def test_new_databases_are_at_latest_version(app):
+    with app.app_context():
+        with investment_db.get_db_connection() as conn:
+            assert get_schema_version(conn) == investment_db.MIGRATIONS[-1][0]
+            assert "idx_transactions_asset_date" in _index_names(conn, "transactions")
+            assert "idx_transactions_date" in _index_names(conn, "transactions")
+
+        with memberships_db.get_db_connection() as conn:
+            assert get_schema_version(conn) == memberships_db.MIGRATIONS[-1][0]
+            assert "idx_memberships_paid_renewal" in _index_names(conn, "memberships")
+
+
+def test_current_database_runs_no_ddl(app):
+    with app.app_context():
+        with investment_db.get_db_connection() as conn:
+            statements = []
+            conn.set_trace_callback(statements.append)
+            try:
+                run_migrations(conn, investment_db.MIGRATIONS)
+            finally:
+                conn.set_trace_callback(None)
+
+        assert statements == ["PRAGMA user_version;"]
+
+
+def test_legacy_memberships_table_gets_renewal_date(tmp_path):
+    legacy = sqlite3.connect(tmp_path / "legacy.db")
+    legacy.row_factory = sqlite3.Row
+    legacy.execute("""
+        CREATE TABLE memberships (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            organization TEXT NOT NULL,
+            description TEXT,
+            membership_type TEXT NOT NULL,
+            member_since TEXT NOT NULL,
+            is_paid INTEGER NOT NULL DEFAULT 0,
+            payment_frequency TEXT,
+            price_per_period REAL,
+            currency TEXT
+        );
+    """)
+    legacy.execute("INSERT INTO memberships (organization, membership_type, member_since) "
+                   "VALUES ('Gym', 'Basic', '2020-01-01');")
+    legacy.commit()
+
+    run_migrations(legacy, memberships_db.MIGRATIONS)
+
+    columns = [row["name"] for row in legacy.execute("PRAGMA table_info(memberships);")]
+    assert "renewal_date" in columns
+    assert legacy.execute("SELECT COUNT(*) FROM memberships;").fetchone()[0] == 1
+    legacy.close()
+
+
+def test_failed_migration_rolls_back_and_keeps_version(tmp_path):
+    conn = sqlite3.connect(tmp_path / "broken.db")
+    migrations = [
+        (1, "Create table", ["CREATE TABLE t (x INTEGER);"]),
+        (2, "Broken", ["CREATE INDEX idx_t_x ON t (x);", "CREATE INDEX oops ON missing (x);"]),
+    ]
+
+    with pytest.raises(sqlite3.OperationalError):
+        run_migrations(conn, migrations)
+
+    assert get_schema_version(conn) == 1
+    assert "idx_t_x" not in _index_names(conn, "t")
+    conn.close()
+
+
+def test_migration_applied_by_another_worker_is_skipped(tmp_path, monkeypatch):
+    path = tmp_path / "shared.db"
+    migrations = [
+        (1, "Create table", ["CREATE TABLE t (x INTEGER PRIMARY KEY);"]),
+        (2, "Backfill", ["INSERT INTO t (x) VALUES (1);"]),
+    ]
+    first = sqlite3.connect(path)
+    second = sqlite3.connect(path)
+
+    # The second worker read version 0 just before the first one migrated
+    assert get_schema_version(second) == 0
+    assert run_migrations(first, migrations) == 2
+
+    stale = [0]
+    real_version = get_schema_version
+
+    def version(conn):
+        if conn is second and stale:
+            return stale.pop()
+        return real_version(conn)
+
+    monkeypatch.setattr("shared.migrations.get_schema_version", version)
+
+    # Rechecked under the write lock, so the backfill does not run twice
+    assert run_migrations(second, migrations) == 2
+    assert second.execute("SELECT COUNT(*) FROM t;").fetchone()[0] == 1
+    first.close()
+    second.close()
@@ -0,0 +1,202 @@
+import contextlib
+import threading
+
+import pytest
+
+from investment_tracker.app import pnl
+from investment_tracker.app.db import (
+    add_asset,
+    get_asset_id_by_symbol,
+    add_transaction,
+    add_transactions_bulk,
+    add_price_to_history,
+    get_db_connection,
+)
+from investment_tracker.app.pnl import (
+    refresh_pnl,
+    rebuild_pnl,
+    get_pnl_summary,
+    get_realized_gains,
+)
+
+
+def _asset(app, symbol="NOVO"):
+    with app.app_context():
+        add_asset(symbol, "Novo Nordisk", "Stock", "DKK")
+        return get_asset_id_by_symbol(symbol)
+
+
+def _trades(asset_id):
+    add_transaction(asset_id, "buy", "2024-01-01", 10.0, 100.0, 0.0)
+    add_transaction(asset_id, "buy", "2024-02-01", 10.0, 200.0, 0.0)
+    add_transaction(asset_id, "sell", "2024-03-01", 15.0, 300.0, 10.0)
+    add_price_to_history(asset_id, "2024-03-01", 250.0)
+
+
+def test_fifo_matches_oldest_lots_first(app):
+    asset_id = _asset(app)
+    with app.app_context():
+        _trades(asset_id)
+        summary = get_pnl_summary("fifo")
+        gains = get_realized_gains("fifo")
+
+    position = summary["assets"]["NOVO"]
+    assert position["quantity"] == pytest.approx(5.0)
+    assert position["cost_basis"] == pytest.approx(5 * 200.0)
+    assert position["unrealized_gain_dkk"] == pytest.approx(5 * 250.0 - 1000.0)
+
+    # 10 @ 100 + 5 @ 200 matched; proceeds net of the sell fee
+    assert gains[0]["cost_basis"] == pytest.approx(2000.0)
+    assert gains[0]["gain"] == pytest.approx(15 * 300.0 - 10.0 - 2000.0)
+    assert position["realized_gain_dkk"] == pytest.approx(gains[0]["gain"])
+
+
+def test_average_cost_uses_pooled_unit_cost(app):
+    asset_id = _asset(app)
+    with app.app_context():
+        _trades(asset_id)
+        summary = get_pnl_summary("average")
+
+    position = summary["assets"]["NOVO"]
+    assert position["average_cost"] == pytest.approx(150.0)
+    assert position["cost_basis"] == pytest.approx(750.0)
+    assert position["realized_gain"] == pytest.approx(4490.0 - 15 * 150.0)
+
+
+def test_appended_trade_replays_only_itself(app, monkeypatch):
+    monkeypatch.setattr(pnl, "CHECKPOINT_INTERVAL", 10)
+    asset_id = _asset(app)
+    with app.app_context():
+        rows = [(asset_id, "buy", f"2024-01-{day:02d}", 1.0, 100.0 + day, 0.0) for day in range(1, 29)]
+        add_transactions_bulk(rows)
+        assert refresh_pnl() == 28
+
+        add_transaction(asset_id, "sell", "2024-02-01", 3.0, 200.0, 0.0)
+        assert refresh_pnl() == 1
+        assert refresh_pnl() == 0
+
+        # A backdated trade replays from the nearest checkpoint (after day 20)
+        add_transaction(asset_id, "buy", "2024-01-25", 1.0, 50.0, 0.0)
+        assert refresh_pnl() == 10
+
+        incremental = get_pnl_summary("fifo")["assets"]["NOVO"]
+        rebuild_pnl()
+        rebuilt = get_pnl_summary("fifo")["assets"]["NOVO"]
+
+    assert incremental["cost_basis"] == pytest.approx(rebuilt["cost_basis"])
+    assert incremental["realized_gain"] == pytest.approx(rebuilt["realized_gain"])
+    assert incremental["realized_gain"] == pytest.approx(3 * 200.0 - (101 + 102 + 103))
+
+
+def test_trade_committed_during_a_refresh_is_not_lost(app, monkeypatch):
+    novo = _asset(app)
+    dsv = _asset(app, "DSV")
+    with app.app_context():
+        add_transaction(novo, "buy", "2024-01-01", 10.0, 100.0, 0.0)
+
+    def trade_from_another_thread():
+        with app.app_context():
+            add_transaction(dsv, "buy", "2024-01-02", 5.0, 50.0, 0.0)
+
+    class Rows(list):
+        def fetchall(self):
+            return list(self)
+
+    class Interleaved:
+        """Lets another thread commit a trade right after the first
+        pnl_dirty read."""
+
+        def __init__(self, conn):
+            self.conn = conn
+            self.done = False
+
+        def __getattr__(self, name):
+            return getattr(self.conn, name)
+
+        def execute(self, sql, *args):
+            result = self.conn.execute(sql, *args)
+            if sql == pnl.SELECT_DIRTY and not self.done:
+                self.done = True
+                rows = result.fetchall()
+                thread = threading.Thread(target=trade_from_another_thread)
+                thread.start()
+                thread.join()
+                return Rows(rows)
+            return result
+
+    real_connection = pnl.get_db_connection
+
+    @contextlib.contextmanager
+    def interleaved_connection():
+        with real_connection() as conn:
+            yield Interleaved(conn)
+
+    monkeypatch.setattr(pnl, "get_db_connection", interleaved_connection)
+    with app.app_context():
+        refresh_pnl()
+        monkeypatch.undo()
+        with get_db_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM pnl_dirty;").fetchone()[0] == 0
+        assert get_pnl_summary("fifo")["assets"]["DSV"]["quantity"] == 5.0
+
+
+def test_deleting_a_sell_removes_its_realized_gain(app):
+    asset_id = _asset(app)
+    with app.app_context():
+        _trades(asset_id)
+        assert len(get_realized_gains("fifo")) == 1
+
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM transactions WHERE transaction_type = 'sell';")
+            conn.commit()
+
+        assert get_realized_gains("fifo") == []
+        assert get_pnl_summary("fifo")["assets"]["NOVO"]["quantity"] == pytest.approx(20.0)
+
+
+def test_pnl_endpoint(app, client):
+    asset_id = _asset(app)
+    with app.app_context():
+        _trades(asset_id)
+
+    response = client.get("/finance/investments/api/pnl?method=average")
+    assert response.status_code == 200
+    assert response.get_json()["totals"]["cost_basis"] == pytest.approx(750.0)
+
+    assert client.get("/finance/investments/api/pnl?method=lifo").status_code == 400
+
+
+def test_zero_quantity_buy_adds_no_lot(app, client):
+    asset_id = _asset(app)
+    with app.app_context():
+        _trades(asset_id)
+        # Stored directly: the form now refuses it, older rows may exist
+        add_transaction(asset_id, "buy", "2024-03-02", 0.0, 120.0, 5.0)
+        summary = get_pnl_summary("fifo")
+
+    assert summary["assets"]["NOVO"]["quantity"] == pytest.approx(5.0)
+    assert summary["assets"]["NOVO"]["cost_basis"] == pytest.approx(1000.0)
+
+    response = client.post("/finance/investments/add-transaction", data={
+        "symbol": "NOVO", "transaction_type": "buy", "date": "2024-03-03",
+        "quantity": "0", "price_per_unit": "100"})
+    assert response.status_code == 302
+    with app.app_context():
+        assert len(pnl.get_realized_gains("fifo")) == 1
+        with get_db_connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM transactions WHERE date = '2024-03-03';").fetchone()[0]
+    assert count == 0
+
+
+def test_pnl_failure_keeps_the_holdings_on_the_dashboard(app, client, monkeypatch):
+    asset_id = _asset(app)
+    with app.app_context():
+        _trades(asset_id)
+
+    def broken(*args, **kwargs):
+        raise ZeroDivisionError("float division by zero")
+
+    monkeypatch.setattr("investment_tracker.app.routes_web.get_pnl_summary", broken)
+    response = client.get("/finance/investments/")
+    assert response.status_code == 200
+    assert 'data-asset-symbol="NOVO"' in response.get_data(as_text=True)
@@ -0,0 +1,58 @@
+import gzip
+
+import numpy as np
+from werkzeug.http import parse_accept_header
+
+from investment_tracker.app.db import add_asset, get_asset_id_by_symbol, add_price_to_history
+from investment_tracker.app.price_codec import (
+    COLUMNAR_MIMETYPE,
+    encode_price_columns,
+    decode_price_columns,
+    maybe_gzip,
+)
+
+
+def test_round_trip_keeps_days_prices_and_alignment():
+    histories = {
+        7: [("1970-01-02", 1.5), ("2024-02-29", 812.25), ("2024-03-01", 800.0)],
+        9: [],
+    }
+    payload = encode_price_columns(histories)
+    assert len(payload) % 8 == 0
+
+    decoded = decode_price_columns(payload)
+    days, prices = decoded[7]
+    assert np.datetime_as_string(days).tolist() == ["1970-01-02", "2024-02-29", "2024-03-01"]
+    assert prices.tolist() == [1.5, 812.25, 800.0]
+    assert decoded[9][0].size == 0
+
+
+def test_price_history_content_negotiation(app, client):
+    with app.app_context():
+        add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+        asset_id = get_asset_id_by_symbol("NOVO")
+        for day in range(1, 29):
+            add_price_to_history(asset_id, f"2024-02-{day:02d}", 100.0 + day)
+
+    url = f"/finance/investments/api/price-history/{asset_id}"
+
+    # JSON stays the default
+    assert client.get(url).get_json()[0] == {"date": "2024-02-01", "price": 101.0}
+
+    response = client.get(url, headers={"Accept": COLUMNAR_MIMETYPE})
+    assert response.mimetype == COLUMNAR_MIMETYPE
+    days, prices = decode_price_columns(response.data)[asset_id]
+    assert prices.size == 28 and prices[-1] == 128.0
+
+    batch = client.get(f"/finance/investments/api/price-history?ids={asset_id}&format=columnar",
+                       headers={"Accept-Encoding": "gzip"})
+    assert batch.headers.get("Content-Encoding") is None   # Too small to compress
+    assert decode_price_columns(batch.data)[asset_id][1].tolist() == prices.tolist()
+
+    large = encode_price_columns({asset_id: [(f"2024-02-{d:02d}", 1.0) for d in range(1, 29)] * 10})
+    body, encoding = maybe_gzip(large, parse_accept_header("gzip, deflate"))
+    assert encoding == "gzip" and gzip.decompress(body) == large
+
+    # q=0 explicitly refuses gzip
+    for refusal in ("gzip;q=0", "deflate, gzip;q=0", "identity"):
+        assert maybe_gzip(large, parse_accept_header(refusal)) == (large, None)
@@ -0,0 +1,98 @@
+import io
+import json
+
+from investment_tracker.app.db import (
+    add_asset,
+    get_asset_id_by_symbol,
+    add_price_to_history,
+    get_price_history,
+)
+from investment_tracker.app.price_ingest import ingest_prices, iter_records
+
+
+def _add_asset(app):
+    with app.app_context():
+        add_asset("AAPL", "Apple Inc.", "Stock", "USD")
+        return get_asset_id_by_symbol("AAPL")
+
+
+def test_csv_ingest_counts_inserts_updates_and_unchanged(app):
+    asset_id = _add_asset(app)
+    with app.app_context():
+        add_price_to_history(asset_id, "2024-01-01", 100.0)
+        add_price_to_history(asset_id, "2024-01-02", 101.0)
+
+        csv_text = (
+            "symbol,date,price\n"
+            "AAPL,2024-01-01,100\n"      # unchanged
+            "AAPL,2024-01-02,105\n"      # updated
+            "AAPL,2024-01-03,106\n"      # inserted
+            "aapl,2024-01-04,107\n"      # inserted (symbol is case-insensitive)
+            "MSFT,2024-01-04,1\n"        # rejected
+        )
+        result = ingest_prices(iter_records(io.BytesIO(csv_text.encode()), "csv"), chunk_size=2)
+
+        assert result["inserted"] == 2
+        assert result["updated"] == 1
+        assert result["unchanged"] == 1
+        assert result["rejected_count"] == 1
+
+        history = get_price_history(asset_id)
+        assert [row["price"] for row in history] == [100.0, 105.0, 106.0, 107.0]
+
+
+def test_duplicate_keys_in_one_chunk_keep_last_price(app):
+    asset_id = _add_asset(app)
+    with app.app_context():
+        records = [
+            {"asset_id": asset_id, "date": "2024-01-01", "price": 1.0},
+            {"asset_id": asset_id, "date": "2024-01-01", "price": 2.0},
+        ]
+        result = ingest_prices(iter(records))
+
+        assert result["inserted"] == 1
+        assert [row["price"] for row in get_price_history(asset_id)] == [2.0]
+
+
+def test_non_finite_prices_are_rejected(app):
+    asset_id = _add_asset(app)
+    with app.app_context():
+        csv_text = "symbol,date,price\nAAPL,2024-01-01,nan\nAAPL,2024-01-02,inf\nAAPL,2024-01-03,5\n"
+        result = ingest_prices(iter_records(io.BytesIO(csv_text.encode()), "csv"))
+
+        assert result["inserted"] == 1
+        assert result["rejected_count"] == 2
+        assert [row["price"] for row in get_price_history(asset_id)] == [5.0]
+
+
+def test_jsonl_endpoint_streams_body(app, client):
+    asset_id = _add_asset(app)
+    lines = [json.dumps({"symbol": "AAPL", "date": f"2024-02-{day:02d}", "price": day})
+             for day in range(1, 11)]
+    body = "\n".join(lines + ["not json", ""])
+
+    response = client.post("/finance/investments/api/prices/ingest?format=jsonl",
+                           data=body, content_type="application/x-ndjson")
+    result = response.get_json()
+
+    assert response.status_code == 200
+    assert result["inserted"] == 10
+    assert result["rejected_count"] == 1
+    with app.app_context():
+        assert len(get_price_history(asset_id)) == 10
+
+
+def test_endpoint_rejects_malformed_csv(app, client):
+    _add_asset(app)
+    # A field over csv.field_size_limit() makes the reader raise csv.Error
+    body = "symbol,date,price\nAAPL,2024-01-01,\"" + "1" * 200_000 + "\"\n"
+
+    response = client.post("/finance/investments/api/prices/ingest?format=csv",
+                           data=body, content_type="text/csv")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_endpoint_rejects_unknown_format(client):
+    response = client.post("/finance/investments/api/prices/ingest?format=xml", data="")
+    assert response.status_code == 400
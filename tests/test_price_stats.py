@@ -0,0 +1,103 @@
+import pytest
+
+from investment_tracker.app.db import (
+    add_asset,
+    get_asset_id_by_symbol,
+    add_transaction,
+    add_price_to_history,
+    delete_asset_by_id,
+    get_latest_price,
+    get_price_stats,
+    get_portfolio_summary,
+)
+from investment_tracker.app import price_ingest
+from investment_tracker.app.price_ingest import ingest_prices
+
+
+def _asset(app):
+    with app.app_context():
+        add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+        return get_asset_id_by_symbol("NOVO")
+
+
+def test_stats_follow_single_price_writes(app):
+    asset_id = _asset(app)
+    with app.app_context():
+        add_price_to_history(asset_id, "2022-12-10", 50.0)   # Outside the 52-week window
+        add_price_to_history(asset_id, "2024-01-05", 120.0)
+        add_price_to_history(asset_id, "2023-06-01", 80.0)   # Out-of-order insert
+
+        stats = get_price_stats(asset_id)
+        assert stats["latest_date"] == "2024-01-05"
+        assert stats["latest_price"] == 120.0
+        assert stats["first_date"] == "2022-12-10"
+        assert stats["min_price"] == 50.0
+        assert stats["max_price"] == 120.0
+        assert stats["low_52w"] == 80.0
+        assert stats["high_52w"] == 120.0
+        assert stats["row_count"] == 3
+
+
+def test_stats_follow_ingest_updates(app):
+    asset_id = _asset(app)
+    with app.app_context():
+        ingest_prices([{"asset_id": asset_id, "date": f"2024-01-{day:02d}", "price": day}
+                       for day in range(1, 21)], chunk_size=7)
+        assert get_latest_price(asset_id) == 20.0
+
+        # Correcting the latest price is reflected immediately
+        ingest_prices([{"asset_id": asset_id, "date": "2024-01-20", "price": 2.5}])
+        stats = get_price_stats(asset_id)
+        assert stats["latest_price"] == 2.5
+        assert stats["max_price"] == 19.0
+        assert stats["row_count"] == 20
+
+
+def test_ingest_refreshes_stats_once_per_asset(app, monkeypatch):
+    asset_id = _asset(app)
+    refreshed = []
+    real_refresh = price_ingest.refresh_price_stats
+
+    def counting_refresh(conn, asset_ids):
+        asset_ids = list(asset_ids)
+        refreshed.append(asset_ids)
+        real_refresh(conn, asset_ids)
+
+    monkeypatch.setattr(price_ingest, "refresh_price_stats", counting_refresh)
+    with app.app_context():
+        ingest_prices([{"asset_id": asset_id, "date": f"2024-01-{day:02d}", "price": day}
+                       for day in range(1, 11)], chunk_size=2)
+        assert refreshed == [[asset_id]]
+        assert get_price_stats(asset_id)["row_count"] == 10
+
+        # Chunks committed before the input broke off still get their stats
+        def broken_input():
+            yield {"asset_id": asset_id, "date": "2024-02-01", "price": 50.0}
+            yield {"asset_id": asset_id, "date": "2024-02-02", "price": 60.0}
+            raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+
+        with pytest.raises(UnicodeDecodeError):
+            ingest_prices(broken_input(), chunk_size=2)
+        assert get_price_stats(asset_id)["max_price"] == 60.0
+
+
+def test_summary_reads_latest_price_and_52_week_range(app):
+    asset_id = _asset(app)
+    with app.app_context():
+        add_transaction(asset_id, "buy", "2024-01-01", 1.0, 100.0, 0.0)
+        add_price_to_history(asset_id, "2024-01-01", 100.0)
+        add_price_to_history(asset_id, "2024-01-02", 110.0)
+
+        entry = get_portfolio_summary()["NOVO"]
+        assert entry["latest_price"] == 110.0
+        assert entry["latest_price_date"] == "2024-01-02"
+        assert entry["asset_dkk_price"] == pytest.approx(110.0)
+        assert entry["low_52w"] == 100.0
+
+
+def test_deleting_asset_removes_stats(app):
+    asset_id = _asset(app)
+    with app.app_context():
+        add_price_to_history(asset_id, "2024-01-01", 100.0)
+        delete_asset_by_id(asset_id)
+        assert get_price_stats(asset_id) is None
@@ -0,0 +1,82 @@
+from investment_tracker.app import db as investment_db
+from memberships.app import db as memberships_db
+from shared.read_cache import get_cache_stats, reset_cache_stats, clear_cache
+
+
+def _count_queries(app, monkeypatch):
+    """Counts connections borrowed from the investment database's pool
+    (one per read)."""
+
+    calls = []
+    original = investment_db.sqlite_pool.acquire
+
+    def counting_acquire(db_path):
+        if db_path == app.config["INVESTMENT_DATABASE"]:
+            calls.append(db_path)
+        return original(db_path)
+
+    monkeypatch.setattr(investment_db.sqlite_pool, "acquire", counting_acquire)
+    return calls
+
+
+def test_reads_are_memoized_within_a_request(app, monkeypatch):
+    with app.app_context():
+        investment_db.add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+
+    calls = _count_queries(app, monkeypatch)
+    reset_cache_stats()
+
+    with app.test_request_context():
+        # Same sequence as the dashboard: summary, then value (which
+        # reads the summary again)
+        investment_db.get_portfolio_summary()
+        investment_db.get_portfolio_value()
+        investment_db.get_all_assets()
+        investment_db.get_all_assets()
+
+    assert len(calls) == 2        # One summary query, one assets query
+    stats = get_cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3   # summary, value, assets
+
+    # A new request starts empty
+    with app.test_request_context():
+        investment_db.get_all_assets()
+    assert len(calls) == 3
+
+
+def test_writes_invalidate_within_the_request(app):
+    with app.test_request_context():
+        assert investment_db.get_all_assets() == []
+        investment_db.add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+        assert len(investment_db.get_all_assets()) == 1
+
+        assert memberships_db.get_all_memberships() == []
+        memberships_db.add_membership("Gym", "", "Fitness", "2024-01-01", True,
+                                      "monthly", 300.0, "DKK")
+        assert memberships_db.get_total_monthly_cost() == {"DKK": 300.0}
+
+
+def test_process_mode_keeps_results_until_a_write(app, monkeypatch):
+    app.config["READ_CACHE_MODE"] = "process"
+    clear_cache()
+    calls = _count_queries(app, monkeypatch)
+
+    with app.test_request_context():
+        investment_db.get_all_assets()
+    with app.test_request_context():
+        investment_db.get_all_assets()
+    assert len(calls) == 1
+
+    with app.test_request_context():
+        investment_db.add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+    with app.test_request_context():
+        assert len(investment_db.get_all_assets()) == 1
+
+    clear_cache()
+
+
+def test_stats_endpoint(client):
+    response = client.get("/api/read_cache")
+    assert response.status_code == 200
+    assert {"hits", "misses", "invalidations", "hit_rate"} <= set(response.get_json())
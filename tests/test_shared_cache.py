@@ -0,0 +1,63 @@
+import multiprocessing
+
+from investment_tracker.app import db as investment_db
+from memberships.app import db as memberships_db
+from shared import shared_cache
+
+
+def test_values_round_trip_and_expire(app):
+    with app.app_context():
+        shared_cache.set("rates", {"DKK": 6.9}, ttl=60)
+        shared_cache.set("old", [1, 2], ttl=-1)
+
+        assert shared_cache.get("rates") == {"DKK": 6.9}
+        assert shared_cache.get("old") is None
+        assert shared_cache.get("missing", "default") == "default"
+
+
+def test_generation_bump_hides_older_entries(app):
+    with app.app_context():
+        generation = shared_cache.get_generation("ns")
+        shared_cache.set("key", 1, ttl=60, namespace="ns", generation=generation)
+        shared_cache.bump_generation("ns")
+        assert shared_cache.get("key") is None
+
+
+def _write_in_other_worker(config):
+    """Runs in a forked process, like a second gunicorn worker."""
+
+    from run import create_app
+    app = create_app(config)
+    with app.app_context():
+        investment_db.add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+        investment_db.add_transaction(investment_db.get_asset_id_by_symbol("NOVO"),
+                                      "buy", "2024-01-02", 2.0, 500.0, 0.0)
+
+
+def test_write_in_another_process_invalidates_shared_results(app):
+    with app.app_context():
+        investment_db.add_asset("DSV", "DSV", "Stock", "DKK")
+        investment_db.add_transaction(investment_db.get_asset_id_by_symbol("DSV"),
+                                      "buy", "2024-01-01", 1.0, 10.0, 0.0)
+        assert list(investment_db.get_portfolio_summary()) == ["DSV"]
+
+    config = type("ChildConfig", (), {key: app.config[key] for key in
+                  ("TESTING", "INVESTMENT_DATABASE", "MEMBERSHIPS_DATABASE", "SHARED_CACHE_DATABASE")})
+    child = multiprocessing.get_context("fork").Process(target=_write_in_other_worker, args=(config,))
+    child.start()
+    child.join(30)
+    assert child.exitcode == 0
+
+    with app.app_context():
+        # The cached summary predates the child's write, so it is re-read
+        assert sorted(investment_db.get_portfolio_summary()) == ["DSV", "NOVO"]
+
+
+def test_membership_totals_are_shared_and_invalidated(app):
+    with app.app_context():
+        memberships_db.add_membership("Gym", "", "Fitness", "2024-01-01", True, "monthly", 300.0, "DKK")
+        assert memberships_db.get_total_monthly_cost() == {"DKK": 300.0}
+
+        memberships_db.add_membership("Club", "", "Hobby", "2024-01-01", True, "yearly", 120.0, "DKK")
+        assert memberships_db.get_total_monthly_cost() == {"DKK": 310.0}
+
@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from shared.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_read():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return ["row"]
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", slow_read)))
+    leader.start()
+    started.wait(5)
+
+    waiters = [threading.Thread(target=lambda: results.append(flight.do("key", slow_read)))
+               for _ in range(4)]
+    for thread in waiters:
+        thread.start()
+    # Let the waiters reach the flight before the leader finishes
+    deadline = time.monotonic() + 5
+    while flight.stats()["coalesced"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *waiters]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [["row"]] * 5
+    assert flight.stats() == {"leaders": 1, "coalesced": 4}
+
+
+def test_errors_reach_the_caller_and_are_not_cached():
+    flight = SingleFlight()
+
+    def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", failing)
+
+    assert flight.do("key", lambda: 42) == 42
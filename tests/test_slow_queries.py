@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from investment_tracker.app.db import add_asset, add_transaction, get_all_transactions
+from shared import slow_queries
+from shared.sqlite_pool import close_pool
+
+
+@pytest.fixture
+def slow_app(app, tmp_path):
+    """The app with every statement logged (threshold 0 ms). The pooled
+    connections are reopened so they pick up the new settings."""
+
+    app.config["SQLITE_SLOW_QUERY_MS"] = 0
+    app.config["SQLITE_SLOW_QUERY_LOG"] = str(tmp_path / "slow.jsonl")
+    close_pool(app.config["INVESTMENT_DATABASE"])
+    close_pool(app.config["MEMBERSHIPS_DATABASE"])
+    slow_queries.reset_slow_queries()
+    yield app
+    slow_queries.reset_slow_queries()
+
+
+def _entry_for(fragment):
+    matches = [entry for entry in slow_queries.get_slow_queries(limit=0) if fragment in entry["sql"]]
+    assert matches, f"No slow query containing {fragment!r}"
+    return matches[0]
+
+
+def test_off_by_default(app):
+    slow_queries.reset_slow_queries()
+    with app.app_context():
+        add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+        get_all_transactions()
+    assert slow_queries.get_slow_queries() == []
+
+
+def test_records_caller_parameters_and_plan(slow_app):
+    with slow_app.app_context():
+        add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+        add_transaction(1, "buy", "2024-01-02", 10, 100.0, 0.0)
+        add_transaction(1, "buy", "2024-02-02", 5, 110.0, 0.0)
+        get_all_transactions()
+
+    insert = _entry_for("INSERT INTO transactions")
+    assert insert["count"] == 2
+    assert insert["callers"][0].startswith("investment_tracker.app.db.add_transaction:")
+    assert 1 in insert["slowest_parameters"]
+
+    history = _entry_for("FROM transactions")
+    assert history["plan"], "EXPLAIN QUERY PLAN was not captured"
+    assert history["max_ms"] >= history["mean_ms"] > 0
+
+    # The plain-cursor EXPLAIN is never logged itself
+    assert not [entry for entry in slow_queries.get_slow_queries(limit=0)
+                if entry["sql"].startswith("EXPLAIN")]
+
+
+def test_plan_flags():
+    plan = ["SCAN transactions", "SEARCH assets USING INTEGER PRIMARY KEY (rowid=?)",
+            "SCAN price_history USING COVERING INDEX idx_price", "USE TEMP B-TREE FOR ORDER BY"]
+    assert slow_queries.plan_flags(plan) == ["full table scan: transactions", "temp b-tree: ORDER BY"]
+
+
+def test_endpoint_lists_worst_first(slow_app, client):
+    with slow_app.app_context():
+        add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+
+    data = client.get("/api/slow_queries?sort=count&limit=3").get_json()
+    assert data["statements"] >= 1
+    counts = [entry["count"] for entry in data["queries"]]
+    assert len(counts) <= 3 and counts == sorted(counts, reverse=True)
+
+    assert client.get("/api/slow_queries?sort=nope").status_code == 400
+
+
+def test_log_file_and_cli(slow_app, capsys):
+    log_path = slow_app.config["SQLITE_SLOW_QUERY_LOG"]
+    with slow_app.app_context():
+        add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+        get_all_transactions()
+
+    with open(log_path, encoding="utf-8") as handle:
+        lines = [json.loads(line) for line in handle]
+    assert {"sql", "parameters", "ms", "caller", "plan"} <= set(lines[0])
+
+    summary = slow_queries.summarize_log(log_path, sort="count", limit=0)
+    assert sum(entry["count"] for entry in summary) == len(lines)
+    assert [entry for entry in summary if "FROM transactions" in entry["sql"]][0]["plan"]
+
+    capsys.readouterr()
+    slow_queries.main([log_path, "--top", "2"])
+    output = capsys.readouterr().out
+    assert output.startswith("1. [") and "2. [" in output and "3. [" not in output
+    assert "called from:" in output
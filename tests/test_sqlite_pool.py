@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+
+import pytest
+
+from investment_tracker.app import db as investment_db
+from memberships.app import db as memberships_db
+from shared.sqlite_pool import get_pool_stats, reset_pool_stats
+
+
+def test_connection_is_reused_between_calls(app):
+    with app.app_context():
+        with investment_db.get_db_connection() as first:
+            pass
+        with investment_db.get_db_connection() as second:
+            pass
+        assert first is second
+
+
+def test_each_database_gets_its_own_connection(app):
+    with app.app_context():
+        with investment_db.get_db_connection() as inv_conn:
+            pass
+        with memberships_db.get_db_connection() as mem_conn:
+            pass
+        assert inv_conn is not mem_conn
+
+
+def test_pool_counts_hits_and_misses(app):
+    with app.app_context():
+        # Warm the pool, then count only reuses
+        investment_db.get_all_assets()
+        reset_pool_stats()
+
+        investment_db.get_all_assets()
+        investment_db.get_all_assets()
+
+        stats = get_pool_stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 0
+
+
+def test_pragmas_are_applied_from_config(app):
+    app.config["SQLITE_CACHE_SIZE"] = -1234
+    with app.app_context():
+        # A fresh thread opens a new connection with the updated config
+        result = {}
+
+        def read_pragmas():
+            with app.app_context():
+                with investment_db.get_db_connection() as conn:
+                    result["journal_mode"] = conn.execute("PRAGMA journal_mode;").fetchone()[0]
+                    result["cache_size"] = conn.execute("PRAGMA cache_size;").fetchone()[0]
+
+        worker = threading.Thread(target=read_pragmas)
+        worker.start()
+        worker.join()
+
+        assert result["journal_mode"] == "wal"
+        assert result["cache_size"] == -1234
+
+
+def test_uncommitted_work_is_rolled_back_on_release(app):
+    with app.app_context():
+        with investment_db.get_db_connection() as conn:
+            conn.execute("INSERT INTO assets (symbol, name, asset_type, currency) VALUES ('X', 'X', 'Stock', 'DKK');")
+            # No commit
+
+        assert investment_db.get_all_assets() == []
+
+
+def test_connections_are_closed_when_their_thread_exits(app):
+    with app.app_context():
+        investment_db.get_all_assets()
+    baseline = get_pool_stats()["open_connections"]
+
+    opened = []
+
+    def read_in_thread():
+        with app.app_context():
+            with investment_db.get_db_connection() as conn:
+                opened.append(conn)
+
+    workers = [threading.Thread(target=read_in_thread) for _ in range(5)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert get_pool_stats()["open_connections"] == baseline
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1;")
@@ -0,0 +1,94 @@
+import time
+
+from collections import namedtuple
+
+import pytest
+
+from portal import system_sampler
+from portal.system_sampler import SystemSampler
+
+Usage = namedtuple("Usage", "percent")
+Sensor = namedtuple("Sensor", "current")
+
+
+@pytest.fixture
+def fake_psutil(monkeypatch):
+    """Deterministic psutil readings; records the intervals cpu_percent()
+    was asked to wait for."""
+
+    waits = []
+    cpu = iter(range(10, 1000, 10))
+
+    def cpu_percent(interval=None):
+        waits.append(interval)
+        return float(next(cpu))
+
+    psutil = system_sampler.psutil
+    monkeypatch.setattr(psutil, "cpu_percent", cpu_percent)
+    monkeypatch.setattr(psutil, "virtual_memory", lambda: Usage(42.0))
+    monkeypatch.setattr(psutil, "disk_usage", lambda path: Usage(73.5))
+    monkeypatch.setattr(psutil, "getloadavg", lambda: (0.5, 0.25, 0.125))
+    monkeypatch.setattr(psutil, "sensors_temperatures",
+                        lambda: {"cpu_thermal": [Sensor(51.23)]}, raising=False)
+    yield waits
+    system_sampler.stop_sampler()
+
+
+def test_only_the_first_sample_waits_for_cpu(fake_psutil):
+    sampler = SystemSampler(history=3)
+    first = sampler.sample()
+    for _ in range(4):
+        sampler.sample()
+
+    assert fake_psutil == [0.1, None, None, None, None]
+    assert first == {**first, "cpu_usage": 10.0, "memory_usage": 42.0, "cpu_temp": 51.2,
+                     "disk_usage": 73.5, "load_average": [0.5, 0.25, 0.12]}
+
+    # Ring buffer keeps the newest three, oldest first
+    assert [s["cpu_usage"] for s in sampler.history()] == [30.0, 40.0, 50.0]
+    assert [s["cpu_usage"] for s in sampler.history(2)] == [40.0, 50.0]
+    assert len(sampler.history(100)) == 3
+    # 0 and negative limits clamp to nothing, not to the whole buffer
+    assert sampler.history(0) == []
+    assert sampler.history(-5) == []
+    assert sampler.latest()["cpu_usage"] == 50.0
+
+
+def test_missing_sensors_and_load_average(fake_psutil, monkeypatch):
+    monkeypatch.delattr(system_sampler.psutil, "sensors_temperatures")
+    monkeypatch.delattr(system_sampler.psutil, "getloadavg")
+
+    sample = SystemSampler().sample()
+    assert sample["cpu_temp"] == "N/A"
+    assert sample["load_average"] is None
+
+
+def test_background_thread_keeps_sampling(fake_psutil):
+    sampler = SystemSampler(interval=0.01).start()
+    deadline = time.monotonic() + 2
+    while len(sampler.history()) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    sampler.stop()
+
+    assert len(sampler.history()) >= 3
+    assert not sampler.running
+
+
+def test_routes_serve_the_sampler(app, client, fake_psutil):
+    app.config["SYSTEM_SAMPLE_INTERVAL"] = 60
+    system_sampler.stop_sampler()
+
+    status = client.get("/api/system_status").get_json()
+    assert status["cpu_usage"] == 10.0 and status["disk_usage"] == 73.5
+
+    # Later polls read the stored sample instead of measuring again
+    client.get("/api/system_status")
+    assert fake_psutil == [0.1]
+
+    history = client.get("/api/system_history").get_json()
+    assert history["interval"] == 60
+    assert [s["cpu_usage"] for s in history["samples"]] == [10.0]
+
+    assert client.get("/api/system_history?limit=0").get_json()["samples"] == []
+    assert client.get("/api/system_history?limit=-5").get_json()["samples"] == []
+    assert len(client.get("/api/system_history?limit=5000").get_json()["samples"]) == 1
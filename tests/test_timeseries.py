@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from datetime import date, timedelta
+
+from investment_tracker.app.db import (
+    add_asset,
+    get_asset_id_by_symbol,
+    add_transaction,
+    add_price_to_history,
+)
+from investment_tracker.app.price_ingest import ingest_prices
+from investment_tracker.app.timeseries import portfolio_value_series, lttb_indices
+
+
+def _setup(app):
+    with app.app_context():
+        add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+        add_asset("DSV", "DSV", "Stock", "DKK")
+        novo = get_asset_id_by_symbol("NOVO")
+        dsv = get_asset_id_by_symbol("DSV")
+
+        add_transaction(novo, "buy", "2024-01-01", 10.0, 100.0, 0.0)
+        add_transaction(novo, "sell", "2024-01-04", 4.0, 120.0, 0.0)
+        add_transaction(dsv, "buy", "2024-01-03", 2.0, 50.0, 0.0)
+
+        add_price_to_history(novo, "2023-12-29", 100.0)
+        add_price_to_history(novo, "2024-01-03", 110.0)
+        add_price_to_history(dsv, "2024-01-04", 60.0)
+
+
+def test_values_use_cumulative_holdings_and_forward_filled_prices(app):
+    _setup(app)
+    with app.app_context():
+        series = portfolio_value_series("2024-01-01", "2024-01-05")
+
+    assert series["dates"] == ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+    assert series["values"] == pytest.approx([
+        10 * 100,               # Price carried over from before the range
+        10 * 100,
+        10 * 110,               # DSV held but has no price yet
+        6 * 110 + 2 * 60,
+        6 * 110 + 2 * 60,       # Both prices forward-filled
+    ])
+    assert series["missing_currencies"] == []
+
+
+def test_range_before_first_trade_is_zero(app):
+    _setup(app)
+    with app.app_context():
+        series = portfolio_value_series("2023-12-30", "2023-12-31")
+    assert series["values"] == [0.0, 0.0]
+
+
+def test_portfolio_value_endpoint(app, client):
+    _setup(app)
+    response = client.get("/finance/investments/api/portfolio-value?start=2024-01-04&end=2024-01-04")
+    assert response.status_code == 200
+    assert response.get_json()["values"] == pytest.approx([780.0])
+
+
+def test_portfolio_value_endpoint_rejects_bad_dates(client):
+    assert client.get("/finance/investments/api/portfolio-value?start=nope").status_code == 400
+    assert client.get("/finance/investments/api/portfolio-value?start=2024-02-01&end=2024-01-01").status_code == 400
+    assert client.get("/finance/investments/api/portfolio-value?start=0001-01-01&end=2024-01-01").status_code == 400
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[137] = 50.0      # A single spike must survive downsampling
+    y[801] = -20.0
+
+    kept = lttb_indices(x, y, 40)
+
+    assert kept.size == 40
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+    assert 137 in kept and 801 in kept
+
+
+def test_price_history_endpoint_range_and_max_points(app, client):
+    with app.app_context():
+        add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+        asset_id = get_asset_id_by_symbol("NOVO")
+        day = date(2023, 1, 1)
+        ingest_prices({"asset_id": asset_id, "date": (day + timedelta(days=i)).isoformat(),
+                       "price": 100.0 + (i % 17)} for i in range(400))
+
+    url = f"/finance/investments/api/price-history/{asset_id}"
+    full = client.get(url).get_json()
+    assert len(full) == 400
+
+    ranged = client.get(f"{url}?start=2023-02-01&end=2023-02-10").get_json()
+    assert [row["date"] for row in ranged][0] == "2023-02-01"
+    assert len(ranged) == 10
+
+    sampled = client.get(f"{url}?max_points=50").get_json()
+    assert len(sampled) == 50
+    assert sampled[0] == full[0] and sampled[-1] == full[-1]
+
+    assert client.get(f"{url}?max_points=2").status_code == 400
+    assert client.get(f"{url}?start=yesterday").status_code == 400
+
+
+def test_batch_price_history_endpoint(app, client):
+    _setup(app)
+    with app.app_context():
+        novo = get_asset_id_by_symbol("NOVO")
+        dsv = get_asset_id_by_symbol("DSV")
+
+    response = client.get(f"/finance/investments/api/price-history?ids={novo},{dsv},999&start=2024-01-01")
+    assert response.status_code == 200
+    histories = response.get_json()
+    assert histories[str(novo)] == [{"date": "2024-01-03", "price": 110.0}]
+    assert histories[str(dsv)] == [{"date": "2024-01-04", "price": 60.0}]
+    assert histories["999"] == []
+
+    assert client.get("/finance/investments/api/price-history").status_code == 400
+    assert client.get("/finance/investments/api/price-history?ids=1,x").status_code == 400
@@ -0,0 +1,112 @@
+from investment_tracker.app import external_api
+from investment_tracker.app.db import (
+    add_asset,
+    get_asset_id_map,
+    add_transactions_bulk,
+    get_transactions_page,
+    iter_transactions,
+    get_db_connection,
+)
+
+
+def _ledger(app):
+    with app.app_context():
+        add_asset("NOVO", "Novo Nordisk", "Stock", "DKK")
+        add_asset("DSV", "DSV", "Stock", "DKK")
+        ids = get_asset_id_map()
+        # Two trades per day, so pages must break ties on id
+        rows = []
+        for day in range(1, 21):
+            rows.append((ids["NOVO"], "buy", f"2024-01-{day:02d}", 1.0, 100.0, 1.0))
+            rows.append((ids["DSV"], "sell" if day % 2 else "buy", f"2024-01-{day:02d}", 2.0, 50.0, 0.0))
+        add_transactions_bulk(rows)
+
+
+def test_pages_cover_every_row_once_in_order(app):
+    _ledger(app)
+    with app.app_context():
+        seen = []
+        after = None
+        while True:
+            page = get_transactions_page(limit=7, after=after)
+            seen.extend(page["transactions"])
+            after = page["next_cursor"]
+            if after is None:
+                break
+
+        assert len(seen) == 40
+        assert len({t["id"] for t in seen}) == 40
+        keys = [(t["date"], t["id"]) for t in seen]
+        assert keys == sorted(keys, reverse=True)
+        assert seen == list(iter_transactions())
+
+
+def test_filters_combine(app):
+    _ledger(app)
+    with app.app_context():
+        page = get_transactions_page(limit=100, symbol="dsv", transaction_type="sell",
+                                     start="2024-01-05", end="2024-01-10")
+
+    assert [t["date"] for t in page["transactions"]] == ["2024-01-09", "2024-01-07", "2024-01-05"]
+    assert page["next_cursor"] is None
+
+
+def test_type_filter_uses_index(app):
+    with app.app_context():
+        with get_db_connection() as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM transactions WHERE transaction_type = 'buy' "
+                "ORDER BY date DESC, id DESC LIMIT 10;"
+            ).fetchall()
+
+    details = " ".join(row["detail"] for row in plan)
+    assert "idx_transactions_type_date" in details
+    assert "TEMP B-TREE" not in details
+
+
+def test_transactions_endpoint_paginates(app, client):
+    _ledger(app)
+    first = client.get("/finance/investments/api/transactions?limit=30").get_json()
+    assert len(first["transactions"]) == 30
+
+    cursor = first["next_cursor"]
+    second = client.get("/finance/investments/api/transactions?limit=30"
+                        f"&after_date={cursor['after_date']}&after_id={cursor['after_id']}").get_json()
+    assert len(second["transactions"]) == 10
+    assert second["next_cursor"] is None
+
+    assert client.get("/finance/investments/api/transactions?type=gift").status_code == 400
+
+
+def test_history_pages_and_export(app, client):
+    _ledger(app)
+    page = client.get("/finance/investments/history?limit=5&symbol=NOVO")
+    assert page.status_code == 200
+    assert page.data.count(b"<tr>") == 6          # Header + 5 rows
+    assert b"after_id=" in page.data
+
+    export = client.get("/finance/investments/history/export?symbol=NOVO")
+    assert export.is_streamed
+    assert export.get_data().count(b"<tr>") == 21
+
+
+def test_html_history_never_fetches_rates(app, client, monkeypatch):
+    with app.app_context():
+        add_asset("AAPL", "Apple", "Stock", "USD")
+        add_transactions_bulk([(get_asset_id_map()["AAPL"], "buy", "2024-01-02", 1.0, 100.0, 0.0)])
+
+    calls = []
+
+    def provider(base):
+        calls.append(base)
+        return {"DKK": 1.0, "USD": 0.145}
+
+    monkeypatch.setattr(external_api, "_fetch_exchange_rate", provider)
+
+    assert client.get("/finance/investments/history").status_code == 200
+    assert client.get("/finance/investments/history/export").status_code == 200
+    assert calls == []
+
+    # The JSON API still reports DKK totals
+    rows = client.get("/finance/investments/api/transactions").get_json()["transactions"]
+    assert rows[0]["total_price_dkk"] is not None